@@ -1,23 +1,42 @@
 import scrapy
 from scrapy.crawler import CrawlerProcess
-import json
+import argparse
 import logging
-from pydantic import BaseModel
-from typing import List
+import os
+import posixpath
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urljoin
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import requests
+from parsel import Selector
 
-class ReadTheDocsData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+from crawl_profiles import PROFILES, profile_settings
+from doc_classifier import get_classifier
+from docs_pipeline import JsonlShardWriter, shard_settings
+from http_replay import with_replay
+from output_formats import (PIPELINE_FORMATS, ParquetRecordWriter, ZstdJsonlShardWriter, add_format_argument,
+                            format_options)
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record
+from recrawl_cache import recrawl_settings
+
+RTD_API_URL = "https://readthedocs.org/api/v3"
+
+# Páginas geradas pelo Sphinx que não contêm documentação
+SKIPPED_PAGES = ("genindex.html", "search.html", "py-modindex.html")
+
+ReadTheDocsData = Record
 
 class ReadTheDocsSpider(scrapy.Spider):
     name = "readthedocs_spider"
     start_urls = ["https://readthedocs.org/projects/"]
+    output_prefix = "readthedocs"
 
     def parse(self, response):
-        data = []
         # Extrair links de projetos
         for project in response.css("div.project-list-item"):
             project_url = project.css("a::attr(href)").get()
@@ -29,13 +48,14 @@ class ReadTheDocsSpider(scrapy.Spider):
             yield response.follow(next_page, callback=self.parse)
 
     def parse_project(self, response):
-        data = []
         project_name = response.css("h1::text").get(default="").strip()
-        for section in response.css("div.section"):
+        # páginas inalteradas no recrawl só são usadas para seguir links
+        sections = [] if response.meta.get("recrawl_unchanged") else response.css("div.section")
+        for section in sections:
             content = section.css("::text").getall()
             content = " ".join([text.strip() for text in content if text.strip()])
             if content:
-                data.append(ReadTheDocsData(
+                yield ReadTheDocsData(
                     id=f"{project_name}_{section.css('::attr(id)').get('')}",
                     content=content,
                     metadata={
@@ -45,40 +65,218 @@ class ReadTheDocsSpider(scrapy.Spider):
                         "language": "markdown",
                         "type": self.classify_document(content, response.url)
                     }
-                ))
-        # Salvar dados
-        self.save_to_json(data, f"readthedocs_{project_name}.json")
+                ).dict()
         # Seguir links internos
         for href in response.css("a::attr(href)").getall():
             if href.startswith("/"):
                 yield response.follow(href, callback=self.parse_project)
 
-    def classify_document(self, content: str, url: str) -> str:
-        """Classificar o tipo de documento com base no conteúdo e URL"""
-        if "readme" in url.lower() or "readme" in content.lower():
-            return "readme"
-        elif "contributing" in url.lower() or "contribute" in content.lower():
-            return "contributing"
-        elif "api" in url.lower() or "endpoint" in content.lower():
-            return "api_documentation"
-        return "documentation"
-
-    def save_to_json(self, data: List[ReadTheDocsData], filename: str):
-        output = {
-            "source": "readthedocs",
-            "category": "documentacao_tecnica",
-            "document_type": "mixed",
-            "data": [d.dict() for d in data]
+    @staticmethod
+    def classify_document(content: str, url: str) -> str:
+        """Classificar o tipo de documento com base no conteúdo e URL (regras "readthedocs")"""
+        return get_classifier("readthedocs").classify(content=content, url=url)
+
+
+def extract_archive(zip_path: str, slug: str, docs_url: str) -> List[dict]:
+    """Extrai as seções de todas as páginas HTML de um htmlzip do ReadTheDocs."""
+    data = []
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in archive.infolist():
+            # o zip tem um diretório raiz <slug>-<versão>/
+            _, _, page = info.filename.partition("/")
+            if not page.endswith(".html") or posixpath.basename(page) in SKIPPED_PAGES:
+                continue
+            if page.startswith(("_static/", "_sources/", "_modules/")):
+                continue
+            url = urljoin(docs_url, page)
+            timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", info.date_time + (0, 0, -1))
+            selector = Selector(text=archive.read(info).decode("utf-8", errors="ignore"))
+            for section in selector.css("div.section, section"):
+                content = section.css("::text").getall()
+                content = " ".join([text.strip() for text in content if text.strip()])
+                if content:
+                    data.append(ReadTheDocsData(
+                        # ids de seção só são únicos dentro de uma página
+                        id=f"{slug}_{page}_{section.css('::attr(id)').get('')}",
+                        content=content,
+                        metadata={
+                            "url": url,
+                            "timestamp": timestamp,
+                            "tags": ["readthedocs", slug],
+                            "language": "markdown",
+                            "type": ReadTheDocsSpider.classify_document(content, url)
+                        }
+                    ).dict())
+    return data
+
+
+class ReadTheDocsArchiveHarvester:
+    """Coleta projetos via API v3 do ReadTheDocs e o htmlzip da versão padrão.
+
+    Um download por projeto substitui o crawl página a página; a extração das
+    seções roda localmente em processos paralelos. No máximo ``2 * workers``
+    projetos ficam em andamento (baixando ou extraindo); as seções de cada um
+    são gravadas assim que a extração termina e o htmlzip é apagado em seguida.
+    """
+
+    def __init__(self, token: Optional[str] = None, output_dir: str = "docs_output",
+                 download_dir: str = "rtd_archives", workers: Optional[int] = None,
+                 download_workers: int = 4):
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"Token {token}"
+        self.output_dir = output_dir
+        self.download_dir = download_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.download_workers = download_workers
+        os.makedirs(download_dir, exist_ok=True)
+
+    def _get(self, url: str, params: Optional[Dict] = None) -> dict:
+        response = self.session.get(url, params=params, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def list_projects(self, limit: Optional[int] = None) -> Iterator[str]:
+        """Lista os slugs de projetos visíveis para o token informado."""
+        url = f"{RTD_API_URL}/projects/"
+        params = {"limit": 100}
+        count = 0
+        while url:
+            page = self._get(url, params)
+            for project in page.get("results", []):
+                yield project["slug"]
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+            url = page.get("next")
+            params = None  # "next" já possui os parâmetros
+
+    def archive_info(self, slug: str) -> Optional[Dict[str, str]]:
+        """Retorna a URL do htmlzip e a URL base da versão padrão do projeto."""
+        project = self._get(f"{RTD_API_URL}/projects/{slug}/")
+        version_slug = project.get("default_version") or "latest"
+        version = self._get(f"{RTD_API_URL}/projects/{slug}/versions/{version_slug}/")
+        htmlzip = version.get("downloads", {}).get("htmlzip")
+        if not htmlzip:
+            return None
+        docs_url = version.get("urls", {}).get("documentation") or project.get("urls", {}).get("documentation", "")
+        return {
+            "htmlzip": urljoin("https://readthedocs.org/", htmlzip),
+            "docs_url": docs_url.rstrip("/") + "/",
         }
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
-        logging.info(f"Dados salvos em {filename}")
-
-# Executar o crawler
-process = CrawlerProcess(settings={
-    "FEEDS": {},
-    "USER_AGENT": "Mozilla/5.0",
-    "DOWNLOAD_DELAY": 2,
-})
-process.crawl(ReadTheDocsSpider)
-process.start()
\ No newline at end of file
+
+    def download(self, slug: str) -> Optional[Dict[str, str]]:
+        path = os.path.join(self.download_dir, f"{slug}.zip")
+        try:
+            info = self.archive_info(slug)
+            if info is None:
+                logging.warning(f"{slug}: versão padrão sem htmlzip disponível")
+                return None
+            with self.session.get(info["htmlzip"], stream=True, timeout=60) as response:
+                response.raise_for_status()
+                with open(path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=1 << 16):
+                        f.write(chunk)
+            return {"slug": slug, "path": path, "docs_url": info["docs_url"]}
+        except Exception as e:
+            logging.error(f"Erro ao baixar {slug}: {e}")
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+
+    def harvest(self, slugs: List[str], compress: bool = False, output_format: str = "json", **options) -> int:
+        if output_format == "parquet":
+            writer = ParquetRecordWriter(os.path.join(self.output_dir, "readthedocs.parquet"), source="readthedocs")
+        elif output_format == "jsonl.zst":
+            writer = ZstdJsonlShardWriter(self.output_dir, "readthedocs", **options)
+        else:
+            writer = JsonlShardWriter(self.output_dir, "readthedocs",
+                                      shard_max_items=options.get("shard_max_records") or 50000)
+        window = 2 * self.workers
+        pending = iter(slugs)
+        with ThreadPoolExecutor(max_workers=self.download_workers) as downloads, \
+                ProcessPoolExecutor(max_workers=self.workers) as extractors:
+            downloading = {downloads.submit(self.download, slug) for slug in islice(pending, window)}
+            extractions: Dict[Future, Dict[str, str]] = {}
+            while downloading or extractions:
+                done, _ = wait(downloading | set(extractions), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in downloading:
+                        downloading.remove(future)
+                        archive = future.result()
+                        if archive is not None:
+                            extractions[extractors.submit(extract_archive, archive["path"], archive["slug"],
+                                                          archive["docs_url"])] = archive
+                    else:
+                        self._write_archive(writer, future, extractions.pop(future))
+                for slug in islice(pending, window - len(downloading) - len(extractions)):
+                    downloading.add(downloads.submit(self.download, slug))
+        writer.close()
+        if compress and output_format == "json" and writer.shards:
+            writer.compress(remove_shards=True)
+        logging.info(f"{writer.total} seções salvas em {self.output_dir}")
+        return writer.total
+
+    @staticmethod
+    def _write_archive(writer, future: Future, archive: Dict[str, str]):
+        slug = archive["slug"]
+        try:
+            records = future.result()
+        except Exception as e:
+            logging.error(f"Erro ao extrair {slug}: {e}")
+            return
+        finally:
+            os.remove(archive["path"])
+        for record in records:
+            writer.write(record)
+        logging.info(f"{slug}: {len(records)} seções extraídas")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Coleta documentação hospedada no ReadTheDocs")
+    parser.add_argument("--api", action="store_true", help="Usa a API v3 e os htmlzip em vez de rastrear páginas")
+    parser.add_argument("--token", default=os.getenv("RTD_TOKEN"), help="Token da API do ReadTheDocs")
+    parser.add_argument("--projects", help="Slugs separados por vírgula (padrão: projetos listados pela API)")
+    parser.add_argument("--limit", type=int, default=None, help="Número máximo de projetos listados")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de extração")
+    parser.add_argument("--download-dir", default="rtd_archives", help="Diretório dos htmlzip baixados")
+    parser.add_argument("--output-dir", default="docs_output", help="Diretório dos shards JSONL")
+    parser.add_argument("--compress", action="store_true", help="Gera um único .jsonl.gz ao final")
+    parser.add_argument("--recrawl-db", help="Cache SQLite para recrawl condicional (modo crawl)")
+    parser.add_argument("--profile", choices=PROFILES, default="default", help="Perfil de crawl (modo crawl)")
+    parser.add_argument("--delay", type=float, default=2, help="Delay entre requisições (modo crawl)")
+    add_format_argument(parser, formats=PIPELINE_FORMATS)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with profiled_from_args(args, args.output_dir):
+        if args.api:
+            harvester = ReadTheDocsArchiveHarvester(
+                token=args.token,
+                output_dir=args.output_dir,
+                download_dir=args.download_dir,
+                workers=args.workers,
+            )
+            if args.projects:
+                slugs = [p.strip() for p in args.projects.split(",") if p.strip()]
+            else:
+                if not args.token:
+                    parser.error("Informe --projects ou --token para listar projetos pela API")
+                slugs = list(harvester.list_projects(limit=args.limit))
+            harvester.harvest(slugs, compress=args.compress, output_format=args.format, **format_options(args))
+        else:
+            # Executar o crawler
+            process = CrawlerProcess(settings=with_replay({
+                "FEEDS": {},
+                "USER_AGENT": "Mozilla/5.0",
+                **profile_settings(args.profile, args.delay, multi_domain=True),
+                "ITEM_PIPELINES": {"docs_pipeline.ShardedJsonlPipeline": 300},
+                "DOCS_OUTPUT_DIR": args.output_dir,
+                "DOCS_COMPRESS_OUTPUT": args.compress,
+                "DOCS_OUTPUT_FORMAT": args.format,
+                **shard_settings(args),
+                **recrawl_settings(args.recrawl_db),
+            }))
+            process.crawl(ReadTheDocsSpider)
+            process.start()
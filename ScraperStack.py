@@ -1,21 +1,17 @@
 import argparse
-import json
 import logging
 import os
 import time
 from typing import List
 
 import requests
-from pydantic import BaseModel
-
-# Configuração de logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record, write_json
 
 # Modelo Pydantic para validação
-class StackOverflowData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+StackOverflowData = Record
 
 class StackOverflowScraper:
     def __init__(self, api_key: str):
@@ -78,8 +74,7 @@ class StackOverflowScraper:
         return data
 
     def save_to_json(self, data: List[StackOverflowData]):
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump([d.dict() for d in data], f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file)
         logging.info(f"Dados salvos em {self.output_file}")
 
 def parse_args() -> argparse.Namespace:
@@ -87,13 +82,20 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--api-key", help="Chave da API do StackExchange")
     parser.add_argument("--tags", required=True, help="Lista de tags separadas por vírgula")
     parser.add_argument("--pages", type=int, default=5, help="Número máximo de páginas por tag")
+    add_format_argument(parser)
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     args = parse_args()
     api_key = args.api_key or os.getenv("STACK_API_KEY")
     tags = [t.strip() for t in args.tags.split(",") if t.strip()]
     scraper = StackOverflowScraper(api_key=api_key)
-    data = scraper.fetch_questions(tags=tags, pages=args.pages)
-    scraper.save_to_json(data)
+    with profiled_from_args(args, scraper.output_file):
+        data = scraper.fetch_questions(tags=tags, pages=args.pages)
+        if args.format == "json":
+            scraper.save_to_json(data)
+        else:
+            save_records(data, scraper.output_file, args.format, source="stackoverflow", **format_options(args))
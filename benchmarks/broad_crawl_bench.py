@@ -0,0 +1,115 @@
+"""Compara os perfis de crawl contra vários sites de documentação locais.
+
+Cada site simulado roda em um IP de loopback diferente (127.0.0.2, 127.0.0.3,
+...) para que o Scrapy o trate como um domínio/slot próprio, e responde com
+latência artificial. Exemplo:
+
+    python benchmarks/broad_crawl_bench.py --sites 8 --pages 60 --latency 0.05
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawl_profiles import PROFILES, profile_settings  # noqa: E402
+
+
+def make_handler(pages: int, latency: float):
+    class DocsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            name = self.path.rstrip("/").rsplit("/", 1)[-1]
+            index = int(name[1:-5]) if name.startswith("p") and name.endswith(".html") else 0
+            links = "".join(
+                f'<a href="/docs/p{(index * 3 + k) % pages}.html">nav</a>' for k in range(1, 4)
+            )
+            body = (
+                f'<html><body><div class="section" id="s{index}">Página {index} '
+                f'{"texto de documentação " * 50}</div>{links}</body></html>'
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return DocsHandler
+
+
+def serve_sites(count: int, pages: int, latency: float, port: int):
+    servers, base_urls = [], []
+    for i in range(count):
+        host = f"127.0.0.{i + 2}"
+        server = ThreadingHTTPServer((host, port), make_handler(pages, latency))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        base_urls.append(f"http://{host}:{port}/docs")
+    return servers, base_urls
+
+
+def run_crawl(profile: str, base_urls, delay: float, output_dir: str, results):
+    from scrapy.crawler import CrawlerProcess
+
+    from crawl_frontier import frontier_settings
+    from framework_docs_spider import FrameworkDocsSpider
+
+    settings = {
+        "LOG_LEVEL": "ERROR",
+        "ITEM_PIPELINES": {"docs_pipeline.ShardedJsonlPipeline": 300},
+        "DOCS_OUTPUT_DIR": output_dir,
+        **profile_settings(profile, delay),
+        **frontier_settings(None),
+    }
+    process = CrawlerProcess(settings=settings)
+    crawlers = []
+    for base_url in base_urls:
+        crawler = process.create_crawler(FrameworkDocsSpider)
+        crawlers.append(crawler)
+        process.crawl(crawler, base_url=base_url)
+    start = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - start
+    pages = sum(c.stats.get_value("response_received_count", 0) for c in crawlers)
+    results.put((elapsed, pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos perfis de crawl em sites locais")
+    parser.add_argument("--sites", type=int, default=6, help="Número de sites simulados")
+    parser.add_argument("--pages", type=int, default=40, help="Páginas por site")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência de cada resposta (s)")
+    parser.add_argument("--delay", type=float, default=0.25, help="Delay passado aos perfis")
+    parser.add_argument("--port", type=int, default=8801, help="Porta dos sites simulados")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="Perfis a comparar")
+    args = parser.parse_args()
+
+    servers, base_urls = serve_sites(args.sites, args.pages, args.latency, args.port)
+    print(f"{args.sites} sites x {args.pages} páginas, latência {args.latency}s, delay {args.delay}s")
+    try:
+        for profile in args.profiles.split(","):
+            results = multiprocessing.Queue()
+            with tempfile.TemporaryDirectory() as output_dir:
+                # cada crawl em um processo novo: o reactor do Twisted não reinicia
+                worker = multiprocessing.Process(
+                    target=run_crawl, args=(profile, base_urls, args.delay, output_dir, results)
+                )
+                worker.start()
+                elapsed, pages = results.get()
+                worker.join()
+            print(f"{profile:>8}: {pages} páginas em {elapsed:.2f}s ({pages / elapsed:.1f} páginas/s)")
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Confere que os spiders de docs coletam todas as páginas de um site estilo Sphinx.
+
+Sobe um site local com páginas em diretórios (``/docs/intro/``), links sem a
+barra final que o servidor redireciona (301) para a versão com barra, um
+``index.html`` explícito e um robots.txt que aponta para um índice de
+sitemaps (sitemap.xml -> sitemap-pages.xml), roda ``framework_docs_spider.py``
+contra ele e falha (código 1) se alguma página não chegar aos shards. Exemplo:
+
+    python benchmarks/docs_crawl_check.py
+    python benchmarks/docs_crawl_check.py --sitemap
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# caminho -> links da página; todas devem ser coletadas
+PAGES = {
+    "/docs/": ["intro/", "guide", "api/index.html", "/docs/faq/#top"],
+    "/docs/intro/": ["../guide/", "../faq"],
+    "/docs/guide/": ["../intro/"],
+    "/docs/api/index.html": ["../"],
+    "/docs/faq/": [],
+}
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("#", 1)[0]
+        root = f"http://127.0.0.1:{self.server.server_port}"
+        if path == "/robots.txt":
+            self.reply(200, "text/plain", f"User-agent: *\nSitemap: {root}/sitemap.xml\n")
+        elif path == "/sitemap.xml":
+            self.reply(200, "application/xml",
+                       f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                       f"<sitemap><loc>{root}/docs/sitemap-pages.xml</loc></sitemap></sitemapindex>")
+        elif path == "/docs/sitemap-pages.xml":
+            urls = "".join(f"<url><loc>{root}{page}</loc><lastmod>2024-05-01</lastmod></url>" for page in PAGES)
+            self.reply(200, "application/xml",
+                       f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                       f"{urls}</urlset>")
+        elif path in PAGES:
+            links = "".join(f'<a href="{href}">link</a>' for href in PAGES[path])
+            self.reply(200, "text/html; charset=utf-8",
+                       f'<html><body><div class="section" id="main">Página {path}</div>{links}</body></html>')
+        elif path + "/" in PAGES:
+            # como Sphinx/Django servidos por nginx: diretório sem barra final
+            self.send_response(301)
+            self.send_header("Location", path + "/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self.reply(404, "text/plain", "não encontrado")
+
+    def reply(self, status: int, content_type: str, text: str):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def scraped_urls(output_dir: str) -> set:
+    urls = set()
+    for path in glob.glob(os.path.join(output_dir, "**", "*.jsonl"), recursive=True):
+        with open(path, encoding="utf-8") as f:
+            urls.update(json.loads(line)["metadata"]["url"] for line in f if line.strip())
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=0, help="Porta do site local (padrão: uma livre)")
+    parser.add_argument("--sitemap", action="store_true", help="Testa o modo guiado por sitemap")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), SiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            output_dir = os.path.join(tmp, "out")
+            command = [sys.executable, os.path.join(ROOT, "framework_docs_spider.py"),
+                       "--base-url", f"{base}/docs/", "--delay", "0", "--output-dir", output_dir,
+                       "--lastmod-file", os.path.join(tmp, "lastmod.json")]
+            if args.sitemap:
+                command.append("--sitemap")
+            subprocess.run(command, cwd=tmp, check=True, capture_output=True)
+            got = scraped_urls(output_dir)
+    finally:
+        server.shutdown()
+
+    missing = sorted(set(base + page for page in PAGES) - got)
+    print(f"{len(got)} de {len(PAGES)} páginas coletadas")
+    if missing:
+        print(f"Faltando: {', '.join(missing)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Mede o tempo de import de cada módulo e quais dependências pesadas ele carrega.
+
+Cada import roda em um interpretador novo (como um cron curto ou um worker de
+teste), repetido ``--repeat`` vezes; o tempo mostrado é a mediana do import,
+sem o tempo de subir o interpretador. Exemplo:
+
+    python benchmarks/startup_bench.py --repeat 5 --budget-ms 150
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependências que só devem ser carregadas quando a fonte é usada de fato
+HEAVY = ("scrapy", "twisted", "selenium", "datasets", "kaggle", "praw", "discord", "slack_sdk",
+         "pyarrow", "zstandard", "numpy", "bs4", "tokenizers", "fasttext", "msgpack")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    import {module}
+    error = None
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy, "error": error}}))
+"""
+
+
+def probe(module: str) -> dict:
+    code = PROBE.format(module=module, heavy=HEAVY)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return {"seconds": 0.0, "heavy": [], "error": (result.stderr.strip().splitlines() or ["?"])[-1]}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", help="Módulos a medir (padrão: todos os .py da raiz)")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por módulo")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Falha (código 1) se algum import passar deste tempo")
+    args = parser.parse_args()
+
+    modules = args.modules or sorted(
+        os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(ROOT, "*.py"))
+    )
+    over_budget = []
+    print(f"{'módulo':<28} {'ms':>8}  dependências pesadas carregadas")
+    for module in modules:
+        runs = [probe(module) for _ in range(args.repeat)]
+        if runs[0]["error"]:
+            print(f"{module:<28} {'-':>8}  (não importável: {runs[0]['error']})")
+            continue
+        ms = statistics.median(run["seconds"] for run in runs) * 1000
+        print(f"{module:<28} {ms:8.1f}  {', '.join(runs[0]['heavy']) or '-'}")
+        if args.budget_ms is not None and ms > args.budget_ms:
+            over_budget.append(module)
+    if over_budget:
+        print(f"Acima de {args.budget_ms:.0f} ms: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
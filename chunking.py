@@ -0,0 +1,236 @@
+import os
+import re
+from itertools import chain, groupby
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from records import Record
+
+DEFAULT_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "gpt2")
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_OVERLAP = 64
+# Blocos contados por chamada ao tokenizador
+BATCH_SIZE = 256
+# Separador entre blocos de um trecho
+SEPARATOR = "\n\n"
+# Parágrafos maiores que isso (ex.: logs sem linhas em branco) são quebrados em fim de linha
+MAX_BLOCK_CHARS = 8000
+
+# Títulos em Markdown, seções numeradas de RFC ("3.1.  Visão geral") e apêndices
+HEADING_RE = re.compile(r"#{1,6}\s|\d+(?:\.\d+)*\.?\s{1,3}[A-Z]|Appendix [A-Z]")
+# Sublinhado de títulos em reStructuredText e setext
+UNDERLINE_RE = re.compile(r"([=\-~^\"*+#])\1{2,}\s*$")
+
+
+def iter_blocks(source: Union[str, Iterable[str]],
+                max_block_chars: int = MAX_BLOCK_CHARS) -> Iterator[Tuple[str, bool]]:
+    """Divide o texto em blocos ``(texto, é_título)`` em parágrafos e títulos.
+
+    ``source`` pode ser uma string ou qualquer iterável de linhas (um arquivo
+    aberto, por exemplo), consumido sob demanda.
+    """
+    lines = source.splitlines() if isinstance(source, str) else source
+    block: List[str] = []
+    size = 0
+    heading = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            if block:
+                yield "\n".join(block), heading
+                block, size, heading = [], 0, False
+            continue
+        if HEADING_RE.match(line):
+            if block:
+                yield "\n".join(block), heading
+            block, size, heading = [line], len(line) + 1, True
+            continue
+        if UNDERLINE_RE.match(line) and block:
+            title = block.pop()
+            if block:
+                yield "\n".join(block), heading
+            block, size, heading = [title, line], len(title) + len(line) + 2, True
+            continue
+        if block and size + len(line) > max_block_chars:
+            yield "\n".join(block), heading
+            block, size, heading = [], 0, False
+        block.append(line)
+        size += len(line) + 1
+    if block:
+        yield "\n".join(block), heading
+
+
+def _get(record, field: str):
+    return record.get(field) if isinstance(record, dict) else getattr(record, field)
+
+
+def _derive(record, record_id: str, content: str, metadata: dict):
+    """Novo registro do mesmo tipo do original (dict ou ``Record``)."""
+    if isinstance(record, dict):
+        return {**record, "id": record_id, "content": content, "metadata": metadata}
+    return Record(id=record_id, content=content, metadata=metadata)
+
+
+class TokenChunker:
+    """Divide registros em trechos de no máximo ``max_tokens`` tokens.
+
+    O texto é quebrado em parágrafos e títulos (``iter_blocks``); cada bloco é
+    tokenizado uma única vez, em lotes de ``batch_size`` blocos com o
+    tokenizador rápido do Hugging Face, e os trechos são montados somando as
+    contagens — nunca se retokeniza o documento inteiro. Um título fecha o
+    trecho atual se ele já tiver metade do limite; os últimos blocos de cada
+    trecho (até ``overlap_tokens``) são repetidos no início do seguinte, ou,
+    se o último bloco sozinho passar disso, os seus últimos tokens. Os
+    separadores ``"\n\n"`` entre blocos entram na contagem. Blocos maiores
+    que o limite são cortados pelos offsets dos tokens.
+    """
+
+    def __init__(self, tokenizer: str = DEFAULT_TOKENIZER, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP, batch_size: int = BATCH_SIZE):
+        from tokenizers import Tokenizer
+
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens deve ser menor que max_tokens")
+        if os.path.exists(tokenizer):
+            self.tokenizer = Tokenizer.from_file(tokenizer)
+        else:
+            self.tokenizer = Tokenizer.from_pretrained(tokenizer)
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.batch_size = batch_size
+        self.separator_tokens = self.count([SEPARATOR])[0]
+
+    def count(self, texts: List[str]) -> List[int]:
+        return [len(e.ids) for e in self.tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+    def _count_batch(self, items: List[Tuple]) -> Iterator[Tuple]:
+        """Conta os tokens de um lote de ``(chave, texto, é_título)``, cortando blocos grandes.
+
+        Cada bloco sai com o offset (em caracteres) do início de cada token,
+        usado para cortar a sobreposição no meio de um bloco.
+        """
+        texts = [text for _, text, _ in items if text]
+        encodings = iter(self.tokenizer.encode_batch(texts, add_special_tokens=False)) if texts else iter(())
+        limit = self.max_tokens
+        # pedaços de um bloco cortado deixam espaço para a sobreposição do pedaço anterior
+        piece = max(limit - self.overlap_tokens - self.separator_tokens, 1) if self.overlap_tokens else limit
+        for key, text, heading in items:
+            if not text:
+                yield key, text, heading, 0, []
+                continue
+            encoding = next(encodings)
+            starts = [offset[0] for offset in encoding.offsets]
+            total = len(starts)
+            if total <= limit:
+                yield key, text, heading, total, starts
+                continue
+            for start in range(0, total, piece):
+                end = start + piece
+                piece_start = starts[start]
+                piece_end = starts[end] if end < total else len(text)
+                yield (key, text[piece_start:piece_end], heading and start == 0, min(piece, total - start),
+                       [s - piece_start for s in starts[start:end]])
+
+    def _counted(self, items: Iterable[Tuple]) -> Iterator[Tuple]:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield from self._count_batch(batch)
+                batch = []
+        if batch:
+            yield from self._count_batch(batch)
+
+    def _overlap(self, current: List[Tuple[str, int, List[int]]]) -> List[Tuple[str, int, List[int]]]:
+        """Blocos do fim de um trecho repetidos no início do próximo (até ``overlap_tokens``)."""
+        kept, kept_tokens = [], 0
+        for block in reversed(current):
+            added = block[1] + (self.separator_tokens if kept else 0)
+            if kept_tokens + added > self.overlap_tokens:
+                break
+            kept.insert(0, block)
+            kept_tokens += added
+        if kept or not self.overlap_tokens:
+            return kept
+        # o último bloco sozinho passa da sobreposição: repete só os seus últimos tokens
+        text, tokens, starts = current[-1]
+        tail = text[starts[tokens - self.overlap_tokens]:].lstrip()
+        tail_tokens = self.count([tail])[0] if tail else 0
+        if not tail or tail_tokens > self.overlap_tokens:
+            return []
+        return [(tail, tail_tokens, [])]
+
+    def _assemble(self, blocks: Iterable[Tuple[str, bool, int, List[int]]]) -> Iterator[Tuple[str, int]]:
+        current: List[Tuple[str, int, List[int]]] = []
+        total = 0
+        separator = self.separator_tokens
+        for text, heading, tokens, starts in blocks:
+            if current and (total + separator + tokens > self.max_tokens
+                            or (heading and total >= self.max_tokens // 2)):
+                yield SEPARATOR.join(block[0] for block in current), total
+                current = self._overlap(current)
+                total = sum(block[1] for block in current) + separator * max(len(current) - 1, 0)
+                if current and total + separator + tokens > self.max_tokens:
+                    current, total = [], 0
+            if current:
+                total += separator
+            current.append((text, tokens, starts))
+            total += tokens
+        if current:
+            yield SEPARATOR.join(block[0] for block in current), total
+
+    def chunk_text(self, source: Union[str, Iterable[str]]) -> Iterator[Tuple[str, int]]:
+        """Gera ``(trecho, tokens)`` a partir de uma string ou de um iterável de linhas."""
+        counted = self._counted((None, text, heading) for text, heading in iter_blocks(source))
+        return self._assemble((text, heading, tokens, starts) for _, text, heading, tokens, starts in counted)
+
+    def chunk_records(self, records: Iterable) -> Iterator:
+        """Gera os registros divididos, com ``token_count`` (e ``chunk``/``parent_id``) na metadata.
+
+        Os blocos de vários registros curtos são tokenizados no mesmo lote.
+        Registros que cabem em um trecho mantêm o id; os demais viram
+        ``<id>#<n>``.
+        """
+        def blocks():
+            for index, record in enumerate(records):
+                content = _get(record, "content") or ""
+                empty = True
+                for text, heading in iter_blocks(content):
+                    empty = False
+                    yield (index, record), text, heading
+                if empty:
+                    yield (index, record), "", False
+
+        counted = self._counted(blocks())
+        for (_, record), group in groupby(counted, key=lambda item: item[0]):
+            record_id = str(_get(record, "id"))
+            metadata = _get(record, "metadata") or {}
+            chunks = self._assemble((text, heading, tokens, starts)
+                                    for _, text, heading, tokens, starts in group if text)
+            first = next(chunks, None)
+            if first is None:
+                yield _derive(record, record_id, "", {**metadata, "token_count": 0})
+                continue
+            second = next(chunks, None)
+            if second is None:
+                yield _derive(record, record_id, first[0], {**metadata, "token_count": first[1]})
+                continue
+            for part, (text, tokens) in enumerate(chain((first, second), chunks)):
+                yield _derive(record, f"{record_id}#{part}", text,
+                              {**metadata, "chunk": part, "token_count": tokens, "parent_id": record_id})
+
+
+def add_chunk_arguments(parser):
+    parser.add_argument("--chunk-tokens", type=int, default=None,
+                        help="Divide os registros em trechos de até N tokens (em parágrafos e títulos)")
+    parser.add_argument("--chunk-overlap", type=int, default=DEFAULT_OVERLAP,
+                        help="Tokens repetidos entre trechos consecutivos")
+    parser.add_argument("--tokenizer", default=DEFAULT_TOKENIZER,
+                        help="Tokenizador do Hugging Face (nome no Hub ou tokenizer.json)")
+
+
+def chunk_records_from_args(records: Iterable, args) -> List:
+    """Atalho dos CLIs: divide os registros se ``--chunk-tokens`` foi informado."""
+    if not args.chunk_tokens:
+        return list(records)
+    chunker = TokenChunker(args.tokenizer, max_tokens=args.chunk_tokens, overlap_tokens=args.chunk_overlap)
+    return list(chunker.chunk_records(records))
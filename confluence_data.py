@@ -1,29 +1,26 @@
 import os
-import json
 import time
 import logging
-from typing import List
+from typing import List, Optional
 
 import requests
-from pydantic import BaseModel
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 
-logging.basicConfig(level=logging.INFO)
+from chunking import add_chunk_arguments, chunk_records_from_args
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record, write_json
 
-
-class ConfluenceData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+ConfluenceData = Record
 
 
 class ConfluenceScraper:
-    def __init__(self, base_url: str, username: str, token: str, use_api: bool = True):
+    def __init__(self, base_url: str, username: str, token: str, use_api: bool = True,
+                 max_chars: Optional[int] = 10000):
         self.base_url = base_url.rstrip('/')
         self.auth = (username, token)
         self.use_api = use_api
+        # None mantém o texto inteiro (para divisão por tokens)
+        self.max_chars = max_chars
         self.output_file = "confluence_data.json"
 
     def _fetch_via_api(self, page_id: str) -> ConfluenceData:
@@ -35,7 +32,7 @@ class ConfluenceScraper:
         timestamp = item.get("version", {}).get("when", time.strftime("%Y-%m-%d %H:%M:%S"))
         return ConfluenceData(
             id=str(item.get("id", page_id)),
-            content=content[:10000],
+            content=content[:self.max_chars],
             metadata={
                 "url": f"{self.base_url}/pages/viewpage.action?pageId={page_id}",
                 "timestamp": timestamp,
@@ -46,6 +43,11 @@ class ConfluenceScraper:
         )
 
     def _fetch_via_selenium(self, page_id: str) -> ConfluenceData:
+        # o selenium só é necessário sem a API (--no-api)
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.common.by import By
+
         url = f"{self.base_url}/pages/viewpage.action?pageId={page_id}"
         options = Options()
         options.headless = True
@@ -55,7 +57,7 @@ class ConfluenceScraper:
             body = driver.find_element(By.TAG_NAME, "body").text
             return ConfluenceData(
                 id=page_id,
-                content=body[:10000],
+                content=body[:self.max_chars],
                 metadata={
                     "url": url,
                     "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -83,21 +85,24 @@ class ConfluenceScraper:
         return data
 
     def save_to_json(self, data: List[ConfluenceData]):
-        output = {"data": [d.dict() for d in data]}
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file, envelope={})
         logging.info(f"Dados salvos em {self.output_file}")
 
 
 if __name__ == "__main__":
     import argparse
 
+    logging.basicConfig(level=logging.INFO)
+
     parser = argparse.ArgumentParser(description="Scrape Confluence pages")
     parser.add_argument("page_ids", nargs="+", help="IDs das páginas a baixar")
     parser.add_argument("--base-url", default=os.getenv("CONFLUENCE_URL", ""), help="URL base do Confluence")
     parser.add_argument("--username", default=os.getenv("CONFLUENCE_USER", ""), help="Usuário para autenticação")
     parser.add_argument("--token", default=os.getenv("CONFLUENCE_TOKEN", ""), help="Token ou senha para autenticação")
     parser.add_argument("--no-api", action="store_true", help="Não utilizar a API REST")
+    add_format_argument(parser)
+    add_profile_arguments(parser)
+    add_chunk_arguments(parser)
     args = parser.parse_args()
 
     scraper = ConfluenceScraper(
@@ -105,7 +110,12 @@ if __name__ == "__main__":
         username=args.username,
         token=args.token,
         use_api=not args.no_api,
+        max_chars=None if args.chunk_tokens else 10000,
     )
-    pages = scraper.fetch_pages(args.page_ids)
-    scraper.save_to_json(pages)
+    with profiled_from_args(args, scraper.output_file):
+        pages = chunk_records_from_args(scraper.fetch_pages(args.page_ids), args)
+        if args.format == "json":
+            scraper.save_to_json(pages)
+        else:
+            save_records(pages, scraper.output_file, args.format, source="confluence", **format_options(args))
 
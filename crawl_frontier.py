@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from scrapy.dupefilters import BaseDupeFilter
+from scrapy.utils.job import job_dir
+from w3lib.url import canonicalize_url as w3lib_canonicalize_url
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+INDEX_PAGES = ("index.html", "index.htm")
+
+
+def canonicalize_url(url: str, keep_query: bool = False) -> str:
+    """Normaliza uma URL de documentação antes da deduplicação.
+
+    Remove fragmento, porta padrão, ``index.html`` e a barra final, coloca
+    esquema/host em minúsculas e descarta a query string (a menos que
+    ``keep_query`` seja verdadeiro, caso em que ela é ordenada).
+    """
+    parts = urlsplit(w3lib_canonicalize_url(url, keep_fragments=False))
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    for index in INDEX_PAGES:
+        if path.endswith("/" + index):
+            path = path[: -len(index)]
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = parts.query if keep_query else ""
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class BloomFilter:
+    """Filtro de Bloom com bits mapeados em arquivo (ou em memória anônima).
+
+    O tamanho é calculado a partir da capacidade esperada e da taxa de falso
+    positivo; com ``path`` o estado persiste entre execuções.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001, path: Optional[str] = None):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        num_bytes = (self.num_bits + 7) // 8
+        self.path = path
+        self._file = None
+        if path:
+            exists = os.path.exists(path)
+            self._file = open(path, "r+b" if exists else "w+b")
+            if not exists or os.path.getsize(path) != num_bytes:
+                if exists:
+                    logging.warning(f"Tamanho de {path} não confere com a capacidade; recriando o filtro")
+                self._file.truncate(0)
+                self._file.truncate(num_bytes)
+            self._bits = mmap.mmap(self._file.fileno(), num_bytes)
+        else:
+            self._bits = mmap.mmap(-1, num_bytes)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> bool:
+        """Adiciona a chave; retorna True se ela (provavelmente) já existia."""
+        present = True
+        for pos in self._positions(key):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                present = False
+        return present
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def close(self):
+        self._bits.flush()
+        self._bits.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class BloomDupeFilter(BaseDupeFilter):
+    """DUPEFILTER_CLASS que deduplica URLs canônicas num filtro de Bloom.
+
+    Com JOBDIR o filtro é gravado em ``<JOBDIR>/requests.bloom`` e a fila de
+    requisições fica nos disk queues do Scrapy, então o crawl pode ser
+    retomado sem manter todas as URLs vistas em memória.
+
+    Configuração (settings):
+        FRONTIER_CAPACITY: número esperado de URLs (padrão 1.000.000)
+        FRONTIER_ERROR_RATE: taxa de falso positivo (padrão 0.001)
+        FRONTIER_KEEP_QUERY: mantém a query string na URL canônica
+    """
+
+    def __init__(self, path: Optional[str], capacity: int, error_rate: float,
+                 keep_query: bool = False, debug: bool = False):
+        bloom_path = os.path.join(path, "requests.bloom") if path else None
+        self.bloom = BloomFilter(capacity, error_rate, bloom_path)
+        self.keep_query = keep_query
+        self.debug = debug
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            job_dir(settings),
+            capacity=settings.getint("FRONTIER_CAPACITY", 1_000_000),
+            error_rate=settings.getfloat("FRONTIER_ERROR_RATE", 0.001),
+            keep_query=settings.getbool("FRONTIER_KEEP_QUERY", False),
+            debug=settings.getbool("DUPEFILTER_DEBUG"),
+        )
+
+    def request_seen(self, request) -> bool:
+        key = request.method + " " + canonicalize_url(request.url, self.keep_query)
+        redirect_urls = request.meta.get("redirect_urls")
+        if redirect_urls and key == request.method + " " + canonicalize_url(redirect_urls[-1], self.keep_query):
+            # redirecionamento para a mesma URL canônica (ex.: /docs/intro -> /docs/intro/):
+            # a origem já foi marcada como vista, mas a página ainda não foi baixada
+            return False
+        return self.bloom.add(key)
+
+    def close(self, reason: str):
+        self.bloom.close()
+
+    def log(self, request, spider):
+        if self.debug:
+            self.logger.debug("Requisição duplicada filtrada: %(request)s", {"request": request},
+                              extra={"spider": spider})
+        spider.crawler.stats.inc_value("dupefilter/filtered")
+
+
+def frontier_settings(job_dir_path: Optional[str], capacity: int = 1_000_000) -> Dict:
+    """Settings do Scrapy para um crawl persistente e retomável.
+
+    Sem ``job_dir_path`` apenas a deduplicação canônica é ativada (em memória).
+    """
+    settings = {
+        "DUPEFILTER_CLASS": "crawl_frontier.BloomDupeFilter",
+        "FRONTIER_CAPACITY": capacity,
+        "SCHEDULER_DISK_QUEUE": "scrapy.squeues.PickleFifoDiskQueue",
+        "SCHEDULER_MEMORY_QUEUE": "scrapy.squeues.FifoMemoryQueue",
+    }
+    if job_dir_path:
+        settings["JOBDIR"] = job_dir_path
+    return settings
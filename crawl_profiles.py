@@ -0,0 +1,52 @@
+from typing import Dict
+
+# Perfil para rastrear muitos sites de documentação ao mesmo tempo, seguindo as
+# recomendações de "Broad Crawls" da documentação do Scrapy: sem delay global,
+# concorrência limitada por domínio e ajustada pelo AutoThrottle e menos tempo
+# gasto com retries. O nível de log fica a cargo de cada CLI.
+BROAD_CRAWL_SETTINGS: Dict = {
+    "CONCURRENT_REQUESTS": 128,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+    "CONCURRENT_REQUESTS_PER_IP": 0,
+    "AUTOTHROTTLE_ENABLED": True,
+    "AUTOTHROTTLE_MAX_DELAY": 10.0,
+    "AUTOTHROTTLE_TARGET_CONCURRENCY": 4.0,
+    "DNSCACHE_ENABLED": True,
+    "DNSCACHE_SIZE": 10000,
+    "DNS_TIMEOUT": 10,
+    "REACTOR_THREADPOOL_MAXSIZE": 20,
+    "DOWNLOAD_TIMEOUT": 20,
+    "RETRY_TIMES": 1,
+    "RETRY_HTTP_CODES": [429, 500, 502, 503, 504],
+    "REDIRECT_MAX_TIMES": 3,
+    "COOKIES_ENABLED": False,
+}
+
+# Fila que alterna entre domínios; só tem efeito quando um mesmo crawler (um
+# scheduler) visita vários domínios, como o spider do ReadTheDocs
+MULTI_DOMAIN_SETTINGS: Dict = {
+    "SCHEDULER_PRIORITY_QUEUE": "scrapy.pqueues.DownloaderAwarePriorityQueue",
+}
+
+PROFILES = ("default", "broad")
+
+
+def profile_settings(profile: str, delay: float, multi_domain: bool = False) -> Dict:
+    """Settings do perfil de crawl escolhido na CLI.
+
+    No perfil ``default`` o ``delay`` é o DOWNLOAD_DELAY fixo de sempre; no
+    ``broad`` ele é apenas o delay inicial do AutoThrottle por domínio.
+    ``multi_domain`` indica um crawler que sozinho visita vários domínios
+    (spiders com um crawler por site, como o ``framework_docs_spider``, já
+    baixam os sites em paralelo, cada um com seu scheduler).
+    """
+    if profile == "broad":
+        settings = dict(BROAD_CRAWL_SETTINGS)
+        if multi_domain:
+            settings.update(MULTI_DOMAIN_SETTINGS)
+        settings["DOWNLOAD_DELAY"] = 0
+        settings["AUTOTHROTTLE_START_DELAY"] = delay
+        return settings
+    if profile != "default":
+        raise ValueError(f"Perfil de crawl desconhecido: {profile}")
+    return {"DOWNLOAD_DELAY": delay}
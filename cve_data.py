@@ -1,18 +1,16 @@
 import os
 import requests
-import json
 import logging
-from pydantic import BaseModel
 from typing import List
 import time
 import argparse
+
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record, write_json
+from work_queue import add_queue_arguments, run_queued
 
-logging.basicConfig(level=logging.INFO)
-
-class CVEData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+CVEData = Record
 
 class NVDApiScraper:
     def __init__(self, api_key: str):
@@ -25,6 +23,7 @@ class NVDApiScraper:
         start_index: int = 0,
         results_per_page: int = 1000,
         max_results: int = 1000,
+        raise_errors: bool = False,
     ) -> List[CVEData]:
         data: List[CVEData] = []
         current_index = start_index
@@ -75,14 +74,15 @@ class NVDApiScraper:
 
                 current_index += per_page
             except Exception as e:
+                if raise_errors:
+                    raise
                 logging.error(f"Erro ao coletar CVEs: {e}")
                 break
 
         return data
 
     def save_to_json(self, data: List[CVEData]):
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump([d.dict() for d in data], f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file)
         logging.info(f"Dados salvos em {self.output_file}")
 
 
@@ -106,21 +106,40 @@ def main() -> None:
         default="cve_data.json",
         help="Arquivo de saida",
     )
+    add_format_argument(parser)
+    add_profile_arguments(parser)
+    add_queue_arguments(parser, "cve")
 
     args = parser.parse_args()
 
     if not args.api_key:
         parser.error("API key nao informada e variavel NVD_API_KEY nao definida")
 
-    scraper = NVDApiScraper(api_key=args.api_key)
-    scraper.output_file = args.output
-    data = scraper.fetch_cves(
-        start_index=args.start_index,
-        results_per_page=args.results_per_page,
-        max_results=args.max_results,
-    )
-    scraper.save_to_json(data)
+    with profiled_from_args(args, args.output):
+        scraper = NVDApiScraper(api_key=args.api_key)
+        scraper.output_file = args.output
+        if args.queue:
+            # uma unidade por página da API
+            end = args.start_index + args.max_results
+            units = [
+                (f"cve-{index:07d}", {"start_index": index, "count": min(args.results_per_page, end - index)})
+                for index in range(args.start_index, end, args.results_per_page)
+            ]
+            run_queued(args, units, lambda unit: scraper.fetch_cves(
+                start_index=unit["start_index"], results_per_page=unit["count"], max_results=unit["count"],
+                raise_errors=True), source="cve")
+            return
+        data = scraper.fetch_cves(
+            start_index=args.start_index,
+            results_per_page=args.results_per_page,
+            max_results=args.max_results,
+        )
+        if args.format == "json":
+            scraper.save_to_json(data)
+        else:
+            save_records(data, scraper.output_file, args.format, source="cve", **format_options(args))
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
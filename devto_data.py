@@ -1,15 +1,13 @@
+import argparse
 import requests
-import json
 import logging
-from pydantic import BaseModel
 from typing import List
 
-logging.basicConfig(level=logging.INFO)
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record, write_json
 
-class DevToData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+DevToData = Record
 
 class DevToScraper:
     def __init__(self):
@@ -41,17 +39,27 @@ class DevToScraper:
         return data
 
     def save_to_json(self, data: List[DevToData]):
-        output = {
+        envelope = {
             "source": "devto",
             "category": "documentacao_tecnica",
             "document_type": "article",
-            "data": [d.dict() for d in data]
         }
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file, envelope=envelope)
         logging.info(f"Dados salvos em {self.output_file}")
 
-# Exemplo de uso
-scraper = DevToScraper()
-data = scraper.fetch_articles(tags=["documentation", "technicalwriting"])
-scraper.save_to_json(data)
\ No newline at end of file
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Coleta artigos do Dev.to por tag")
+    parser.add_argument("--tags", default="documentation,technicalwriting", help="Tags separadas por vírgula")
+    parser.add_argument("--per-page", type=int, default=100, help="Artigos por tag")
+    add_format_argument(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    scraper = DevToScraper()
+    with profiled_from_args(args, scraper.output_file):
+        data = scraper.fetch_articles(tags=[t.strip() for t in args.tags.split(",") if t.strip()], per_page=args.per_page)
+        if args.format == "json":
+            scraper.save_to_json(data)
+        else:
+            save_records(data, scraper.output_file, args.format, source="devto", **format_options(args))
\ No newline at end of file
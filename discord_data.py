@@ -1,22 +1,101 @@
 import argparse
 import asyncio
-import discord
 import json
 import logging
-from pydantic import BaseModel
-from typing import List
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from output_formats import add_format_argument, format_options, save_records
+from pii_scrub import PiiScrubber, add_scrub_arguments, scrubber_from_args
+from records import Record, dumps, write_json
+
+if TYPE_CHECKING:
+    import discord
+
+# Quantidade de mensagens entre gravações do checkpoint de cada canal
+CHECKPOINT_EVERY = 500
+# Mensagens coletadas no modo de um canal quando --limit não é informado
+DEFAULT_LIMIT = 100
+
+DiscordData = Record
+
+
+def to_record(message: "discord.Message", server_id: int, channel) -> DiscordData:
+    return DiscordData(
+        id=str(message.id),
+        content=message.content,
+        metadata={
+            "url": f"https://discord.com/channels/{server_id}/{channel.id}/{message.id}",
+            "timestamp": message.created_at.isoformat(),
+            "tags": [channel.name],
+            "language": "english",
+            "type": "message"
+        }
+    )
+
+
+class JsonlSink:
+    """Grava registros em JSONL à medida que chegam, com flush periódico."""
+
+    def __init__(self, path: str, flush_every: int = 100, scrubber: Optional[PiiScrubber] = None):
+        self.path = path
+        self.flush_every = flush_every
+        self.scrubber = scrubber
+        self.count = 0
+        self._file = open(path, "ab")
+
+    def write(self, record: DiscordData):
+        if self.scrubber is not None:
+            record = self.scrubber.scrub_record(record, "discord")
+            if record is None:
+                return
+        self._file.write(dumps(record) + b"\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
 
-logging.basicConfig(level=logging.INFO)
+    def flush(self):
+        self._file.flush()
 
-class DiscordData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+    def close(self):
+        self._file.close()
+        logging.info(f"{self.count} mensagens gravadas em {self.path}")
+        if self.scrubber is not None:
+            self.scrubber.report("discord")
+
+
+class ChannelCheckpoints:
+    """Último message id coletado por par servidor/canal, persistido em JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.state: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = {k: int(v) for k, v in json.load(f).items()}
+
+    @staticmethod
+    def key(server_id: int, channel_id: int) -> str:
+        return f"{server_id}:{channel_id}"
+
+    def get(self, server_id: int, channel_id: int) -> Optional[int]:
+        return self.state.get(self.key(server_id, channel_id))
+
+    def update(self, server_id: int, channel_id: int, message_id: int):
+        self.state[self.key(server_id, channel_id)] = message_id
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
 
 class DiscordScraper:
     def __init__(self, token: str):
+        import discord
+
         self.client = discord.Client(
-            intents=discord.Intents(messages=True, message_content=True)
+            intents=discord.Intents(guilds=True, messages=True, message_content=True)
         )
         self.token = token
         self.output_file = "discord_data.json"
@@ -27,26 +106,48 @@ class DiscordScraper:
             guild = self.client.get_guild(server_id)
             channel = guild.get_channel(channel_id)
             async for message in channel.history(limit=limit):
-                self.data.append(DiscordData(
-                    id=str(message.id),
-                    content=message.content,
-                    metadata={
-                        "url": f"https://discord.com/channels/{server_id}/{channel_id}/{message.id}",
-                        "timestamp": message.created_at.isoformat(),
-                        "tags": [channel.name],
-                        "language": "english",
-                        "type": "message"
-                    }
-                ))
+                self.data.append(to_record(message, server_id, channel))
         except Exception as e:
             logging.error(f"Erro ao coletar mensagens: {e}")
 
+    async def crawl_channel(
+        self,
+        server_id: int,
+        channel_id: int,
+        sink: JsonlSink,
+        checkpoints: ChannelCheckpoints,
+        semaphore: asyncio.Semaphore,
+        limit: Optional[int] = None,
+    ):
+        """Coleta um canal em ordem cronológica a partir do último checkpoint."""
+        import discord
+
+        async with semaphore:
+            try:
+                channel = self.client.get_channel(channel_id) or await self.client.fetch_channel(channel_id)
+                last_id = checkpoints.get(server_id, channel_id)
+                after = discord.Object(id=last_id) if last_id else None
+                count = 0
+                async for message in channel.history(limit=limit, after=after, oldest_first=True):
+                    sink.write(to_record(message, server_id, channel))
+                    checkpoints.update(server_id, channel_id, message.id)
+                    count += 1
+                    if count % CHECKPOINT_EVERY == 0:
+                        sink.flush()
+                        checkpoints.save()
+                logging.info(f"{count} novas mensagens em {server_id}/{channel_id}")
+            except Exception as e:
+                logging.error(f"Erro ao coletar {server_id}/{channel_id}: {e}")
+            finally:
+                sink.flush()
+                checkpoints.save()
+
     def save_to_json(self):
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump([d.dict() for d in self.data], f, indent=2, ensure_ascii=False)
+        write_json(self.data, self.output_file)
         logging.info(f"Dados salvos em {self.output_file}")
 
-    async def run(self, server_id: int, channel_id: int, limit: int = 100):
+    async def run(self, server_id: int, channel_id: int, limit: int = 100, output_format: str = "json",
+                  output_options: Optional[Dict] = None, scrubber: Optional[PiiScrubber] = None):
         @self.client.event
         async def on_ready():
             try:
@@ -60,20 +161,105 @@ class DiscordScraper:
             logging.error(f"Erro de conexão: {e}")
         finally:
             await self.client.close()
-            self.save_to_json()
+            if scrubber is not None:
+                self.data = scrubber.scrub(self.data, "discord")
+            if output_format == "json":
+                self.save_to_json()
+            else:
+                save_records(self.data, self.output_file, output_format, source="discord", **(output_options or {}))
+
+    async def run_many(
+        self,
+        channels: List[Tuple[int, int]],
+        output_file: str = "discord_data.jsonl",
+        checkpoint_file: str = "discord_checkpoints.json",
+        concurrency: int = 5,
+        limit: Optional[int] = None,
+        scrubber: Optional[PiiScrubber] = None,
+    ):
+        """Coleta vários canais com um único login, gravando em streaming.
+
+        O discord.py já respeita os buckets de rate limit da API REST; o
+        semáforo apenas limita quantos históricos são paginados ao mesmo tempo.
+        """
+        sink = JsonlSink(output_file, scrubber=scrubber)
+        checkpoints = ChannelCheckpoints(checkpoint_file)
+        started = False
+
+        @self.client.event
+        async def on_ready():
+            # on_ready é disparado novamente após reconexões do gateway
+            nonlocal started
+            if started:
+                return
+            started = True
+            semaphore = asyncio.Semaphore(concurrency)
+            try:
+                await asyncio.gather(*[
+                    self.crawl_channel(server_id, channel_id, sink, checkpoints, semaphore, limit)
+                    for server_id, channel_id in channels
+                ])
+            finally:
+                await self.client.close()
+
+        try:
+            await self.client.start(self.token)
+        except Exception as e:
+            logging.error(f"Erro de conexão: {e}")
+        finally:
+            await self.client.close()
+            sink.close()
+            checkpoints.save()
+
+
+def parse_channel_pairs(value: str) -> List[Tuple[int, int]]:
+    """Converte "servidor:canal,servidor:canal" em pares de inteiros."""
+    pairs = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            server_id, channel_id = item.split(":")
+            pairs.append((int(server_id), int(channel_id)))
+    return pairs
 
 
 async def main() -> None:
     parser = argparse.ArgumentParser(description="Coleta mensagens do Discord")
     parser.add_argument("--token", required=True, help="Token do bot")
-    parser.add_argument("--server", type=int, required=True, help="ID do servidor")
-    parser.add_argument("--channel", type=int, required=True, help="ID do canal")
-    parser.add_argument("--limit", type=int, default=100, help="Limite de mensagens")
+    parser.add_argument("--server", type=int, help="ID do servidor")
+    parser.add_argument("--channel", type=int, help="ID do canal")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Limite de mensagens por canal (0 = histórico completo; padrão: 100 com --channel, "
+                             "histórico completo com --channels)")
+    parser.add_argument("--channels", help="Pares servidor:canal separados por vírgula (modo multi-canal)")
+    parser.add_argument("--concurrency", type=int, default=5, help="Canais coletados simultaneamente")
+    parser.add_argument("--checkpoint", default="discord_checkpoints.json", help="Arquivo de checkpoints por canal")
+    parser.add_argument("--output", default="discord_data.jsonl", help="Arquivo JSONL do modo multi-canal")
+    # o modo multi-canal continua em JSONL, que pode ser retomado anexando ao arquivo
+    add_format_argument(parser)
+    add_scrub_arguments(parser)
     args = parser.parse_args()
 
     scraper = DiscordScraper(token=args.token)
-    await scraper.run(server_id=args.server, channel_id=args.channel, limit=args.limit)
+    if args.channels:
+        # o modo multi-canal retoma pelos checkpoints: sem --limit coleta o histórico inteiro
+        limit = args.limit or None
+        await scraper.run_many(
+            parse_channel_pairs(args.channels),
+            output_file=args.output,
+            checkpoint_file=args.checkpoint,
+            concurrency=args.concurrency,
+            limit=limit,
+            scrubber=scrubber_from_args(args),
+        )
+    else:
+        if args.server is None or args.channel is None:
+            parser.error("Informe --server e --channel ou --channels")
+        limit = DEFAULT_LIMIT if args.limit is None else args.limit or None
+        await scraper.run(server_id=args.server, channel_id=args.channel, limit=limit, output_format=args.format,
+                          output_options=format_options(args), scrubber=scrubber_from_args(args))
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
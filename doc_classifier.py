@@ -0,0 +1,70 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "doc_classifier_rules.json")
+FIELDS = ("url", "filename", "content")
+
+
+class KeywordClassifier:
+    """Classifica documentos por palavras-chave configuradas em arquivo.
+
+    Cada regra tem um ``type`` e listas de palavras-chave para ``url``,
+    ``filename`` e ``content``; vence a primeira regra (na ordem do arquivo)
+    com alguma palavra presente em qualquer campo. As regras são compiladas
+    uma vez em uma tabela de testes ordenada por prioridade, os campos curtos
+    são testados antes do conteúdo e cada campo é convertido para minúsculas
+    uma única vez por documento.
+    """
+
+    def __init__(self, rules: List[Dict], default: str = "documentation"):
+        self.default = default
+        compiled: List[Tuple[str, Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]] = []
+        for rule in rules:
+            compiled.append((rule["type"],) + tuple(
+                tuple(keyword.lower() for keyword in rule.get(field, [])) for field in FIELDS
+            ))
+        self.rules = tuple(compiled)
+        # campos sem nenhuma palavra-chave não precisam ser convertidos
+        self._uses = {field: any(rule[i + 1] for rule in compiled) for i, field in enumerate(FIELDS)}
+
+    @classmethod
+    def from_file(cls, path: str, ruleset: str, default: str = "documentation") -> "KeywordClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)[ruleset], default=default)
+
+    def classify(self, content: str = "", url: str = "", filename: str = "") -> str:
+        url = url.lower() if url and self._uses["url"] else ""
+        filename = filename.lower() if filename and self._uses["filename"] else ""
+        lowered = None
+        for doc_type, url_keywords, filename_keywords, content_keywords in self.rules:
+            for keyword in url_keywords:
+                if keyword in url:
+                    return doc_type
+            for keyword in filename_keywords:
+                if keyword in filename:
+                    return doc_type
+            if content_keywords and content:
+                # o conteúdo só é convertido se nenhuma regra anterior decidiu pelos campos curtos
+                if lowered is None:
+                    lowered = content.lower()
+                for keyword in content_keywords:
+                    if keyword in lowered:
+                        return doc_type
+        return self.default
+
+    def classify_batch(self, contents: Sequence[str], urls: Optional[Sequence[str]] = None,
+                       filenames: Optional[Sequence[str]] = None) -> List[str]:
+        """Classifica vários documentos de uma vez (listas paralelas)."""
+        count = len(contents)
+        urls = urls if urls is not None else [""] * count
+        filenames = filenames if filenames is not None else [""] * count
+        classify = self.classify
+        return [classify(c, u, f) for c, u, f in zip(contents, urls, filenames)]
+
+
+@lru_cache(maxsize=None)
+def get_classifier(ruleset: str) -> KeywordClassifier:
+    """Classificador compartilhado do conjunto de regras (DOC_CLASSIFIER_RULES sobrescreve o arquivo)."""
+    return KeywordClassifier.from_file(os.getenv("DOC_CLASSIFIER_RULES", DEFAULT_RULES_FILE), ruleset)
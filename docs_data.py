@@ -1,42 +1,37 @@
 import argparse
-import json
 import logging
 from urllib.parse import urlparse
 
-class SaveDocsPipeline:
-    def open_spider(self, spider):
-        self.items = []
-
-    def process_item(self, item, spider):
-        self.items.append(dict(item))
-        return item
-
-    def close_spider(self, spider):
-        output = {
-            "source": spider.source,
-            "category": "documentation",
-            "data": self.items,
-        }
-        with open("docs_data.json", "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
-        logging.info("Dados salvos em docs_data.json")
-
 import scrapy
 from scrapy.crawler import CrawlerProcess
+
+from crawl_frontier import canonicalize_url, frontier_settings
+from crawl_profiles import PROFILES, profile_settings
+from docs_pipeline import shard_settings
+from docs_sitemap import SitemapCrawlMixin
+from http_replay import with_replay
+from output_formats import PIPELINE_FORMATS, add_format_argument
+from profiling import add_profile_arguments, profiled_from_args
+from recrawl_cache import recrawl_settings
 
-logging.basicConfig(level=logging.INFO)
 
-class DocsSpider(scrapy.Spider):
+class DocsSpider(SitemapCrawlMixin, scrapy.Spider):
     name = "docs_spider"
+    output_prefix = "docs_data"
 
-    def __init__(self, start_url: str, *args, **kwargs):
+    def __init__(self, start_url: str, sitemap: bool = False, lastmod_file: str = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.start_urls = [start_url]
-        self.allowed_domains = [urlparse(start_url).netloc]
+        self.allowed_domains = [urlparse(start_url).hostname]
         self.source = self.allowed_domains[0]
+        self.sitemap_scope = canonicalize_url(start_url)
+        self.setup_sitemap(sitemap, lastmod_file)
 
     def parse(self, response):
-        for section in response.css("div.section"):
+        self.mark_crawled(response)
+        # páginas inalteradas no recrawl só são usadas para seguir links
+        sections = [] if response.meta.get("recrawl_unchanged") else response.css("div.section")
+        for section in sections:
             content = section.css("::text").getall()
             content = " ".join(content).strip()
             if content:
@@ -52,25 +47,47 @@ class DocsSpider(scrapy.Spider):
                     },
                 }
 
+        if self.sitemap_mode:
+            return
         for href in response.css("a::attr(href)").getall():
             if href.startswith("/") or urlparse(href).netloc == self.allowed_domains[0]:
                 yield response.follow(href, callback=self.parse)
 
 # Executar o crawler
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     parser = argparse.ArgumentParser(description="Docs spider")
     parser.add_argument("start_url", help="URL inicial a ser rastreada")
     parser.add_argument("--delay", type=int, default=2, help="Delay entre requisicoes")
     parser.add_argument("--user-agent", dest="user_agent", default="Mozilla/5.0",
                         help="User-Agent para as requisicoes")
+    parser.add_argument("--output-dir", default="docs_output", help="Diretorio dos shards JSONL")
+    parser.add_argument("--compress", action="store_true", help="Gera um unico .jsonl.gz ao final")
+    parser.add_argument("--job-dir", help="Diretorio de estado para retomar o crawl (JOBDIR)")
+    parser.add_argument("--sitemap", action="store_true",
+                        help="Descobre paginas via robots.txt/sitemap.xml em vez de seguir links")
+    parser.add_argument("--lastmod-file", default="sitemap_lastmod.json",
+                        help="Arquivo com o lastmod das paginas ja coletadas")
+    parser.add_argument("--recrawl-db", help="Cache SQLite para recrawl condicional (ETag/Last-Modified)")
+    parser.add_argument("--profile", choices=PROFILES, default="default",
+                        help="Perfil de crawl (broad: AutoThrottle e concorrencia por dominio)")
+    add_format_argument(parser, formats=PIPELINE_FORMATS)
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
-    process = CrawlerProcess(settings={
-        "USER_AGENT": args.user_agent,
-        "DOWNLOAD_DELAY": args.delay,
-        "ITEM_PIPELINES": {"__main__.SaveDocsPipeline": 300},
-        "LOG_LEVEL": "INFO",
-    })
+    with profiled_from_args(args, args.output_dir):
+        process = CrawlerProcess(settings=with_replay({
+            "USER_AGENT": args.user_agent,
+            **profile_settings(args.profile, args.delay),
+            "ITEM_PIPELINES": {"docs_pipeline.ShardedJsonlPipeline": 300},
+            "DOCS_OUTPUT_DIR": args.output_dir,
+            "DOCS_COMPRESS_OUTPUT": args.compress,
+            "DOCS_OUTPUT_FORMAT": args.format,
+            **shard_settings(args),
+            "LOG_LEVEL": "INFO",
+            **frontier_settings(args.job_dir),
+            **recrawl_settings(args.recrawl_db),
+        }))
 
-    process.crawl(DocsSpider, start_url=args.start_url)
-    process.start()
+        process.crawl(DocsSpider, start_url=args.start_url, sitemap=args.sitemap, lastmod_file=args.lastmod_file)
+        process.start()
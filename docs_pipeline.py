@@ -0,0 +1,189 @@
+import gzip
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional
+
+from twisted.internet import task
+
+from output_formats import (SHARD_MAX_BYTES, ParquetRecordWriter, ZstdJsonlShardWriter, format_options,
+                            next_shard_index)
+from records import VALIDATE, encode_jsonl, validate_records
+
+
+class JsonlShardWriter:
+    """Grava registros em shards JSONL, serializando em lotes.
+
+    Os registros ficam em um buffer de até ``batch_size`` itens e são
+    gravados de uma vez; ao atingir ``shard_max_items`` um novo shard
+    ``<prefix>-00001.jsonl`` é aberto. Com ``resume`` (crawl retomado), os
+    shards já presentes no diretório são mantidos e a numeração continua
+    depois deles.
+    """
+
+    def __init__(self, output_dir: str, prefix: str, batch_size: int = 500, shard_max_items: int = 50000,
+                 resume: bool = False):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.shard_max_items = shard_max_items
+        self.shards: List[str] = []
+        self.total = 0
+        self._buffer: List[dict] = []
+        self._file = None
+        self._shard_count = 0
+        os.makedirs(output_dir, exist_ok=True)
+        self._next_index = 0
+        if resume:
+            self._next_index = next_shard_index(output_dir, prefix, ".jsonl")
+            existing = (os.path.join(output_dir, f"{prefix}-{i:05d}.jsonl") for i in range(self._next_index))
+            self.shards = [path for path in existing if os.path.exists(path)]
+
+    def _open_shard(self):
+        path = os.path.join(self.output_dir, f"{self.prefix}-{self._next_index:05d}.jsonl")
+        self._next_index += 1
+        self._file = open(path, "wb")
+        self._shard_count = 0
+        self.shards.append(path)
+
+    def write(self, record: dict):
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        while self._buffer:
+            if self._file is None or self._shard_count >= self.shard_max_items:
+                if self._file is not None:
+                    self._file.close()
+                self._open_shard()
+            room = self.shard_max_items - self._shard_count
+            batch, self._buffer = self._buffer[:room], self._buffer[room:]
+            if VALIDATE:
+                validate_records(batch)
+            self._file.write(encode_jsonl(batch))
+            self._shard_count += len(batch)
+            self.total += len(batch)
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> List[str]:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.shards
+
+    def compress(self, remove_shards: bool = False) -> str:
+        """Concatena os shards em um único ``<prefix>.jsonl.gz``."""
+        path = os.path.join(self.output_dir, f"{self.prefix}.jsonl.gz")
+        with gzip.open(path, "wb") as out:
+            for shard in self.shards:
+                with open(shard, "rb") as f:
+                    shutil.copyfileobj(f, out)
+        if remove_shards:
+            for shard in self.shards:
+                os.remove(shard)
+        return path
+
+
+class ShardedJsonlPipeline:
+    """Pipeline Scrapy que grava os itens incrementalmente em shards JSONL.
+
+    Configuração (settings):
+        DOCS_OUTPUT_DIR: diretório de saída (padrão ``docs_output``)
+        DOCS_BATCH_SIZE: itens serializados por gravação
+        DOCS_SHARD_MAX_ITEMS: itens por shard
+        DOCS_FLUSH_INTERVAL: segundos entre flushes periódicos (0 desativa)
+        DOCS_COMPRESS_OUTPUT: gera ``<prefix>.jsonl.gz`` ao final e remove os shards
+        DOCS_OUTPUT_FORMAT: ``json`` (shards JSONL), ``parquet`` (``<prefix>.parquet``)
+            ou ``jsonl.zst`` (shards zstd com manifest)
+        DOCS_SHARD_MAX_BYTES: tamanho máximo de cada shard ``jsonl.zst``
+
+    Com ``JOBDIR`` (crawl retomável) a saída da execução anterior é mantida:
+    os shards continuam a numeração e o Parquet vai para ``<prefix>-<n>.parquet``.
+    """
+
+    def __init__(self, output_dir: str, batch_size: int, shard_max_items: int,
+                 flush_interval: float, compress: bool, output_format: str = "json",
+                 shard_max_bytes: int = SHARD_MAX_BYTES, resume: bool = False):
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.shard_max_bytes = shard_max_bytes
+        self.batch_size = batch_size
+        self.shard_max_items = shard_max_items
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.resume = resume
+        self.writer: Optional[JsonlShardWriter] = None
+        self.crawler = None
+        self._flush_loop: Optional[task.LoopingCall] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        pipeline = cls(
+            output_dir=settings.get("DOCS_OUTPUT_DIR", "docs_output"),
+            batch_size=settings.getint("DOCS_BATCH_SIZE", 500),
+            shard_max_items=settings.getint("DOCS_SHARD_MAX_ITEMS", 50000),
+            flush_interval=settings.getfloat("DOCS_FLUSH_INTERVAL", 30.0),
+            compress=settings.getbool("DOCS_COMPRESS_OUTPUT", False),
+            output_format=settings.get("DOCS_OUTPUT_FORMAT", "json"),
+            shard_max_bytes=settings.getint("DOCS_SHARD_MAX_BYTES", SHARD_MAX_BYTES),
+            resume=bool(settings.get("JOBDIR")),
+        )
+        pipeline.crawler = crawler
+        return pipeline
+
+    # Scrapy >= 2.14 deixará de passar o spider para os pipelines
+    def open_spider(self, spider=None):
+        spider = spider or self.crawler.spider
+        prefix = getattr(spider, "output_prefix", spider.name)
+        if self.output_format == "parquet":
+            # row groups são gravados quando enchem; sem flush periódico
+            self.writer = ParquetRecordWriter(self._parquet_path(prefix), source=prefix)
+            return
+        if self.output_format == "jsonl.zst":
+            self.writer = ZstdJsonlShardWriter(self.output_dir, prefix, self.shard_max_bytes,
+                                               self.shard_max_items, self.batch_size, resume=self.resume)
+        else:
+            self.writer = JsonlShardWriter(self.output_dir, prefix, self.batch_size, self.shard_max_items,
+                                           resume=self.resume)
+        if self.flush_interval > 0:
+            self._flush_loop = task.LoopingCall(self.writer.flush)
+            self._flush_loop.start(self.flush_interval, now=False)
+
+    def _parquet_path(self, prefix: str) -> str:
+        path = os.path.join(self.output_dir, f"{prefix}.parquet")
+        n = 1
+        while self.resume and os.path.exists(path):
+            path = os.path.join(self.output_dir, f"{prefix}-{n}.parquet")
+            n += 1
+        return path
+
+    def process_item(self, item, spider=None):
+        self.writer.write(dict(item))
+        return item
+
+    def close_spider(self, spider=None):
+        if self._flush_loop is not None and self._flush_loop.running:
+            self._flush_loop.stop()
+        if isinstance(self.writer, (ParquetRecordWriter, ZstdJsonlShardWriter)):
+            path = self.writer.close()
+            logging.info(f"{self.writer.total} itens salvos em {path}")
+            return
+        shards = self.writer.close()
+        if self.compress and shards:
+            path = self.writer.compress(remove_shards=True)
+            logging.info(f"{self.writer.total} itens salvos em {path}")
+        else:
+            logging.info(f"{self.writer.total} itens salvos em {len(shards)} shards em {self.output_dir}")
+
+
+def shard_settings(args) -> Dict:
+    """Settings de shards do pipeline a partir dos argumentos de ``add_format_argument``."""
+    options = format_options(args)
+    settings = {"DOCS_SHARD_MAX_BYTES": options["shard_max_bytes"]}
+    if options["shard_max_records"]:
+        settings["DOCS_SHARD_MAX_ITEMS"] = options["shard_max_records"]
+    return settings
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import scrapy
+from scrapy.utils.gz import gunzip
+from scrapy.utils.sitemap import Sitemap, sitemap_urls_from_robots
+
+from crawl_frontier import canonicalize_url
+from output_formats import parse_timestamp
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def unchanged_since(lastmod: str, previous: str) -> bool:
+    """Compara dois ``lastmod`` do sitemap como datas (formatos e fusos podem variar)."""
+    current, before = parse_timestamp(lastmod), parse_timestamp(previous)
+    if current is None or before is None:
+        # sem como comparar: melhor coletar de novo
+        return False
+    return current <= before
+
+
+class SitemapCrawlMixin:
+    """Modo de crawl guiado por robots.txt e sitemap.xml para os spiders de docs.
+
+    O spider define ``sitemap_scope`` (prefixo das páginas aceitas) e chama
+    ``mark_crawled(response)`` no callback de página. Somente URLs do sitemap
+    sob o escopo são agendadas, e páginas cujo ``lastmod`` não mudou desde o
+    último crawl (registrado em ``lastmod_file``) são ignoradas.
+    """
+
+    sitemap_mode = False
+    sitemap_scope = ""
+    lastmod_file = "sitemap_lastmod.json"
+
+    def setup_sitemap(self, sitemap: bool = False, lastmod_file: Optional[str] = None):
+        self.sitemap_mode = bool(sitemap)
+        if lastmod_file:
+            self.lastmod_file = lastmod_file
+        self.lastmod_state: Dict[str, str] = {}
+        if self.sitemap_mode and os.path.exists(self.lastmod_file):
+            with open(self.lastmod_file, "r", encoding="utf-8") as f:
+                self.lastmod_state = json.load(f)
+
+    async def start(self):
+        if self.sitemap_mode:
+            for request in self.sitemap_start_requests():
+                yield request
+        else:
+            async for request in super().start():
+                yield request
+
+    def start_requests(self):
+        # Scrapy < 2.13 não chama start()
+        if self.sitemap_mode:
+            yield from self.sitemap_start_requests()
+        else:
+            yield from super().start_requests()
+
+    def sitemap_start_requests(self):
+        parts = urlparse(self.sitemap_scope)
+        root = f"{parts.scheme}://{parts.netloc}"
+        yield scrapy.Request(
+            f"{root}/robots.txt",
+            callback=self.parse_robots,
+            errback=self.robots_failed,
+            dont_filter=True,
+            cb_kwargs={"root": root},
+        )
+
+    def default_sitemaps(self, root: str):
+        yield f"{root}/sitemap.xml"
+        scoped = self.sitemap_scope.rstrip("/") + "/sitemap.xml"
+        if scoped != f"{root}/sitemap.xml":
+            yield scoped
+
+    def in_sitemap_scope(self, url: str) -> bool:
+        return url == self.sitemap_scope or url.startswith(self.sitemap_scope.rstrip("/") + "/")
+
+    def parse_robots(self, response, root: str):
+        urls = list(sitemap_urls_from_robots(response.text, base_url=response.url))
+        for url in urls or self.default_sitemaps(root):
+            yield scrapy.Request(url, callback=self.parse_sitemap)
+
+    def robots_failed(self, failure):
+        root = failure.request.cb_kwargs["root"]
+        self.logger.info(f"robots.txt indisponível em {root}; usando sitemap.xml padrão")
+        for url in self.default_sitemaps(root):
+            yield scrapy.Request(url, callback=self.parse_sitemap)
+
+    def parse_sitemap(self, response):
+        body = response.body
+        if body[:2] == GZIP_MAGIC:
+            body = gunzip(body)
+        try:
+            sitemap = Sitemap(body)
+        except Exception as e:
+            self.logger.warning(f"Sitemap inválido em {response.url}: {e}")
+            return
+        if sitemap.type == "sitemapindex":
+            for entry in sitemap:
+                yield scrapy.Request(entry["loc"], callback=self.parse_sitemap)
+            return
+        scheduled = skipped = 0
+        for entry in sitemap:
+            # o <loc> vem do próprio site e é requisitado como está; a forma canônica
+            # só serve de chave para o escopo e o estado de lastmod
+            key = canonicalize_url(entry["loc"])
+            if not self.in_sitemap_scope(key):
+                continue
+            lastmod = entry.get("lastmod")
+            previous = self.lastmod_state.get(key)
+            if lastmod and previous and unchanged_since(lastmod, previous):
+                skipped += 1
+                continue
+            scheduled += 1
+            yield scrapy.Request(entry["loc"], callback=self.parse,
+                                 meta={"sitemap_lastmod": lastmod, "sitemap_key": key})
+        self.logger.info(f"{response.url}: {scheduled} páginas agendadas, {skipped} inalteradas")
+
+    def mark_crawled(self, response):
+        lastmod = response.meta.get("sitemap_lastmod")
+        if lastmod:
+            key = response.meta.get("sitemap_key") or canonicalize_url(response.url)
+            self.lastmod_state[key] = lastmod
+
+    def closed(self, reason):
+        if not self.sitemap_mode:
+            return
+        # outros spiders podem ter gravado o mesmo arquivo durante o crawl
+        state = {}
+        if os.path.exists(self.lastmod_file):
+            with open(self.lastmod_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        state.update(self.lastmod_state)
+        tmp_path = self.lastmod_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.lastmod_file)
+        logging.info(f"lastmod de {len(self.lastmod_state)} páginas salvo em {self.lastmod_file}")
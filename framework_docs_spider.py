@@ -1,13 +1,21 @@
 import scrapy
 from scrapy.crawler import CrawlerProcess
 import argparse
-import json
 import logging
-from pydantic import BaseModel
-from typing import List, Dict
+import os
+from typing import Dict
 from urllib.parse import urlparse, urljoin
-
-logging.basicConfig(level=logging.INFO)
+
+from crawl_frontier import canonicalize_url, frontier_settings
+from crawl_profiles import PROFILES, profile_settings
+from doc_classifier import get_classifier
+from docs_pipeline import shard_settings
+from docs_sitemap import SitemapCrawlMixin
+from http_replay import with_replay
+from output_formats import PIPELINE_FORMATS, add_format_argument
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record
+from recrawl_cache import recrawl_settings
 
 # Projetos suportados e respectivas URLs base
 PROJECT_URLS: Dict[str, str] = {
@@ -19,27 +27,29 @@ PROJECT_URLS: Dict[str, str] = {
 # Limite de profundidade dos links seguidos
 DEPTH_LIMIT = 2
 
-class FrameworkDocsData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+FrameworkDocsData = Record
 
-class FrameworkDocsSpider(scrapy.Spider):
+class FrameworkDocsSpider(SitemapCrawlMixin, scrapy.Spider):
     name = "framework_docs_spider"
 
-    def __init__(self, base_url: str, *args, **kwargs):
+    def __init__(self, base_url: str, sitemap: bool = False, lastmod_file: str = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.start_urls = [base_url]
-        self.allowed_domains = [urlparse(base_url).netloc]
+        self.allowed_domains = [urlparse(base_url).hostname]
         self.base_url = base_url.rstrip("/")
+        self.output_prefix = f"framework_docs_{urlparse(self.base_url).netloc}"
+        self.sitemap_scope = canonicalize_url(base_url)
+        self.setup_sitemap(sitemap, lastmod_file)
 
     def parse(self, response):
-        data = []
-        for section in response.css("div.section, article"):
+        self.mark_crawled(response)
+        # páginas inalteradas no recrawl só são usadas para seguir links
+        sections = [] if response.meta.get("recrawl_unchanged") else response.css("div.section, article")
+        for section in sections:
             content = section.css("::text").getall()
             content = " ".join([text.strip() for text in content if text.strip()])
             if content:
-                data.append(FrameworkDocsData(
+                yield FrameworkDocsData(
                     id=f"{response.url}_{section.css('::attr(id)').get('')}",
                     content=content,
                     metadata={
@@ -49,54 +59,68 @@ class FrameworkDocsSpider(scrapy.Spider):
                         "language": "markdown",
                         "type": self.classify_document(content, response.url)
                     }
-                ))
-        self.save_to_json(data, f"framework_docs_{urlparse(self.base_url).netloc}.json")
+                ).dict()
 
+        if self.sitemap_mode:
+            return
         for href in response.css("a::attr(href)").getall():
+            # a URL canônica só serve para o escopo e a deduplicação; a requisição usa a original
             abs_url = urljoin(response.url, href)
-            if abs_url.startswith(self.base_url):
+            if canonicalize_url(abs_url).startswith(self.base_url):
                 yield response.follow(abs_url, callback=self.parse)
 
     def classify_document(self, content: str, url: str) -> str:
-        """Classifica o tipo de documento conforme palavras-chave."""
-        url = url.lower()
-        content = content.lower()
-        if "setup" in url or "installation" in content:
-            return "deployment_guide"
-        if "api" in url or "endpoint" in content:
-            return "api_documentation"
-        if "monitor" in url or "metric" in content:
-            return "monitoring_guide"
-        return "documentation"
-
-    def save_to_json(self, data: List[FrameworkDocsData], filename: str):
-        output = {
-            "source": "framework_docs",
-            "category": "documentacao_tecnica",
-            "document_type": "mixed",
-            "data": [d.dict() for d in data]
-        }
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
-        logging.info(f"Dados salvos em {filename}")
+        """Classifica o tipo de documento conforme palavras-chave (regras "framework_docs")."""
+        return get_classifier("framework_docs").classify(content=content, url=url)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     parser = argparse.ArgumentParser(description="Spider para documentações de frameworks")
-    parser.add_argument("--project", choices=list(PROJECT_URLS.keys()), help="Projeto conhecido a ser coletado")
-    parser.add_argument("--base-url", help="URL base personalizada")
+    parser.add_argument("--project", action="append", default=[], choices=list(PROJECT_URLS.keys()),
+                        help="Projeto conhecido a ser coletado (pode ser repetido)")
+    parser.add_argument("--all-projects", action="store_true", help="Coleta todos os projetos de PROJECT_URLS")
+    parser.add_argument("--base-url", action="append", default=[], help="URL base personalizada (pode ser repetida)")
+    parser.add_argument("--profile", choices=PROFILES, default="default",
+                        help="Perfil de crawl; 'broad' para vários sites ao mesmo tempo")
     parser.add_argument("--delay", type=int, default=2, help="Delay entre requisições")
     parser.add_argument("--user-agent", default="Mozilla/5.0", help="User-Agent para o crawler")
+    parser.add_argument("--output-dir", default="docs_output", help="Diretório dos shards JSONL")
+    parser.add_argument("--compress", action="store_true", help="Gera um único .jsonl.gz ao final")
+    parser.add_argument("--job-dir", help="Diretório de estado para retomar o crawl (JOBDIR)")
+    parser.add_argument("--sitemap", action="store_true",
+                        help="Descobre páginas via robots.txt/sitemap.xml em vez de seguir links")
+    parser.add_argument("--lastmod-file", default="sitemap_lastmod.json",
+                        help="Arquivo com o lastmod das páginas já coletadas")
+    parser.add_argument("--recrawl-db", help="Cache SQLite para recrawl condicional (ETag/Last-Modified)")
+    add_format_argument(parser, formats=PIPELINE_FORMATS)
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
-    base_url = args.base_url or PROJECT_URLS.get(args.project)
-    if not base_url:
-        parser.error("Informe --project ou --base-url")
+    projects = list(PROJECT_URLS) if args.all_projects else args.project
+    base_urls = args.base_url + [PROJECT_URLS[p] for p in projects]
+    if not base_urls:
+        parser.error("Informe --project, --all-projects ou --base-url")
 
-    process = CrawlerProcess(settings={
+    settings = with_replay({
         "FEEDS": {},
         "USER_AGENT": args.user_agent,
-        "DOWNLOAD_DELAY": args.delay,
-        "DEPTH_LIMIT": DEPTH_LIMIT,
+        # no modo sitemap não há links seguidos; robots.txt -> índice -> sitemap não é profundidade
+        "DEPTH_LIMIT": 0 if args.sitemap else DEPTH_LIMIT,
+        "ITEM_PIPELINES": {"docs_pipeline.ShardedJsonlPipeline": 300},
+        "DOCS_OUTPUT_DIR": args.output_dir,
+        "DOCS_COMPRESS_OUTPUT": args.compress,
+        "DOCS_OUTPUT_FORMAT": args.format,
+        **shard_settings(args),
+        **profile_settings(args.profile, args.delay),
+        **recrawl_settings(args.recrawl_db),
     })
-    process.crawl(FrameworkDocsSpider, base_url=base_url)
-    process.start()
+    # Um crawler por site no mesmo processo: cada um com seu JOBDIR, todos
+    # compartilhando o reactor e a banda disponível.
+    with profiled_from_args(args, args.output_dir):
+        process = CrawlerProcess(settings=settings)
+        for base_url in base_urls:
+            job_dir = os.path.join(args.job_dir, urlparse(base_url).hostname) if args.job_dir else None
+            crawler = process.create_crawler(FrameworkDocsSpider)
+            crawler.settings.setdict(frontier_settings(job_dir), priority="cmdline")
+            process.crawl(crawler, base_url=base_url, sitemap=args.sitemap, lastmod_file=args.lastmod_file)
+        process.start()
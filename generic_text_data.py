@@ -1,50 +1,240 @@
-from datasets import load_dataset
 import json
 import logging
+import os
 import time
 import argparse
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Optional
+
+from output_formats import add_format_argument, format_options, save_records
+
+DEFAULT_TEXT_FIELD = "text"
+SHARD_MAX_BYTES = 256 * 1024 * 1024
+
+
+def select_text(item: dict, text_field: str = DEFAULT_TEXT_FIELD) -> str:
+    """Texto do exemplo conforme ``text_field``.
+
+    Aceita caminhos aninhados (``answers.text``) e alternativas separadas por
+    vírgula (``text,content``); a primeira não vazia é usada e listas de
+    strings são unidas por quebra de linha.
+    """
+    for candidate in text_field.split(","):
+        value = item
+        for key in candidate.strip().split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+            if value is None:
+                break
+        if isinstance(value, list):
+            value = "\n".join(v for v in value if isinstance(v, str))
+        if value:
+            return value if isinstance(value, str) else str(value)
+    return ""
+
+
+def _save_state(path: str, state: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def export_shard(dataset_name: str, split: str, shard: int, num_shards: int, output_dir: str,
+                 text_field: str = DEFAULT_TEXT_FIELD, max_samples: Optional[int] = None,
+                 shard_max_bytes: int = SHARD_MAX_BYTES, batch_size: int = 1000) -> int:
+    """Exporta o shard ``shard`` de ``num_shards`` do dataset em streaming (roda em um processo).
+
+    A saída é dividida em arquivos ``<prefixo>-s<shard>-<parte>.jsonl``; uma
+    nova parte começa quando o lote seguinte passaria de ``shard_max_bytes``.
+    Após cada lote gravado o estado (exemplos já exportados, parte e bytes da
+    parte atual) vai para ``<prefixo>-s<shard>.state.json``; numa nova
+    execução o shard continua desse ponto e descarta o que foi escrito depois
+    do último estado salvo.
+    """
+    prefix = os.path.join(output_dir, f"{dataset_name.replace('/', '__')}-s{shard:03d}")
+    state_path = prefix + ".state.json"
+    state = {"offset": 0, "part": 0, "bytes": 0, "done": False}
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state.update(json.load(f))
+    if state["done"]:
+        return 0
+
+    from datasets import load_dataset
+    from datasets.distributed import split_dataset_by_node
 
-logging.basicConfig(level=logging.INFO)
+    dataset = load_dataset(dataset_name, split=split, streaming=True)
+    dataset = split_dataset_by_node(dataset, rank=shard, world_size=num_shards)
+    if state["offset"]:
+        if state.get("dataset_state") and hasattr(dataset, "load_state_dict"):
+            dataset.load_state_dict(state["dataset_state"])
+        else:
+            dataset = dataset.skip(state["offset"])
+
+    def open_part(part: int, size: int):
+        path = f"{prefix}-{part:05d}.jsonl"
+        f = open(path, "r+b" if size else "wb")
+        f.truncate(size)
+        f.seek(size)
+        return f
+
+    url = f"https://huggingface.co/datasets/{dataset_name}"
+    tags = ["generic", dataset_name]
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    out = open_part(state["part"], state["bytes"])
+    exported = 0
+    lines = []
+
+    def flush():
+        nonlocal out
+        data = "".join(lines).encode("utf-8")
+        lines.clear()
+        if state["bytes"] and state["bytes"] + len(data) > shard_max_bytes:
+            out.close()
+            state["part"] += 1
+            state["bytes"] = 0
+            out = open_part(state["part"], 0)
+        out.write(data)
+        out.flush()
+        state["bytes"] += len(data)
+        if hasattr(dataset, "state_dict"):
+            state["dataset_state"] = dataset.state_dict()
+        _save_state(state_path, state)
+
+    try:
+        # um timestamp por lote em vez de um strftime por exemplo
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        for item in dataset:
+            if max_samples is not None and state["offset"] >= max_samples:
+                break
+            lines.append(encode({
+                "id": f"{shard}_{state['offset']}",
+                "content": select_text(item, text_field),
+                "metadata": {
+                    "url": url,
+                    "timestamp": timestamp,
+                    "tags": tags,
+                    "language": "english",
+                    "type": "text",
+                },
+            }) + "\n")
+            state["offset"] += 1
+            exported += 1
+            if len(lines) >= batch_size:
+                flush()
+                timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        state["done"] = True
+        flush()
+    finally:
+        out.close()
+    return exported
 
 class GenericTextScraper:
     def __init__(self, output_file: str = "generic_text_data.json"):
         self.output_file = output_file
 
-    def fetch_data(self, dataset_name: str, split: str = "train", max_samples: Optional[int] = None):
-        """Baixa amostras de um dataset do HuggingFace de forma incremental."""
+    def iter_records(self, dataset_name: str, split: str = "train", max_samples: Optional[int] = None,
+                     text_field: str = DEFAULT_TEXT_FIELD):
+        from datasets import load_dataset
+
         count = 0
+        dataset = load_dataset(dataset_name, split=split, streaming=True)
+        for item in dataset:
+            yield {
+                "id": str(count),
+                "content": select_text(item, text_field),
+                "metadata": {
+                    "url": f"https://huggingface.co/datasets/{dataset_name}",
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "tags": ["generic", dataset_name],
+                    "language": "english",
+                    "type": "text",
+                },
+            }
+            count += 1
+            if max_samples is not None and count >= max_samples:
+                break
+
+    def fetch_data(self, dataset_name: str, split: str = "train", max_samples: Optional[int] = None,
+                   text_field: str = DEFAULT_TEXT_FIELD, output_format: str = "json",
+                   output_options: Optional[Dict] = None):
+        """Baixa amostras de um dataset do HuggingFace de forma incremental."""
+        records = self.iter_records(dataset_name, split, max_samples, text_field)
         try:
-            dataset = load_dataset(dataset_name, split=split, streaming=True)
+            if output_format != "json":
+                save_records(records, self.output_file, output_format, source="huggingface", **(output_options or {}))
+                return
             with open(self.output_file, "w", encoding="utf-8") as f:
-                for item in dataset:
-                    record = {
-                        "id": str(count),
-                        "content": item.get("text", ""),
-                        "metadata": {
-                            "url": f"https://huggingface.co/datasets/{dataset_name}",
-                            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                            "tags": ["generic", dataset_name],
-                            "language": "english",
-                            "type": "text",
-                        },
-                    }
+                for record in records:
                     f.write(json.dumps(record, ensure_ascii=False) + "\n")
-                    count += 1
-                    if max_samples is not None and count >= max_samples:
-                        break
         except Exception as e:
             logging.error(f"Erro ao coletar {dataset_name}: {e}")
         logging.info(f"Dados salvos em {self.output_file}")
 
+    def export_sharded(self, dataset_name: str, output_dir: str, split: str = "train", num_shards: int = 8,
+                       workers: Optional[int] = None, max_samples: Optional[int] = None,
+                       text_field: str = DEFAULT_TEXT_FIELD, shard_max_bytes: int = SHARD_MAX_BYTES,
+                       batch_size: int = 1000) -> int:
+        """Exporta o dataset dividido em ``num_shards`` shards processados em paralelo.
+
+        Execuções repetidas com os mesmos parâmetros retomam cada shard de onde
+        parou; ``max_samples`` é dividido igualmente entre os shards.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        per_shard = -(-max_samples // num_shards) if max_samples is not None else None
+        total = 0
+        with ProcessPoolExecutor(max_workers=workers or min(num_shards, os.cpu_count() or 1)) as pool:
+            futures = {
+                pool.submit(export_shard, dataset_name, split, shard, num_shards, output_dir,
+                            text_field, per_shard, shard_max_bytes, batch_size): shard
+                for shard in range(num_shards)
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    count = future.result()
+                except Exception as e:
+                    logging.error(f"Erro no shard {shard} de {dataset_name}: {e}")
+                    continue
+                total += count
+                logging.info(f"Shard {shard}: {count} exemplos exportados")
+        logging.info(f"{total} exemplos exportados para {output_dir}")
+        return total
+
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     parser = argparse.ArgumentParser(description="Coleta textos genéricos de datasets do HuggingFace")
     parser.add_argument("dataset_name", help="Nome do dataset no HuggingFace")
     parser.add_argument("--split", default="train", help="Split a ser utilizado")
     parser.add_argument("--max_samples", type=int, default=None, help="Número máximo de amostras")
     parser.add_argument("--output_file", default="generic_text_data.json", help="Arquivo de saída")
+    parser.add_argument("--text_field", default=DEFAULT_TEXT_FIELD,
+                        help="Campo do texto; aceita caminho aninhado (a.b) e alternativas (text,content)")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Exporta em N shards paralelos e retomáveis (em --output_dir)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos usados na exportação em shards")
+    parser.add_argument("--output_dir", default="generic_text_output", help="Diretório da exportação em shards")
+    parser.add_argument("--shard_max_mb", type=int, default=256, help="Tamanho máximo de cada arquivo de saída (MB)")
+    parser.add_argument("--batch_size", type=int, default=1000, help="Exemplos serializados por gravação")
+    # "json" grava JSONL; a exportação em shards (--shards) é sempre JSONL
+    add_format_argument(parser)
     args = parser.parse_args()
 
     scraper = GenericTextScraper(output_file=args.output_file)
-    scraper.fetch_data(dataset_name=args.dataset_name, split=args.split, max_samples=args.max_samples)
+    if args.shards:
+        scraper.export_sharded(
+            dataset_name=args.dataset_name,
+            output_dir=args.output_dir,
+            split=args.split,
+            num_shards=args.shards,
+            workers=args.workers,
+            max_samples=args.max_samples,
+            text_field=args.text_field,
+            shard_max_bytes=args.shard_max_mb * 1024 * 1024,
+            batch_size=args.batch_size,
+        )
+    else:
+        scraper.fetch_data(dataset_name=args.dataset_name, split=args.split, max_samples=args.max_samples,
+                           text_field=args.text_field, output_format=args.format,
+                           output_options=format_options(args))
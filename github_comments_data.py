@@ -1,20 +1,19 @@
-import requests
-import json
+import argparse
 import logging
-from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
-logging.basicConfig(level=logging.INFO)
+from github_tokens import TokenPool, add_pool_arguments, default_tokens, fetch_many, pool_from_args, read_repos
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from pii_scrub import add_scrub_arguments, scrub_records
+from records import Record, write_json
 
-class GitHubCommentData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+GitHubCommentData = Record
 
 class GitHubCommentScraper:
-    def __init__(self, token: str):
+    def __init__(self, token: Optional[str] = None, pool: Optional[TokenPool] = None):
         self.base_url = "https://api.github.com"
-        self.headers = {"Authorization": f"Bearer {token}"}
+        self.pool = pool or TokenPool([token] if token else [])
         self.output_file = "github_comments_data.json"
 
     def fetch_comments(self, repo: str, pages: int = 5) -> List[GitHubCommentData]:
@@ -23,9 +22,8 @@ class GitHubCommentScraper:
             try:
                 # Coletar comentários de issues
                 params = {"page": page, "per_page": 100}
-                response = requests.get(
+                response = self.pool.get(
                     f"{self.base_url}/repos/{repo}/issues/comments",
-                    headers=self.headers,
                     params=params
                 )
                 response.raise_for_status()
@@ -44,14 +42,37 @@ class GitHubCommentScraper:
                     ))
             except Exception as e:
                 logging.error(f"Erro ao coletar comentários de {repo}, página {page}: {e}")
+        logging.info(f"{repo}: {len(data)} comentários")
         return data
 
     def save_to_json(self, data: List[GitHubCommentData]):
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump([d.dict() for d in data], f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file)
         logging.info(f"Dados salvos em {self.output_file}")
 
-# Exemplo de uso
-scraper = GitHubCommentScraper(token="SEU_TOKEN")
-data = scraper.fetch_comments(repo="kubernetes/kubernetes", pages=5)
-scraper.save_to_json(data)
\ No newline at end of file
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Coleta comentários de issues de repositórios GitHub")
+    parser.add_argument("--repo", default=None,
+                        help="Repositório(s) no formato owner/repo, separados por vírgula (padrão: kubernetes/kubernetes)")
+    parser.add_argument("--token", default=default_tokens(),
+                        help="Token(s) de acesso do GitHub, separados por vírgula (ou GITHUB_TOKENS/GITHUB_TOKEN)")
+    parser.add_argument("--pages", type=int, default=5, help="Número de páginas a coletar")
+    add_pool_arguments(parser)
+    add_format_argument(parser)
+    add_profile_arguments(parser)
+    add_scrub_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error("Token não informado e GITHUB_TOKENS/GITHUB_TOKEN ausentes")
+    repos = read_repos(args.repo, args.repos_file) or ["kubernetes/kubernetes"]
+
+    scraper = GitHubCommentScraper(pool=pool_from_args(args))
+    with profiled_from_args(args, scraper.output_file):
+        data = fetch_many(lambda repo: scraper.fetch_comments(repo=repo, pages=args.pages),
+                          repos, scraper.pool.max_connections)
+        data = scrub_records(data, "github_comments", args)
+        if args.format == "json":
+            scraper.save_to_json(data)
+        else:
+            save_records(data, scraper.output_file, args.format, source="github_comments", **format_options(args))
\ No newline at end of file
@@ -1,22 +1,18 @@
-import requests
-import json
 import logging
-import os
 import argparse
-from pydantic import BaseModel
-from typing import List
-
-logging.basicConfig(level=logging.INFO)
+from typing import List, Optional
+
+from github_tokens import TokenPool, add_pool_arguments, default_tokens, fetch_many, pool_from_args, read_repos
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record, write_json
 
-class GitHubData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+GitHubData = Record
 
 class GitHubScraper:
-    def __init__(self, token: str):
+    def __init__(self, token: Optional[str] = None, pool: Optional[TokenPool] = None):
         self.base_url = "https://api.github.com"
-        self.headers = {"Authorization": f"Bearer {token}"}
+        self.pool = pool or TokenPool([token] if token else [])
         self.output_file = "github_issues.json"
 
     def fetch_issues(self, repo: str, max_pages: int = 5) -> List[GitHubData]:
@@ -27,7 +23,7 @@ class GitHubScraper:
 
         while url and page < max_pages:
             try:
-                response = requests.get(url, headers=self.headers, params=params)
+                response = self.pool.get(url, params=params)
                 response.raise_for_status()
                 items = response.json()
                 for item in items:
@@ -58,23 +54,36 @@ class GitHubScraper:
             params = None  # next_url já possui os parâmetros
             page += 1
 
+        logging.info(f"{repo}: {len(data)} issues")
         return data
 
     def save_to_json(self, data: List[GitHubData]):
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump([d.dict() for d in data], f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file)
         logging.info(f"Dados salvos em {self.output_file}")
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Coleta issues de um repositório GitHub")
-    parser.add_argument("--repo", required=True, help="Repositório no formato owner/repo")
-    parser.add_argument("--token", default=os.getenv("GITHUB_TOKEN"), help="Token de acesso do GitHub")
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Coleta issues de repositórios GitHub")
+    parser.add_argument("--repo", default=None, help="Repositório(s) no formato owner/repo, separados por vírgula")
+    parser.add_argument("--token", default=default_tokens(),
+                        help="Token(s) de acesso do GitHub, separados por vírgula (ou GITHUB_TOKENS/GITHUB_TOKEN)")
     parser.add_argument("--max-pages", type=int, default=5, help="Número máximo de páginas a coletar")
+    add_pool_arguments(parser)
+    add_format_argument(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
     if not args.token:
-        parser.error("Token não informado e GITHUB_TOKEN ausente")
+        parser.error("Token não informado e GITHUB_TOKENS/GITHUB_TOKEN ausentes")
+    repos = read_repos(args.repo, args.repos_file)
+    if not repos:
+        parser.error("Informe --repo ou --repos-file")
 
-    scraper = GitHubScraper(token=args.token)
-    data = scraper.fetch_issues(repo=args.repo, max_pages=args.max_pages)
-    scraper.save_to_json(data)
+    scraper = GitHubScraper(pool=pool_from_args(args))
+    with profiled_from_args(args, scraper.output_file):
+        data = fetch_many(lambda repo: scraper.fetch_issues(repo=repo, max_pages=args.max_pages),
+                          repos, scraper.pool.max_connections)
+        if args.format == "json":
+            scraper.save_to_json(data)
+        else:
+            save_records(data, scraper.output_file, args.format, source="github_issues", **format_options(args))
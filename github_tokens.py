@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Cota por hora da API REST do GitHub (autenticada / anônima), usada até a primeira resposta
+AUTHENTICATED_LIMIT = 5000
+ANONYMOUS_LIMIT = 60
+# Folga depois do reset informado pelo GitHub antes de reutilizar o token
+RESET_MARGIN = 1.0
+WORKERS_PER_TOKEN = 4
+
+
+class _TokenState:
+    __slots__ = ("token", "remaining", "reset_at", "in_flight")
+
+    def __init__(self, token: Optional[str]):
+        self.token = token
+        self.remaining = AUTHENTICATED_LIMIT if token else ANONYMOUS_LIMIT
+        self.reset_at = 0.0
+        self.in_flight = 0
+
+    @property
+    def label(self) -> str:
+        return f"...{self.token[-4:]}" if self.token else "anônimo"
+
+
+class TokenPool:
+    """Distribui as requisições à API do GitHub entre vários tokens.
+
+    Cada requisição usa o token com mais cota restante (descontando as
+    requisições em andamento), segundo os cabeçalhos ``X-RateLimit-*`` das
+    respostas anteriores. Um token sem cota fica parado até o horário de reset;
+    se todos estiverem parados, ``get`` espera o primeiro reset. Respostas de
+    limite (403/429) são repetidas com outro token. A sessão HTTP é
+    compartilhada entre as threads, com um pool de conexões do tamanho de
+    ``max_connections``.
+    """
+
+    def __init__(self, tokens: Sequence[Optional[str]] = (), max_connections: int = 32):
+        self.states = [_TokenState(token) for token in dict.fromkeys(tokens or [None])]
+        self.max_connections = max_connections
+        self.lock = threading.Condition()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def _acquire(self) -> _TokenState:
+        with self.lock:
+            while True:
+                now = time.time()
+                for state in self.states:
+                    if state.remaining <= 0 and state.reset_at <= now:
+                        state.remaining = AUTHENTICATED_LIMIT if state.token else ANONYMOUS_LIMIT
+                available = [s for s in self.states if s.remaining - s.in_flight > 0]
+                if available:
+                    state = max(available, key=lambda s: s.remaining - s.in_flight)
+                    state.in_flight += 1
+                    return state
+                wake = min((s.reset_at for s in self.states if s.reset_at > now), default=now + RESET_MARGIN)
+                self.lock.wait(wake - now)
+
+    def _release(self, state: _TokenState, response: Optional[requests.Response]):
+        with self.lock:
+            state.in_flight -= 1
+            if response is not None:
+                headers = response.headers
+                remaining = headers.get("X-RateLimit-Remaining")
+                reset = headers.get("X-RateLimit-Reset")
+                if remaining is not None and remaining.isdigit():
+                    state.remaining = int(remaining)
+                if reset is not None and reset.isdigit():
+                    state.reset_at = int(reset) + RESET_MARGIN
+                if self._rate_limited(response):
+                    # limite secundário: o GitHub informa a espera em Retry-After
+                    retry_after = headers.get("Retry-After")
+                    if retry_after and retry_after.isdigit():
+                        state.reset_at = time.time() + int(retry_after)
+                    elif state.reset_at <= time.time():
+                        state.reset_at = time.time() + 60
+                    state.remaining = 0
+                    logging.warning(f"Token {state.label} sem cota até {time.strftime('%H:%M:%S', time.localtime(state.reset_at))}")
+            self.lock.notify_all()
+
+    @staticmethod
+    def _rate_limited(response: requests.Response) -> bool:
+        if response.status_code == 429:
+            return True
+        return response.status_code == 403 and (
+            response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+        )
+
+    def get(self, url: str, headers: Optional[Dict] = None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", 30)
+        while True:
+            state = self._acquire()
+            response = None
+            try:
+                request_headers = dict(headers or {})
+                if state.token:
+                    request_headers["Authorization"] = f"Bearer {state.token}"
+                response = self.session.get(url, headers=request_headers, **kwargs)
+            finally:
+                self._release(state, response)
+            if not self._rate_limited(response):
+                return response
+
+    def budget(self) -> int:
+        with self.lock:
+            return sum(max(state.remaining, 0) for state in self.states)
+
+
+def parse_tokens(value: Optional[str]) -> List[str]:
+    return [token.strip() for token in (value or "").split(",") if token.strip()]
+
+
+def default_tokens() -> Optional[str]:
+    return os.getenv("GITHUB_TOKENS") or os.getenv("GITHUB_TOKEN")
+
+
+def read_repos(value: Optional[str], repos_file: Optional[str] = None) -> List[str]:
+    """Repositórios de ``--repo`` (separados por vírgula) e de ``--repos-file`` (um por linha)."""
+    repos = [repo.strip() for repo in (value or "").split(",") if repo.strip()]
+    if repos_file:
+        with open(repos_file, encoding="utf-8") as f:
+            repos.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return list(dict.fromkeys(repos))
+
+
+def fetch_many(fetch: Callable[[str], List], repos: Iterable[str], workers: int) -> List:
+    """Executa ``fetch(repo)`` em paralelo e junta os resultados na ordem dos repositórios."""
+    repos = list(repos)
+    if workers <= 1 or len(repos) <= 1:
+        return [record for repo in repos for record in fetch(repo)]
+    with ThreadPoolExecutor(max_workers=min(workers, len(repos))) as executor:
+        results = list(executor.map(fetch, repos))
+    return [record for result in results for record in result]
+
+
+def add_pool_arguments(parser):
+    parser.add_argument("--repos-file", default=None, help="Arquivo com repositórios owner/repo, um por linha")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Repositórios coletados em paralelo (padrão: {WORKERS_PER_TOKEN} por token)")
+
+
+def workers_from_args(args) -> int:
+    return args.workers or WORKERS_PER_TOKEN * max(len(parse_tokens(args.token)), 1)
+
+
+def pool_from_args(args) -> TokenPool:
+    return TokenPool(parse_tokens(args.token), max_connections=workers_from_args(args))
@@ -1,23 +1,19 @@
 import argparse
-import json
 import logging
-import os
-from typing import List
+from typing import List, Optional
 
-import requests
-from pydantic import BaseModel
+from doc_classifier import get_classifier
+from github_tokens import TokenPool, add_pool_arguments, default_tokens, fetch_many, pool_from_args, read_repos
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record, write_json
 
-logging.basicConfig(level=logging.INFO)
-
-class GitHubWikiData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+GitHubWikiData = Record
 
 class GitHubWikiScraper:
-    def __init__(self, token: str | None = None):
+    def __init__(self, token: str | None = None, pool: Optional[TokenPool] = None):
         self.base_url = "https://api.github.com"
-        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.pool = pool or TokenPool([token] if token else [])
         self.output_file = "github_wiki_data.json"
 
     def fetch_wiki(self, repo: str) -> List[GitHubWikiData]:
@@ -26,7 +22,7 @@ class GitHubWikiScraper:
         def recurse(path: str = ""):
             url = f"{self.base_url}/repos/{repo}/contents/{path}".rstrip("/")
             try:
-                response = requests.get(url, headers=self.headers)
+                response = self.pool.get(url)
                 response.raise_for_status()
                 items = response.json()
                 if isinstance(items, dict) and items.get("type") == "file":
@@ -35,7 +31,8 @@ class GitHubWikiScraper:
                     if item["type"] == "dir":
                         recurse(item["path"])
                     elif item["type"] == "file" and item["name"].lower().endswith((".md", ".rst")):
-                        file_content = requests.get(item["download_url"]).text
+                        # download_url é servido fora da API e não consome cota
+                        file_content = self.pool.session.get(item["download_url"], timeout=30).text
                         data.append(
                             GitHubWikiData(
                                 id=item["sha"],
@@ -53,33 +50,35 @@ class GitHubWikiScraper:
                 logging.error(f"Erro ao coletar arquivos em {path}: {e}")
 
         recurse("")
+        logging.info(f"{repo}: {len(data)} arquivos")
         return data
 
 
     def classify_document(self, filename: str, content: str) -> str:
-        filename = filename.lower()
-        if "readme" in filename:
-            return "readme"
-        elif "contributing" in filename:
-            return "contributing"
-        elif "architecture" in filename or "architecture" in content.lower():
-            return "architecture_overview"
-        elif "api" in filename or "endpoint" in content.lower():
-            return "api_documentation"
-        return "documentation"
+        return get_classifier("github_wiki").classify(content=content, filename=filename)
 
     def save_to_json(self, data: List[GitHubWikiData]):
-        output = {"data": [d.dict() for d in data]}
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file, envelope={})
         logging.info(f"Dados salvos em {self.output_file}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     parser = argparse.ArgumentParser(description="Coleta arquivos de documentação do GitHub")
-    parser.add_argument("--repo", required=True, help="repositório no formato owner/name")
-    parser.add_argument("--token", default=os.getenv("GITHUB_TOKEN"), help="token de acesso opcional")
+    parser.add_argument("--repo", default=None, help="repositório(s) no formato owner/name, separados por vírgula")
+    parser.add_argument("--token", default=default_tokens(),
+                        help="token(s) de acesso opcionais, separados por vírgula (ou GITHUB_TOKENS/GITHUB_TOKEN)")
+    add_pool_arguments(parser)
+    add_format_argument(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    repos = read_repos(args.repo, args.repos_file)
+    if not repos:
+        parser.error("Informe --repo ou --repos-file")
 
-    scraper = GitHubWikiScraper(token=args.token)
-    data = scraper.fetch_wiki(repo=args.repo)
-    scraper.save_to_json(data)
+    scraper = GitHubWikiScraper(pool=pool_from_args(args))
+    with profiled_from_args(args, scraper.output_file):
+        data = fetch_many(scraper.fetch_wiki, repos, scraper.pool.max_connections)
+        if args.format == "json":
+            scraper.save_to_json(data)
+        else:
+            save_records(data, scraper.output_file, args.format, source="github_wiki", **format_options(args))
@@ -0,0 +1,337 @@
+import argparse
+import atexit
+import hashlib
+import io
+import json
+import logging
+import os
+import runpy
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+MODES = ("record", "replay")
+# Parâmetros de query com credenciais: ficam fora da chave e da URL gravada
+SECRET_PARAMS = frozenset({"apikey", "api_key", "access_token", "client_secret", "token"})
+
+_STORES: Dict[str, "FixtureStore"] = {}
+
+
+def canonical_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+
+
+def exchange_key(method: str, url: str, body=None) -> str:
+    """Chave da troca: método, URL canônica (sem credenciais) e hash do corpo."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{method.upper()} {canonical_url(url)}\n".encode("utf-8"))
+    if body:
+        digest.update(body.encode("utf-8") if isinstance(body, str) else body)
+    return digest.hexdigest()
+
+
+class FixtureStore:
+    """Trocas HTTP gravadas em SQLite, indexadas por ``(chave, sequência)``.
+
+    Requisições idênticas repetidas na gravação ganham sequências 0, 1, 2...
+    e são reproduzidas na mesma ordem; passado o fim, a última se repete.
+    Os corpos ficam comprimidos com zlib. A conexão é compartilhada entre
+    threads, protegida por um lock.
+    """
+
+    def __init__(self, path: str, commit_every: int = 100):
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        self._counters: Dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS exchanges (
+                key TEXT,
+                seq INTEGER,
+                method TEXT,
+                url TEXT,
+                status INTEGER,
+                headers TEXT,
+                body BLOB,
+                elapsed REAL,
+                PRIMARY KEY (key, seq)
+            );
+            """
+        )
+
+    def put(self, method: str, url: str, body, status: int, headers: List[Tuple[str, str]],
+            content: bytes, elapsed: float):
+        key = exchange_key(method, url, body)
+        with self.lock:
+            seq = self._counters[key]
+            self._counters[key] += 1
+            self.db.execute(
+                "INSERT OR REPLACE INTO exchanges VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, seq, method.upper(), canonical_url(url), status, json.dumps(headers),
+                 zlib.compress(content), elapsed),
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self.db.commit()
+                self._pending = 0
+
+    def get(self, method: str, url: str, body=None) -> Optional[Dict]:
+        key = exchange_key(method, url, body)
+        with self.lock:
+            seq = self._counters[key]
+            self._counters[key] += 1
+            row = self.db.execute(
+                "SELECT status, headers, body, elapsed FROM exchanges WHERE key = ? AND seq <= ? "
+                "ORDER BY seq DESC LIMIT 1",
+                (key, seq),
+            ).fetchone()
+        if row is None:
+            return None
+        status, headers, content, elapsed = row
+        return {"status": status, "headers": json.loads(headers), "body": zlib.decompress(content),
+                "elapsed": elapsed}
+
+    def summary(self) -> List[Tuple[str, int, int]]:
+        """``(host, trocas, bytes comprimidos)`` por host."""
+        totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        with self.lock:
+            for url, size in self.db.execute("SELECT url, LENGTH(body) FROM exchanges"):
+                total = totals[urlsplit(url).netloc]
+                total[0] += 1
+                total[1] += size
+        return sorted((host, count, size) for host, (count, size) in totals.items())
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+            self._pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+
+def get_store(path: str) -> FixtureStore:
+    """Store única por arquivo no processo (requests e Scrapy compartilham a mesma)."""
+    store = _STORES.get(path)
+    if store is None:
+        store = _STORES[path] = FixtureStore(path)
+        atexit.register(store.close)
+    return store
+
+
+def parse_latency(value: Optional[str]) -> Optional[float]:
+    """``None`` para usar a latência gravada; senão a espera fixa em segundos."""
+    if value in (None, ""):
+        return 0.0
+    if value == "recorded":
+        return None
+    return float(value)
+
+
+def replay_delay(latency: Optional[float], recorded: float) -> float:
+    return recorded if latency is None else latency
+
+
+# --- requests -----------------------------------------------------------------
+
+_ORIGINAL_SEND = None
+
+
+def install(mode: str, path: str, latency: Optional[float] = 0.0):
+    """Troca o transporte de todos os ``requests.Session`` do processo.
+
+    O ``HTTPAdapter.send`` é substituído na classe, então cobre tanto
+    ``requests.get`` quanto sessões com adapters próprios.
+    """
+    global _ORIGINAL_SEND
+    from requests.adapters import HTTPAdapter
+
+    if mode not in MODES:
+        raise ValueError(f"Modo desconhecido: {mode}")
+    store = get_store(path)
+    if _ORIGINAL_SEND is None:
+        _ORIGINAL_SEND = HTTPAdapter.send
+    original = _ORIGINAL_SEND
+
+    def record_send(adapter, request, **kwargs):
+        response = original(adapter, request, **kwargs)
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in ("content-encoding", "transfer-encoding")]
+        store.put(request.method, request.url, request.body, response.status_code, headers,
+                  response.content, response.elapsed.total_seconds())
+        return response
+
+    def replay_send(adapter, request, **kwargs):
+        import requests
+
+        exchange = store.get(request.method, request.url, request.body)
+        if exchange is None:
+            raise requests.ConnectionError(f"Sem gravação para {request.method} {request.url}", request=request)
+        delay = replay_delay(latency, exchange["elapsed"])
+        if delay:
+            time.sleep(delay)
+        return _build_response(adapter, request, exchange)
+
+    HTTPAdapter.send = record_send if mode == "record" else replay_send
+    logging.info(f"Transporte HTTP em modo {mode} ({path})")
+
+
+def uninstall():
+    global _ORIGINAL_SEND
+    from requests.adapters import HTTPAdapter
+
+    if _ORIGINAL_SEND is not None:
+        HTTPAdapter.send = _ORIGINAL_SEND
+        _ORIGINAL_SEND = None
+
+
+def _build_response(adapter, request, exchange: Dict):
+    from requests import Response
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    response = Response()
+    response.status_code = exchange["status"]
+    response.headers = CaseInsensitiveDict(exchange["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = exchange["body"]
+    response.raw = io.BytesIO(exchange["body"])
+    response.reason = "Replayed"
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    response.elapsed = timedelta(seconds=exchange["elapsed"])
+    return response
+
+
+# --- Scrapy -------------------------------------------------------------------
+
+class ReplayMiddleware:
+    """Downloader middleware que grava ou reproduz as respostas do Scrapy.
+
+    Fica junto ao downloader (depois da descompressão, do retry e do cache de
+    recrawl), então grava o corpo como veio da rede e as respostas reproduzidas
+    passam pelos mesmos middlewares que as reais. A latência da reprodução é
+    uma espera não bloqueante no reactor.
+    """
+
+    def __init__(self, store: FixtureStore, mode: str, latency: Optional[float], stats):
+        self.store = store
+        self.mode = mode
+        self.latency = latency
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        from scrapy import signals
+        from scrapy.exceptions import NotConfigured
+
+        settings = crawler.settings
+        mode = settings.get("HTTP_REPLAY_MODE")
+        path = settings.get("HTTP_REPLAY_FILE")
+        if mode not in MODES or not path:
+            raise NotConfigured("HTTP_REPLAY_MODE/HTTP_REPLAY_FILE não definidos")
+        store = get_store(path)
+        crawler.signals.connect(store.commit, signal=signals.engine_stopped, weak=False)
+        return cls(store, mode, parse_latency(settings.get("HTTP_REPLAY_LATENCY")), crawler.stats)
+
+    async def process_request(self, request, spider=None):
+        if self.mode != "replay":
+            return None
+        from scrapy.exceptions import IgnoreRequest
+        from scrapy.http import Headers
+        from scrapy.responsetypes import responsetypes
+        from scrapy.utils.defer import maybe_deferred_to_future
+        from twisted.internet import reactor
+        from twisted.internet.task import deferLater
+
+        exchange = self.store.get(request.method, request.url, request.body)
+        if exchange is None:
+            self.stats.inc_value("http_replay/missing")
+            raise IgnoreRequest(f"Sem gravação para {request.method} {request.url}")
+        delay = replay_delay(self.latency, exchange["elapsed"])
+        if delay:
+            await maybe_deferred_to_future(deferLater(reactor, delay, lambda: None))
+        self.stats.inc_value("http_replay/replayed")
+        headers = Headers(exchange["headers"])
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=exchange["body"])
+        return respcls(url=request.url, status=exchange["status"], headers=headers, body=exchange["body"],
+                       request=request, flags=["replayed"])
+
+    def process_response(self, request, response, spider=None):
+        if self.mode == "record" and "replayed" not in response.flags:
+            headers = [(k.decode("latin-1"), v.decode("latin-1"))
+                       for k, values in response.headers.items() for v in values]
+            self.store.put(request.method, request.url, request.body, response.status, headers,
+                           response.body, request.meta.get("download_latency", 0.0))
+            self.stats.inc_value("http_replay/recorded")
+        return response
+
+
+def with_replay(settings: Dict) -> Dict:
+    """Acrescenta às settings do Scrapy o ``ReplayMiddleware`` se ``HTTP_REPLAY_MODE`` estiver definido."""
+    mode = os.getenv("HTTP_REPLAY_MODE")
+    if not mode:
+        return settings
+    middlewares = dict(settings.get("DOWNLOADER_MIDDLEWARES", {}))
+    # acima do HttpCompressionMiddleware (590) e das estatísticas (850): vê o corpo da rede
+    middlewares["http_replay.ReplayMiddleware"] = 950
+    return {
+        **settings,
+        "HTTP_REPLAY_MODE": mode,
+        "HTTP_REPLAY_FILE": os.getenv("HTTP_REPLAY_FILE", "http_fixtures.sqlite"),
+        "HTTP_REPLAY_LATENCY": os.getenv("HTTP_REPLAY_LATENCY", ""),
+        "DOWNLOADER_MIDDLEWARES": middlewares,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Grava ou reproduz as requisições HTTP de um scraper",
+        usage="%(prog)s [--latency S|recorded] {record,replay,summary} fixtures [script.py args...]",
+    )
+    parser.add_argument("mode", choices=MODES + ("summary",))
+    parser.add_argument("fixtures", help="Arquivo SQLite das gravações")
+    parser.add_argument("--latency", default="",
+                        help="Espera por resposta na reprodução, em segundos, ou 'recorded' para a latência gravada")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Script do scraper e seus argumentos")
+    args = parser.parse_args()
+
+    if args.mode == "summary":
+        for host, count, size in get_store(args.fixtures).summary():
+            logging.info(f"{host}: {count} trocas, {size / 1e6:.1f} MB")
+        return
+    if not args.command:
+        parser.error("Informe o script a executar")
+    script = args.command[0]
+
+    # os spiders Scrapy leem a configuração em with_replay()
+    os.environ["HTTP_REPLAY_MODE"] = args.mode
+    os.environ["HTTP_REPLAY_FILE"] = os.path.abspath(args.fixtures)
+    os.environ["HTTP_REPLAY_LATENCY"] = args.latency
+    install(args.mode, os.path.abspath(args.fixtures), parse_latency(args.latency))
+    sys.argv = list(args.command)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    started = time.perf_counter()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        logging.info(f"{script} ({args.mode}): {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,23 @@
 import argparse
-import json
 import logging
 from typing import List
 
 import requests
-from pydantic import BaseModel
+
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from pii_scrub import add_scrub_arguments, scrub_records
+from records import Record, write_json
+from work_queue import add_queue_arguments, run_queued
 
-logging.basicConfig(level=logging.INFO)
+JiraData = Record
 
-class JiraData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+# Envelope do JSON de saída (save_to_json e merge da fila)
+ENVELOPE = {
+    "source": "jira",
+    "category": "issues",
+    "document_type": "issue",
+}
 
 class JiraScraper:
     def __init__(self, email: str, api_token: str, base_url: str, output_file: str = "jira_data.json"):
@@ -19,7 +25,7 @@ class JiraScraper:
         self.auth = (email, api_token)
         self.output_file = output_file
 
-    def fetch_issues(self, project_key: str, max_results: int = 100) -> List[JiraData]:
+    def fetch_issues(self, project_key: str, max_results: int = 100, raise_errors: bool = False) -> List[JiraData]:
         data = []
         start_at = 0
         while True:
@@ -35,6 +41,8 @@ class JiraScraper:
                     params=params,
                 )
                 if response.status_code >= 400:
+                    if raise_errors:
+                        response.raise_for_status()
                     logging.error(
                         "Erro HTTP %s ao coletar issues: %s",
                         response.status_code,
@@ -62,37 +70,60 @@ class JiraScraper:
                     )
                 start_at += max_results
             except Exception as e:
+                if raise_errors:
+                    raise
                 logging.error(f"Erro ao coletar issues de {project_key}: {e}")
                 break
         return data
 
     def save_to_json(self, data: List[JiraData]):
-        output = {
-            "source": "jira",
-            "category": "issues",
-            "document_type": "issue",
-            "data": [d.dict() for d in data],
-        }
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file, envelope=ENVELOPE)
         logging.info(f"Dados salvos em {self.output_file}")
 
 
-if __name__ == "__main__":
+def main() -> None:
     parser = argparse.ArgumentParser(description="Coletar issues do Jira")
     parser.add_argument("--email", required=True, help="Email de acesso")
     parser.add_argument("--api_token", required=True, help="Token da API")
     parser.add_argument("--base_url", required=True, help="URL base do Jira")
-    parser.add_argument("--project_key", required=True, help="Chave do projeto")
+    parser.add_argument("--project_key", required=True, help="Chave do projeto (ou várias, separadas por vírgula)")
     parser.add_argument("--max_results", type=int, default=100, help="Quantidade de resultados por requisi\u00e7\u00e3o")
     parser.add_argument("--output", default="jira_data.json", help="Arquivo de sa\u00edda")
+    add_format_argument(parser)
+    add_profile_arguments(parser)
+    add_scrub_arguments(parser)
+    add_queue_arguments(parser, "jira")
     args = parser.parse_args()
 
-    scraper = JiraScraper(
-        email=args.email,
-        api_token=args.api_token,
-        base_url=args.base_url,
-        output_file=args.output,
-    )
-    issues = scraper.fetch_issues(project_key=args.project_key, max_results=args.max_results)
-    scraper.save_to_json(issues)
+    with profiled_from_args(args, args.output):
+        scraper = JiraScraper(
+            email=args.email,
+            api_token=args.api_token,
+            base_url=args.base_url,
+            output_file=args.output,
+        )
+        project_keys = [key.strip() for key in args.project_key.split(",") if key.strip()]
+        if args.queue:
+            # uma unidade por projeto
+            run_queued(
+                args,
+                [(f"project-{key}", {"project_key": key}) for key in project_keys],
+                lambda unit: scrub_records(
+                    scraper.fetch_issues(unit["project_key"], max_results=args.max_results, raise_errors=True),
+                    "jira", args),
+                source="jira",
+                envelope=ENVELOPE,
+            )
+            return
+        issues = [issue for key in project_keys
+                  for issue in scraper.fetch_issues(project_key=key, max_results=args.max_results)]
+        issues = scrub_records(issues, "jira", args)
+        if args.format == "json":
+            scraper.save_to_json(issues)
+        else:
+            save_records(issues, scraper.output_file, args.format, source="jira", **format_options(args))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
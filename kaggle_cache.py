@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_CACHE_DIR = "kaggle_cache"
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+DEFAULT_TTL = 3600
+# Nome usado na chave quando o dataset inteiro é baixado como um único zip
+WHOLE_DATASET = "*"
+CAMEL_RE = re.compile(r"(?<=[a-z0-9])([A-Z])")
+
+
+def kaggle_api():
+    """Cliente da API da Kaggle, importado só no primeiro uso.
+
+    O ``import kaggle`` já autentica (e falha sem credenciais); adiá-lo deixa
+    ``--help`` e execuções servidas pelo cache livres da rede e do kaggle.
+    """
+    import kaggle
+
+    return kaggle.api
+
+
+def _field(obj, name: str, default=None):
+    """Lê um campo de objetos da API da Kaggle ou de dicts (as versões da lib variam).
+
+    Versões antigas usam camelCase (``currentVersionNumber``) e as baseadas no
+    kagglesdk, snake_case (``current_version_number``); as duas são tentadas.
+    """
+    for candidate in dict.fromkeys((name, CAMEL_RE.sub(r"_\1", name).lower())):
+        value = obj.get(candidate) if isinstance(obj, dict) else getattr(obj, candidate, None)
+        if value is not None:
+            return value
+    return default
+
+
+def cache_key(dataset_ref: str, version: str, file_name: str) -> str:
+    return hashlib.sha256(f"{dataset_ref}@{version}/{file_name}".encode("utf-8")).hexdigest()
+
+
+class KaggleDownloadCache:
+    """Cache persistente dos arquivos baixados da Kaggle.
+
+    Cada arquivo é guardado em ``objects/`` sob o hash de (dataset, versão,
+    arquivo) e indexado em SQLite com tamanho e último acesso; acima de
+    ``max_bytes`` os arquivos usados há mais tempo são removidos. Os arquivos
+    ausentes são baixados em paralelo e as listagens de datasets e de arquivos
+    são memorizadas por ``ttl`` segundos.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: int = DEFAULT_TTL, workers: int = 4):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.workers = workers
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"))
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                key TEXT PRIMARY KEY,
+                dataset_ref TEXT,
+                version TEXT,
+                file_name TEXT,
+                path TEXT,
+                size INTEGER,
+                accessed REAL
+            );
+            CREATE INDEX IF NOT EXISTS files_accessed ON files (accessed);
+            CREATE TABLE IF NOT EXISTS calls (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                expires REAL
+            );
+            """
+        )
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+
+    # -- listagens memorizadas -------------------------------------------------
+
+    def _memoized(self, key: str, call):
+        row = self.db.execute("SELECT value, expires FROM calls WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] > time.time():
+            return json.loads(row[0])
+        value = call()
+        self.db.execute("INSERT OR REPLACE INTO calls VALUES (?, ?, ?)",
+                        (key, json.dumps(value), time.time() + self.ttl))
+        self.db.commit()
+        return value
+
+    def list_datasets(self, search: str) -> List[Dict]:
+        """``kaggle.api.dataset_list`` memorizado, como dicts com ref, versão e URL."""
+        def call():
+            return [
+                {
+                    "ref": str(_field(d, "ref")),
+                    "version": str(_field(d, "currentVersionNumber") or _field(d, "lastUpdated") or "latest"),
+                    "url": _field(d, "url") or f"https://www.kaggle.com/datasets/{_field(d, 'ref')}",
+                }
+                for d in kaggle_api().dataset_list(search=search)
+            ]
+        return self._memoized(f"dataset_list:{search}", call)
+
+    def list_files(self, dataset_ref: str) -> List[Dict]:
+        """``kaggle.api.dataset_list_files`` memorizado, como dicts com nome, data e tamanho."""
+        def call():
+            result = kaggle_api().dataset_list_files(dataset_ref)
+            return [
+                {
+                    "name": _field(f, "name"),
+                    "dateCreated": str(_field(f, "creationDate") or _field(f, "dateCreated") or ""),
+                    "size": _field(f, "totalBytes") or _field(f, "size") or 0,
+                }
+                for f in (_field(result, "files") or [])
+            ]
+        return self._memoized(f"dataset_list_files:{dataset_ref}", call)
+
+    def dataset_version(self, dataset_ref: str) -> str:
+        """Versão atual do dataset, buscada (e memorizada) pelo ref exato."""
+        def call():
+            api = kaggle_api()
+            if hasattr(api, "dataset_view"):
+                dataset = api.dataset_view(dataset_ref)
+                return str(_field(dataset, "currentVersionNumber") or _field(dataset, "lastUpdated") or "latest")
+            # sem dataset_view: busca pelo slug entre os datasets do dono e compara o ref inteiro
+            owner, _, slug = dataset_ref.partition("/")
+            for dataset in api.dataset_list(search=slug, user=owner):
+                if str(_field(dataset, "ref")) == dataset_ref:
+                    return str(_field(dataset, "currentVersionNumber") or _field(dataset, "lastUpdated") or "latest")
+            return "latest"
+        return self._memoized(f"dataset_version:{dataset_ref}", call)
+
+    # -- arquivos --------------------------------------------------------------
+
+    def get(self, dataset_ref: str, version: str, file_name: str) -> Optional[str]:
+        key = cache_key(dataset_ref, version, file_name)
+        row = self.db.execute("SELECT path FROM files WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if not os.path.exists(row[0]):
+            self._forget(key)
+            return None
+        self.db.execute("UPDATE files SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return row[0]
+
+    def _forget(self, key: str):
+        row = self.db.execute("SELECT size FROM files WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.total_bytes -= row[0]
+            self.db.execute("DELETE FROM files WHERE key = ?", (key,))
+            self.db.commit()
+
+    def _download(self, dataset_ref: str, version: str, file_name: str) -> str:
+        """Baixa um arquivo (ou o dataset inteiro) para ``objects/<hash>/``; roda nas threads."""
+        key = cache_key(dataset_ref, version, file_name)
+        target_dir = os.path.join(self.cache_dir, "objects", key[:2], key)
+        staging = tempfile.mkdtemp(prefix=".download-", dir=self.cache_dir)
+        try:
+            if file_name == WHOLE_DATASET:
+                kaggle_api().dataset_download_files(dataset_ref, path=staging, unzip=False, quiet=True)
+            else:
+                kaggle_api().dataset_download_file(dataset_ref, file_name, path=staging, force=True, quiet=True)
+            downloaded = os.listdir(staging)
+            if len(downloaded) != 1:
+                raise RuntimeError(f"download de {dataset_ref}/{file_name} gerou {len(downloaded)} arquivos")
+            shutil.rmtree(target_dir, ignore_errors=True)
+            os.makedirs(target_dir)
+            path = os.path.join(target_dir, downloaded[0])
+            os.replace(os.path.join(staging, downloaded[0]), path)
+            return path
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _store(self, dataset_ref: str, version: str, file_name: str, path: str):
+        key = cache_key(dataset_ref, version, file_name)
+        self._forget(key)
+        size = os.path.getsize(path)
+        self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, dataset_ref, version, file_name, path, size, time.time()))
+        self.total_bytes += size
+        self.db.commit()
+
+    def fetch(self, entries: Sequence[Tuple[str, str, str]]) -> Dict[Tuple[str, str, str], str]:
+        """Garante no cache os arquivos ``(dataset, versão, arquivo)`` e retorna seus caminhos.
+
+        Os ausentes são baixados em paralelo por ``workers`` threads; falhas são
+        registradas no log e o arquivo fica de fora do resultado.
+        """
+        paths: Dict[Tuple[str, str, str], str] = {}
+        missing = []
+        for entry in dict.fromkeys(entries):
+            path = self.get(*entry)
+            if path is not None:
+                paths[entry] = path
+            else:
+                missing.append(entry)
+        if missing:
+            logging.info(f"Cache Kaggle: {len(paths)} arquivos em cache, {len(missing)} a baixar")
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {entry: pool.submit(self._download, *entry) for entry in missing}
+                for entry, future in futures.items():
+                    try:
+                        path = future.result()
+                    except Exception as e:
+                        logging.error(f"Erro ao baixar {entry[0]}/{entry[2]}: {e}")
+                        continue
+                    # o índice só é alterado aqui, na thread principal
+                    self._store(*entry, path)
+                    paths[entry] = path
+            self.evict(keep=set(paths.values()))
+        return paths
+
+    def fetch_dataset(self, dataset_ref: str, version: Optional[str] = None) -> Optional[str]:
+        """Zip completo do dataset (na versão atual, se ``version`` não for informada)."""
+        entry = (dataset_ref, version or self.dataset_version(dataset_ref), WHOLE_DATASET)
+        return self.fetch([entry]).get(entry)
+
+    def evict(self, keep: frozenset = frozenset()):
+        """Remove arquivos LRU até ficar abaixo do limite, preservando os de ``keep``."""
+        if self.total_bytes <= self.max_bytes:
+            return
+        evicted = 0
+        victims = []
+        for key, path, size in self.db.execute("SELECT key, path, size FROM files ORDER BY accessed"):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            victims.append((key,))
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            self.total_bytes -= size
+            evicted += 1
+        self.db.executemany("DELETE FROM files WHERE key = ?", victims)
+        self.db.commit()
+        logging.info(f"Cache Kaggle: {evicted} arquivos removidos por limite de tamanho")
+
+    def close(self):
+        self.db.close()
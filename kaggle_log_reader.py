@@ -0,0 +1,108 @@
+import os
+import zipfile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+LOG_SUFFIXES = (".log", ".txt")
+WINDOWS = ("head", "tail", "sample")
+# Número de trechos lidos ao longo do arquivo no modo "sample"
+SAMPLE_SLICES = 4
+READ_BLOCK = 1 << 16
+# Trechos usados para ler o arquivo inteiro quando o texto é dividido por tokens depois
+TOKEN_CHUNKING_READ_BYTES = 1 << 20
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="ignore")
+
+
+def read_window(stream: BinaryIO, size: int, max_bytes: int, window: str = "head") -> str:
+    """Lê no máximo ``max_bytes`` de um arquivo de log sem carregá-lo inteiro.
+
+    ``head`` lê o início, ``tail`` o final e ``sample`` junta ``SAMPLE_SLICES``
+    trechos espaçados uniformemente ao longo do arquivo. Em membros de zip o
+    ``seek`` descomprime até a posição em blocos, sem manter o conteúdo.
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"Janela desconhecida: {window}")
+    if size <= max_bytes or window == "head":
+        return _decode(stream.read(max_bytes))
+    if window == "tail":
+        stream.seek(size - max_bytes)
+        raw = stream.read(max_bytes)
+        # descarta a linha cortada no início da janela
+        newline = raw.find(b"\n")
+        return _decode(raw[newline + 1:] if 0 <= newline < len(raw) - 1 else raw)
+    slice_bytes = max_bytes // SAMPLE_SLICES
+    step = size // SAMPLE_SLICES
+    parts = []
+    for i in range(SAMPLE_SLICES):
+        stream.seek(i * step)
+        parts.append(_decode(stream.read(slice_bytes)))
+    return "\n...\n".join(parts)
+
+
+def iter_chunks(stream: BinaryIO, chunk_bytes: int) -> Iterator[str]:
+    """Divide o arquivo em trechos de até ``chunk_bytes``, quebrando em fim de linha."""
+    buffer = bytearray()
+    for line in iter(lambda: stream.readline(READ_BLOCK), b""):
+        if buffer and len(buffer) + len(line) > chunk_bytes:
+            yield _decode(bytes(buffer))
+            buffer.clear()
+        buffer += line
+        # linhas maiores que o trecho são cortadas
+        while len(buffer) > chunk_bytes:
+            yield _decode(bytes(buffer[:chunk_bytes]))
+            del buffer[:chunk_bytes]
+    if buffer:
+        yield _decode(bytes(buffer))
+
+
+class LogStreamReader:
+    """Lê arquivos de log de zips, diretórios ou arquivos soltos em streaming.
+
+    Percorre todos os membros de um zip (inclusive em subdiretórios) sem
+    extraí-los. Cada arquivo rende um único registro limitado a ``max_bytes``
+    ou, com ``chunk_bytes``, vários registros cobrindo o arquivo inteiro.
+    """
+
+    def __init__(self, max_bytes: int = 10000, window: str = "head",
+                 chunk_bytes: Optional[int] = None, suffixes: Tuple[str, ...] = LOG_SUFFIXES):
+        if window not in WINDOWS:
+            raise ValueError(f"Janela desconhecida: {window}")
+        self.max_bytes = max_bytes
+        self.window = window
+        self.chunk_bytes = chunk_bytes
+        self.suffixes = suffixes
+
+    def _wanted(self, name: str) -> bool:
+        return name.lower().endswith(self.suffixes)
+
+    def _read_stream(self, name: str, stream: BinaryIO, size: int) -> Iterator[Tuple[str, int, str]]:
+        if self.chunk_bytes:
+            for part, text in enumerate(iter_chunks(stream, self.chunk_bytes)):
+                yield name, part, text
+        else:
+            yield name, 0, read_window(stream, size, self.max_bytes, self.window)
+
+    def read(self, path: str) -> Iterator[Tuple[str, int, str]]:
+        """Gera ``(nome, parte, texto)`` para cada arquivo de log encontrado em ``path``."""
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for file in sorted(files):
+                    full = os.path.join(root, file)
+                    rel = os.path.relpath(full, path).replace(os.sep, "/")
+                    if file.lower().endswith(".zip"):
+                        yield from ((f"{rel}/{n}", p, t) for n, p, t in self.read(full))
+                    elif self._wanted(file):
+                        with open(full, "rb") as f:
+                            yield from self._read_stream(rel, f, os.path.getsize(full))
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not self._wanted(info.filename):
+                        continue
+                    with archive.open(info) as f:
+                        yield from self._read_stream(info.filename, f, info.file_size)
+        elif self._wanted(path):
+            with open(path, "rb") as f:
+                yield from self._read_stream(os.path.basename(path), f, os.path.getsize(path))
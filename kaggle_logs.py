@@ -1,20 +1,22 @@
-import kaggle
+import argparse
 import json
 import logging
 
-logging.basicConfig(level=logging.INFO)
+from kaggle_cache import kaggle_api
+from output_formats import add_format_argument, format_options, save_records
+
 
 class KaggleScraper:
     def __init__(self):
         self.output_file = "kaggle_logs.json"
-        kaggle.api.authenticate()
 
     def fetch_datasets(self, search_term: str = "logs") -> list:
-        datasets = kaggle.api.dataset_list(search=search_term)
+        api = kaggle_api()
+        datasets = api.dataset_list(search=search_term)
         data = []
         for dataset in datasets[:5]:  # Limitar para testes
             try:
-                files = kaggle.api.dataset_view(dataset.ref)
+                files = api.dataset_view(dataset.ref)
                 for file in files["files"]:
                     if file["name"].endswith(".log") or "log" in file["name"].lower():
                         data.append({
@@ -37,7 +39,16 @@ class KaggleScraper:
             json.dump(data, f, indent=2, ensure_ascii=False)
         logging.info(f"Dados salvos em {self.output_file}")
 
-# Exemplo de uso
-scraper = KaggleScraper()
-data = scraper.fetch_datasets()
-scraper.save_to_json(data)
\ No newline at end of file
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Procura datasets de logs na Kaggle")
+    parser.add_argument("--search", default="logs", help="Termo de busca")
+    add_format_argument(parser)
+    args = parser.parse_args()
+
+    scraper = KaggleScraper()
+    data = scraper.fetch_datasets(search_term=args.search)
+    if args.format == "json":
+        scraper.save_to_json(data)
+    else:
+        save_records(data, scraper.output_file, args.format, source="kaggle", **format_options(args))
\ No newline at end of file
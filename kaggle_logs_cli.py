@@ -2,68 +2,68 @@ import argparse
 import json
 import logging
 import os
-import zipfile
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 
-import kaggle
-
-logging.basicConfig(level=logging.INFO)
+from chunking import add_chunk_arguments, chunk_records_from_args
+from kaggle_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, KaggleDownloadCache
+from kaggle_log_reader import TOKEN_CHUNKING_READ_BYTES, LogStreamReader
+from output_formats import add_format_argument, format_options, save_records
+from pii_scrub import add_scrub_arguments, scrub_records
 
 MAX_LOG_SIZE = 10000  # bytes
 
 class KaggleLogScraper:
-    def __init__(self, max_bytes: int = MAX_LOG_SIZE, output_file: str = "kaggle_logs_cli.json"):
+    def __init__(self, max_bytes: int = MAX_LOG_SIZE, output_file: str = "kaggle_logs_cli.json",
+                 window: str = "head", chunk_bytes: Optional[int] = None,
+                 cache: Optional[KaggleDownloadCache] = None):
         self.max_bytes = max_bytes
         self.output_file = output_file
-        kaggle.api.authenticate()
+        self.reader = LogStreamReader(max_bytes=max_bytes, window=window, chunk_bytes=chunk_bytes)
+        self.cache = cache or KaggleDownloadCache()
 
-    def _download_and_read_file(self, dataset_ref: str, file_name: str, temp_dir: str) -> str:
-        """Download a single file from Kaggle and return its content."""
-        kaggle.api.dataset_download_file(dataset_ref, file_name, path=temp_dir, force=True, quiet=True)
-        zipped_path = os.path.join(temp_dir, file_name)
-        if not os.path.exists(zipped_path):
-            zipped_path = zipped_path + ".zip"
-        if zipped_path.endswith('.zip'):
-            with zipfile.ZipFile(zipped_path) as z:
-                inner_name = z.namelist()[0]
-                with z.open(inner_name) as f:
-                    return f.read(self.max_bytes).decode("utf-8", errors="ignore")
-        with open(zipped_path, "rb") as f:
-            return f.read(self.max_bytes).decode("utf-8", errors="ignore")
+    def _read_file(self, path: str, file_name: str) -> Iterator[Tuple[str, int, str]]:
+        """Stream the log members of a cached download as (name, part, text)."""
+        # zips com vários membros e subdiretórios são lidos sem extração
+        for name, part, content in self.reader.read(path):
+            yield (file_name if name == os.path.basename(path) else name), part, content
 
     def fetch_logs(self, search_term: str, limit: int) -> List[Dict]:
-        datasets = kaggle.api.dataset_list(search=search_term)
-        data = []
-        temp_dir = "temp_kaggle_logs"
-        os.makedirs(temp_dir, exist_ok=True)
-        for dataset in datasets[:limit]:
+        datasets = self.cache.list_datasets(search_term)[:limit]
+        wanted = []
+        for dataset in datasets:
             try:
-                files = kaggle.api.dataset_list_files(dataset.ref)
-                for f in files.get("files", []):
+                for f in self.cache.list_files(dataset["ref"]):
                     name = f.get("name")
-                    if not name:
-                        continue
-                    if name.lower().endswith(".log") or name.lower().endswith(".txt"):
-                        content = self._download_and_read_file(dataset.ref, name, temp_dir)
-                        data.append({
-                            "id": f"{dataset.ref}/{name}",
-                            "content": content,
-                            "metadata": {
-                                "url": f"https://www.kaggle.com/datasets/{dataset.ref}",
-                                "timestamp": f.get("dateCreated", ""),
-                                "tags": ["kaggle", dataset.ref],
-                                "language": "log",
-                                "type": "log"
-                            }
-                        })
+                    if name and (name.lower().endswith(".log") or name.lower().endswith(".txt")):
+                        wanted.append((dataset, f))
+            except Exception as e:
+                logging.error(f"Erro ao listar arquivos de {dataset['ref']}: {e}")
+        # baixa de uma vez (em paralelo) tudo o que ainda não está no cache
+        paths = self.cache.fetch([(d["ref"], d["version"], f["name"]) for d, f in wanted])
+        data = []
+        for dataset, f in wanted:
+            path = paths.get((dataset["ref"], dataset["version"], f["name"]))
+            if path is None:
+                continue
+            try:
+                for member, part, content in self._read_file(path, f["name"]):
+                    record = {
+                        "id": f"{dataset['ref']}/{member}",
+                        "content": content,
+                        "metadata": {
+                            "url": f"https://www.kaggle.com/datasets/{dataset['ref']}",
+                            "timestamp": f.get("dateCreated", ""),
+                            "tags": ["kaggle", dataset["ref"]],
+                            "language": "log",
+                            "type": "log"
+                        }
+                    }
+                    if self.reader.chunk_bytes:
+                        record["id"] += f"#{part}"
+                        record["metadata"]["chunk"] = part
+                    data.append(record)
             except Exception as e:
-                logging.error(f"Erro ao processar {dataset.ref}: {e}")
-        try:
-            for item in os.listdir(temp_dir):
-                os.remove(os.path.join(temp_dir, item))
-            os.rmdir(temp_dir)
-        except Exception:
-            pass
+                logging.error(f"Erro ao processar {dataset['ref']}: {e}")
         return data
 
     def save_to_json(self, data: List[Dict]):
@@ -75,11 +75,34 @@ def main():
     parser = argparse.ArgumentParser(description="Baixa logs de datasets da Kaggle")
     parser.add_argument("term", help="Termo de busca")
     parser.add_argument("--limit", type=int, default=5, help="Número máximo de datasets")
+    parser.add_argument("--max-bytes", type=int, default=MAX_LOG_SIZE, help="Bytes lidos por arquivo de log")
+    parser.add_argument("--window", choices=["head", "tail", "sample"], default="head",
+                        help="Trecho lido de cada arquivo: início, fim ou amostras espaçadas")
+    parser.add_argument("--chunk-bytes", type=int, default=None,
+                        help="Divide cada log inteiro em registros de até N bytes em vez de truncar")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Diretório do cache de downloads")
+    parser.add_argument("--cache-max-gb", type=float, default=5, help="Tamanho máximo do cache (GB)")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL, help="Validade das listagens da API (s)")
+    parser.add_argument("--download-workers", type=int, default=4, help="Downloads simultâneos")
+    add_format_argument(parser)
+    add_scrub_arguments(parser)
+    add_chunk_arguments(parser)
     args = parser.parse_args()
 
-    scraper = KaggleLogScraper()
+    cache = KaggleDownloadCache(args.cache_dir, max_bytes=int(args.cache_max_gb * 1024 ** 3),
+                                ttl=args.cache_ttl, workers=args.download_workers)
+    scraper = KaggleLogScraper(max_bytes=args.max_bytes, window=args.window,
+                               chunk_bytes=args.chunk_bytes or (TOKEN_CHUNKING_READ_BYTES if args.chunk_tokens else None),
+                               cache=cache)
     logs = scraper.fetch_logs(args.term, args.limit)
-    scraper.save_to_json(logs)
+    logs = scrub_records(logs, "kaggle", args)
+    logs = chunk_records_from_args(logs, args)
+    if args.format == "json":
+        scraper.save_to_json(logs)
+    else:
+        save_records(logs, scraper.output_file, args.format, source="kaggle", **format_options(args))
+    cache.close()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
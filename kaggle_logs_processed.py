@@ -1,68 +1,86 @@
-import kaggle
-import json
 import logging
-import os
-import shutil
 import time
-from pydantic import BaseModel
-from typing import List
-
-logging.basicConfig(level=logging.INFO)
+from typing import List, Optional
+
+from chunking import add_chunk_arguments, chunk_records_from_args
+from kaggle_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, KaggleDownloadCache
+from kaggle_log_reader import TOKEN_CHUNKING_READ_BYTES, LogStreamReader
+from output_formats import add_format_argument, format_options, save_records
+from pii_scrub import add_scrub_arguments, scrub_records
+from records import Record, write_json
 
-class KaggleLogData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+KaggleLogData = Record
 
 class KaggleLogScraper:
-    def __init__(self):
+    def __init__(self, max_bytes: int = 10000, window: str = "head", chunk_bytes: Optional[int] = None,
+                 cache: Optional[KaggleDownloadCache] = None):
         self.output_file = "kaggle_logs_processed.json"
-        kaggle.api.authenticate()
-        self.temp_dir = "temp_logs"
-
-    def prepare_temp_logs(self):
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # Datasets já baixados (na mesma versão) são reaproveitados entre execuções
+        self.cache = cache or KaggleDownloadCache()
+        # Lê direto do zip baixado: só a janela configurada ou o arquivo em trechos
+        self.reader = LogStreamReader(max_bytes=max_bytes, window=window,
+                                      chunk_bytes=chunk_bytes, suffixes=(".log",))
 
     def fetch_and_process_logs(self, dataset_ref: str) -> List[KaggleLogData]:
         data = []
         try:
-            self.prepare_temp_logs()
-            kaggle.api.dataset_download_files(dataset_ref, path=self.temp_dir, unzip=True)
-            # Exemplo: processar arquivos .log ou .txt
-            for file in os.listdir(self.temp_dir):
-                if file.endswith(".log"):
-                    with open(f"{self.temp_dir}/{file}", "r", encoding="utf-8", errors="ignore") as f:
-                        content = f.read()
-                        data.append(KaggleLogData(
-                            id=file,
-                            content=content[:10000],  # Limitar tamanho
-                            metadata={
-                                "url": f"https://www.kaggle.com/datasets/{dataset_ref}",
-                                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                                "tags": ["log", dataset_ref],
-                                "language": "log",
-                                "type": "log"
-                            }
-                        ))
+            path = self.cache.fetch_dataset(dataset_ref)
+            if path is None:
+                return data
+            # O zip em cache é lido em streaming, membro a membro
+            for name, part, content in self.reader.read(path):
+                metadata = {
+                    "url": f"https://www.kaggle.com/datasets/{dataset_ref}",
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "tags": ["log", dataset_ref],
+                    "language": "log",
+                    "type": "log"
+                }
+                if self.reader.chunk_bytes:
+                    metadata["chunk"] = part
+                data.append(KaggleLogData(
+                    id=f"{name}#{part}" if self.reader.chunk_bytes else name,
+                    content=content,
+                    metadata=metadata
+                ))
         except Exception as e:
             logging.error(f"Erro ao processar {dataset_ref}: {e}")
         return data
 
     def save_to_json(self, data: List[KaggleLogData]):
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump([d.dict() for d in data], f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file)
         logging.info(f"Dados salvos em {self.output_file}")
 
 # Exemplo de uso
 if __name__ == "__main__":
     import argparse
 
+    logging.basicConfig(level=logging.INFO)
+
     parser = argparse.ArgumentParser(description="Process Kaggle logs")
     parser.add_argument("dataset_ref", help="Kaggle dataset reference")
+    parser.add_argument("--max-bytes", type=int, default=10000, help="Bytes lidos por arquivo de log")
+    parser.add_argument("--window", choices=["head", "tail", "sample"], default="head",
+                        help="Trecho lido de cada arquivo: início, fim ou amostras espaçadas")
+    parser.add_argument("--chunk-bytes", type=int, default=None,
+                        help="Divide cada log inteiro em registros de até N bytes em vez de truncar")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Diretório do cache de downloads")
+    parser.add_argument("--cache-max-gb", type=float, default=5, help="Tamanho máximo do cache (GB)")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL, help="Validade das listagens da API (s)")
+    add_format_argument(parser)
+    add_scrub_arguments(parser)
+    add_chunk_arguments(parser)
     args = parser.parse_args()
 
-    scraper = KaggleLogScraper()
+    cache = KaggleDownloadCache(args.cache_dir, max_bytes=int(args.cache_max_gb * 1024 ** 3), ttl=args.cache_ttl)
+    scraper = KaggleLogScraper(max_bytes=args.max_bytes, window=args.window,
+                               chunk_bytes=args.chunk_bytes or (TOKEN_CHUNKING_READ_BYTES if args.chunk_tokens else None),
+                               cache=cache)
     data = scraper.fetch_and_process_logs(dataset_ref=args.dataset_ref)
-    scraper.save_to_json(data)
+    data = scrub_records(data, "kaggle", args)
+    data = chunk_records_from_args(data, args)
+    if args.format == "json":
+        scraper.save_to_json(data)
+    else:
+        save_records(data, scraper.output_file, args.format, source="kaggle", **format_options(args))
+    cache.close()
@@ -0,0 +1,334 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from records import dumps, encode_jsonl, loads
+
+# Modelo fastText de identificação de idioma (lid.176.bin ou a versão compacta lid.176.ftz)
+DEFAULT_MODEL = os.getenv("LID_MODEL", "lid.176.ftz")
+DEFAULT_CACHE = "language_cache.sqlite"
+# Valores fixos gravados pelos scrapers quando o idioma não foi detectado
+PLACEHOLDER_LANGUAGES = frozenset({"", "english", "unknown"})
+# Só o início do conteúdo é usado na detecção (e na chave do cache)
+SAMPLE_CHARS = 1000
+BATCH_SIZE = 4096
+SUFFIXES = (".json", ".jsonl", ".jsonl.gz", ".manifest.json")
+# Estado de outras etapas (generic_text_data), nunca registros
+STATE_SUFFIX = ".state.json"
+
+
+def detection_text(content: str) -> str:
+    # o fastText trata cada linha como uma entrada
+    return " ".join(content[:SAMPLE_CHARS].split())
+
+
+def content_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class LanguageCache:
+    """Idioma detectado por hash de conteúdo, em SQLite.
+
+    Só o processo principal grava; os workers abrem o arquivo em modo leitura.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE, readonly: bool = False):
+        self.path = path
+        if readonly:
+            self.db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            return
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS languages (key BLOB PRIMARY KEY, language TEXT, score REAL)"
+        )
+        self.db.commit()
+
+    def lookup(self, keys: Iterable[bytes]) -> Dict[bytes, Tuple[str, float]]:
+        keys = list(keys)
+        found = {}
+        # limite de variáveis por consulta do SQLite
+        for start in range(0, len(keys), 900):
+            chunk = keys[start:start + 900]
+            query = f"SELECT key, language, score FROM languages WHERE key IN ({','.join('?' * len(chunk))})"
+            for key, language, score in self.db.execute(query, chunk):
+                found[key] = (language, score)
+        return found
+
+    def put(self, entries: List[Tuple[bytes, str, float]]):
+        self.db.executemany("INSERT OR REPLACE INTO languages VALUES (?, ?, ?)", entries)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+# Contexto de cada processo de detecção (preenchido pelo initializer)
+_WORKER: Dict = {}
+
+
+def _init_worker(model_path: str, cache_path: str, batch_size: int, overwrite_all: bool):
+    import fasttext
+
+    _WORKER["model"] = fasttext.load_model(model_path)
+    _WORKER["cache"] = LanguageCache(cache_path, readonly=True)
+    _WORKER["batch_size"] = batch_size
+    _WORKER["overwrite_all"] = overwrite_all
+
+
+def annotate_batch(records: List[Dict], model, cache: LanguageCache,
+                   overwrite_all: bool = False) -> List[Tuple[bytes, str, float]]:
+    """Preenche ``metadata.language`` e ``metadata.language_score`` de um lote.
+
+    Conteúdos já vistos vêm do cache; os demais passam por uma única chamada
+    ao modelo. Retorna as detecções novas, para o cache.
+    """
+    targets = []
+    for record in records:
+        metadata = record.get("metadata")
+        if not isinstance(metadata, dict) or not record.get("content"):
+            continue
+        if overwrite_all or str(metadata.get("language") or "").lower() in PLACEHOLDER_LANGUAGES:
+            text = detection_text(record["content"])
+            if text:
+                targets.append((metadata, content_key(text), text))
+    if not targets:
+        return []
+    known = cache.lookup({key for _, key, _ in targets})
+    missing = {key: text for _, key, text in targets if key not in known}
+    new = []
+    if missing:
+        labels, scores = model.predict(list(missing.values()), k=1)
+        for key, label, score in zip(missing, labels, scores):
+            language = label[0].replace("__label__", "") if label else "unknown"
+            score = round(float(score[0]), 4) if len(score) else 0.0
+            known[key] = (language, score)
+            new.append((key, language, score))
+    for metadata, key, _ in targets:
+        metadata["language"], metadata["language_score"] = known[key]
+    return new
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _iter_lines(f) -> Iterator[Dict]:
+    for line in f:
+        if line.strip():
+            yield loads(line)
+
+
+def _open_binary(path: str, mode: str, compressed: bool):
+    if compressed:
+        return gzip.open(path, mode + "b")
+    return open(path, mode + "b")
+
+
+def _is_record_list(data) -> bool:
+    return isinstance(data, list) and all(isinstance(r, dict) and "content" in r for r in data)
+
+
+def _process_file(task: Tuple[str, str]) -> Tuple[str, Optional[int], List[Tuple[bytes, str, float]], Optional[Dict]]:
+    """Detecta o idioma dos registros de um arquivo e o regrava (via arquivo temporário).
+
+    Retorna (caminho, registros, detecções novas, estatísticas do shard zstd);
+    ``registros`` é None para um JSON que não é uma lista de registros (nem o
+    envelope ``{"data": [...]}``), como checkpoints e estado de outras etapas,
+    que não é regravado.
+    """
+    source, target = task
+    model, cache = _WORKER["model"], _WORKER["cache"]
+    batch_size, overwrite_all = _WORKER["batch_size"], _WORKER["overwrite_all"]
+    tmp_path = target + ".tmp"
+    new = []
+    count = 0
+    shard_stats = None
+    if source.endswith(".json"):
+        with open(source, "rb") as f:
+            document = loads(f.read())
+        data = document.get("data") if isinstance(document, dict) else document
+        if not _is_record_list(data):
+            return source, None, [], None
+        for batch in _batches(data, batch_size):
+            new.extend(annotate_batch(batch, model, cache, overwrite_all))
+            count += len(batch)
+        with open(tmp_path, "wb") as f:
+            f.write(dumps(document, indent=True))
+    elif source.endswith(".jsonl.zst"):
+        import zstandard
+
+        sha256 = hashlib.sha256()
+        uncompressed = 0
+        with open(source, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as reader, \
+                open(tmp_path, "wb") as out:
+            writer = zstandard.ZstdCompressor(level=3).stream_writer(out, closefd=False)
+            for batch in _batches(_iter_lines(io.BufferedReader(reader)), batch_size):
+                new.extend(annotate_batch(batch, model, cache, overwrite_all))
+                data = encode_jsonl(batch)
+                writer.write(data)
+                uncompressed += len(data)
+                count += len(batch)
+            writer.flush(zstandard.FLUSH_FRAME)
+            writer.close()
+        with open(tmp_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(chunk)
+        shard_stats = {"bytes": os.path.getsize(tmp_path), "uncompressed_bytes": uncompressed,
+                       "sha256": sha256.hexdigest()}
+    else:
+        compressed = source.endswith(".gz")
+        with _open_binary(source, "r", compressed) as f, _open_binary(tmp_path, "w", compressed) as out:
+            for batch in _batches(_iter_lines(f), batch_size):
+                new.extend(annotate_batch(batch, model, cache, overwrite_all))
+                out.write(encode_jsonl(batch))
+                count += len(batch)
+    os.replace(tmp_path, target)
+    return target, count, new, shard_stats
+
+
+class LanguageIdStage:
+    """Etapa de pós-processamento que detecta o idioma dos arquivos de saída.
+
+    Cada arquivo (JSON, JSONL, JSONL.gz ou shard de um manifest ``jsonl.zst``)
+    é processado por um worker em lotes de ``batch_size`` registros com um
+    modelo fastText offline. As detecções ficam em cache por hash do conteúdo;
+    o cache é atualizado pelo processo principal a cada arquivo concluído.
+    Por padrão só são substituídos os idiomas fixos dos scrapers
+    (``PLACEHOLDER_LANGUAGES``); ``overwrite_all`` detecta em todos os registros.
+    """
+
+    def __init__(self, model_path: str = DEFAULT_MODEL, cache_path: str = DEFAULT_CACHE,
+                 workers: Optional[int] = None, batch_size: int = BATCH_SIZE,
+                 overwrite_all: bool = False, output_dir: Optional[str] = None):
+        self.model_path = model_path
+        self.cache_path = cache_path
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.overwrite_all = overwrite_all
+        self.output_dir = output_dir
+
+    def _target(self, path: str, root: Optional[str] = None) -> str:
+        """Destino de ``path``: ele mesmo, ou o caminho relativo a ``root`` dentro de ``output_dir``."""
+        if not self.output_dir:
+            return path
+        relative = os.path.relpath(path, root) if root else os.path.basename(path)
+        target = os.path.join(self.output_dir, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        return target
+
+    def plan(self, paths: List[str]) -> Tuple[List[Tuple[str, str]], Dict[str, Dict]]:
+        """Expande diretórios e manifests em tarefas (origem, destino), maiores primeiro.
+
+        Com ``output_dir``, os arquivos mantêm o caminho relativo ao diretório
+        informado e os shards o caminho relativo ao manifest, que é gravado
+        (chaveado pelo destino) ao lado deles. Arquivos ausentes são ignorados.
+        """
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend((os.path.join(root, n), path) for n in sorted(names)
+                                 if n.endswith(SUFFIXES) and not n.endswith(STATE_SUFFIX))
+            else:
+                files.append((path, None))
+        tasks = []
+        manifests = {}
+        for path, root in files:
+            if path.endswith(".manifest.json"):
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                target = self._target(path, root)
+                manifests[target] = manifest
+                base_dir, target_dir = os.path.dirname(path), os.path.dirname(target)
+                for shard in manifest["shards"]:
+                    shard_target = os.path.join(target_dir, shard["path"])
+                    os.makedirs(os.path.dirname(shard_target) or ".", exist_ok=True)
+                    tasks.append((os.path.join(base_dir, shard["path"]), shard_target))
+            else:
+                tasks.append((path, self._target(path, root)))
+        missing = {source for source, _ in tasks if not os.path.isfile(source)}
+        for source in sorted(missing):
+            logging.warning(f"Arquivo não encontrado, ignorado: {source}")
+        tasks = [task for task in tasks if task[0] not in missing]
+        tasks.sort(key=lambda task: os.path.getsize(task[0]), reverse=True)
+        return tasks, manifests
+
+    def _update_manifests(self, manifests: Dict[str, Dict], shard_stats: Dict[str, Dict]):
+        for target, manifest in manifests.items():
+            base_dir = os.path.dirname(target)
+            for shard in manifest["shards"]:
+                stats = shard_stats.get(os.path.join(base_dir, shard["path"]))
+                if stats:
+                    shard.update(stats)
+            with open(target + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            os.replace(target + ".tmp", target)
+
+    def run(self, paths: List[str]) -> int:
+        tasks, manifests = self.plan(paths)
+        logging.info(f"Detectando idioma em {len(tasks)} arquivos com {self.workers} processos")
+        cache = LanguageCache(self.cache_path)
+        shard_stats = {}
+        total = 0
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_path, self.cache_path, self.batch_size, self.overwrite_all),
+            ) as executor:
+                futures = [executor.submit(_process_file, task) for task in tasks]
+                for future in as_completed(futures):
+                    try:
+                        path, count, new, stats = future.result()
+                    except Exception as e:
+                        logging.error(f"Erro na detecção de idioma: {e}")
+                        continue
+                    if count is None:
+                        logging.info(f"{path}: não contém registros; ignorado")
+                        continue
+                    # o cache só é alterado aqui, no processo principal
+                    if new:
+                        cache.put(new)
+                    if stats:
+                        shard_stats[path] = stats
+                    total += count
+                    logging.info(f"{path}: {count} registros ({len(new)} detecções novas)")
+        finally:
+            cache.close()
+        if manifests:
+            self._update_manifests(manifests, shard_stats)
+        return total
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Detecta o idioma dos registros nos arquivos de saída")
+    parser.add_argument("paths", nargs="+", help="Arquivos .json/.jsonl/.jsonl.gz, manifests jsonl.zst ou diretórios")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Modelo fastText de idioma (ou LID_MODEL)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="Cache SQLite de idiomas por hash do conteúdo")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de detecção")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Registros por chamada ao modelo")
+    parser.add_argument("--all", action="store_true",
+                        help="Detecta em todos os registros, não só nos de idioma fixo (english/unknown)")
+    parser.add_argument("--output-dir", default=None, help="Grava os arquivos aqui em vez de substituí-los")
+    args = parser.parse_args()
+
+    stage = LanguageIdStage(args.model, args.cache, workers=args.workers, batch_size=args.batch_size,
+                            overwrite_all=args.all, output_dir=args.output_dir)
+    total = stage.run(args.paths)
+    logging.info(f"Idioma detectado em {total} registros")
@@ -1,8 +1,83 @@
-from datasets import load_dataset
+import argparse
 import json
 import logging
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from output_formats import ROW_GROUP_SIZE, add_format_argument, format_options, save_records, write_jsonl_shards
+
+DATASET_URL = "https://huggingface.co/datasets/OpenAssistant/oasst1"
+# Únicas colunas lidas no caminho Arrow
+ARROW_COLUMNS = ["message_id", "parent_id", "message_tree_id", "role", "text", "lang", "created_date"]
+# Escapes exigidos pelo JSON, na ordem de substituição (a barra invertida primeiro)
+JSON_ESCAPES = [("\\", "\\\\"), ('"', '\\"'), ("\n", "\\n"), ("\r", "\\r"), ("\t", "\\t"),
+                ("\b", "\\b"), ("\f", "\\f")]
+CONTROL_ESCAPES = [(chr(c), f"\\u{c:04x}") for c in range(0x20) if chr(c) not in "\n\r\t\b\f"]
+CONTROL_RE = "[\\x00-\\x07\\x0b\\x0e-\\x1f]"
+
+
+def thread_paths(message_ids: pa.Array, parent_ids: pa.Array):
+    """Caminhos raiz → folha de todas as árvores de mensagens, sem laços por linha.
+
+    O índice do pai de cada mensagem vem de ``index_in`` sobre ``message_id``;
+    os caminhos são montados subindo das folhas um nível por iteração. Retorna
+    as folhas, os índices das mensagens de cada caminho (raiz primeiro) e os
+    offsets de cada caminho nesse vetor.
+    """
+    parent = pc.index_in(parent_ids, value_set=message_ids).fill_null(-1).to_numpy(zero_copy_only=False)
+    has_child = np.zeros(len(parent), dtype=bool)
+    has_child[parent[parent >= 0]] = True
+    leaves = np.flatnonzero(~has_child)
+    levels = [leaves]
+    current = leaves
+    while True:
+        current = np.where(current >= 0, parent[np.maximum(current, 0)], -1)
+        if not (current >= 0).any():
+            break
+        levels.append(current)
+    # linhas: um caminho por folha, da raiz para a folha, completado com -1 à esquerda
+    paths = np.stack(levels[::-1], axis=1)
+    mask = paths >= 0
+    offsets = np.concatenate([[0], np.cumsum(mask.sum(axis=1))]).astype(np.int32)
+    return leaves, paths[mask], offsets
+
+def json_values(values: pa.Array) -> pa.Array:
+    """Cada valor de uma coluna Arrow como texto JSON, montado com kernels de string do Arrow.
+
+    Strings são escapadas e postas entre aspas, listas e structs viram
+    ``[...]`` e ``{...}``; nenhum objeto Python é criado por linha.
+    """
+    kind = values.type
+    if pa.types.is_struct(kind):
+        pieces = []
+        for index, (field, child) in enumerate(zip(kind, values.flatten())):
+            key = json.dumps(field.name, ensure_ascii=False) + ":"
+            pieces += ["{" if index == 0 else ",", key, json_values(child)]
+        encoded = pc.binary_join_element_wise(*pieces, "}", "")
+    elif pa.types.is_list(kind) or pa.types.is_large_list(kind):
+        offsets = pc.subtract(values.offsets, values.offsets[0])
+        items = type(values).from_arrays(offsets, json_values(values.flatten()))
+        encoded = pc.binary_join_element_wise("[", pc.binary_join(items, ","), "]", "")
+    elif pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_boolean(kind):
+        encoded = pc.cast(values, pa.string())
+    else:
+        text = values
+        if not (pa.types.is_string(kind) or pa.types.is_large_string(kind)):
+            text = pc.cast(values, pa.string())
+        escapes = JSON_ESCAPES
+        if pc.any(pc.match_substring_regex(text, CONTROL_RE)).as_py():
+            escapes = escapes + CONTROL_ESCAPES
+        for char, escaped in escapes:
+            text = pc.replace_substring(text, char, escaped)
+        encoded = pc.binary_join_element_wise('"', text, '"', "")
+    if values.null_count:
+        encoded = pc.if_else(pc.is_valid(values), encoded, "null")
+    return encoded
 
-logging.basicConfig(level=logging.INFO)
 
 class OASSTScraper:
     def __init__(self):
@@ -11,6 +86,8 @@ class OASSTScraper:
     def fetch_data(self):
         data = []
         try:
+            from datasets import load_dataset
+
             dataset = load_dataset("OpenAssistant/oasst1", split="train")
             for item in dataset:
                 data.append({
@@ -33,7 +110,100 @@ class OASSTScraper:
             json.dump(data, f, indent=2, ensure_ascii=False)
         logging.info(f"Dados salvos em {self.output_file}")
 
-# Exemplo de uso
-scraper = OASSTScraper()
-data = scraper.fetch_data()
-scraper.save_to_json(data)
\ No newline at end of file
+    def fetch_threads(self, min_messages: int = 2) -> pa.Table:
+        """Conversas do OASST (um registro por caminho raiz → folha) montadas em Arrow.
+
+        Lê só ``ARROW_COLUMNS`` da tabela memory-mapped do dataset e monta
+        conteúdo e metadados com operações de coluna, sem dicts por mensagem.
+        """
+        from datasets import load_dataset
+
+        dataset = load_dataset("OpenAssistant/oasst1", split="train")
+        # os chunks memory-mapped ficam como estão; só os ids são copiados para o index_in
+        table = dataset.data.table.select(ARROW_COLUMNS)
+        leaves, indices, offsets = thread_paths(table["message_id"].combine_chunks(), table["parent_id"])
+        lengths = np.diff(offsets)
+        keep = lengths >= min_messages
+        if not keep.all():
+            indices = indices[np.repeat(keep, lengths)]
+            leaves, lengths = leaves[keep], lengths[keep]
+            offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+        offsets = pa.array(offsets, type=pa.int32())
+        roots = indices[offsets.to_numpy()[:-1]]
+
+        def column(name: str, rows) -> pa.Array:
+            return table[name].take(pa.array(rows)).combine_chunks()
+
+        def per_thread(values: pa.Array) -> pa.ListArray:
+            return pa.ListArray.from_arrays(offsets, values)
+
+        turns = pc.binary_join_element_wise(column("role", indices), column("text", indices), ": ")
+        count = len(leaves)
+        metadata = pa.StructArray.from_arrays(
+            [
+                pa.repeat(DATASET_URL, count),
+                pc.cast(column("created_date", leaves), pa.string()),
+                pa.repeat(pa.scalar(["feedback", "human"]), count),
+                pc.fill_null(column("lang", roots), "english"),
+                pa.repeat("conversation", count),
+                column("message_tree_id", leaves),
+                per_thread(column("message_id", indices)),
+                per_thread(column("role", indices)),
+            ],
+            names=["url", "timestamp", "tags", "language", "type", "message_tree_id", "message_ids", "roles"],
+        )
+        return pa.table({
+            "id": column("message_id", leaves),
+            "content": pc.binary_join(per_thread(turns), "\n\n"),
+            "metadata": metadata,
+        })
+
+    def save_table(self, table: pa.Table, path: str, fmt: str = "json", batch_size: int = 10000, **options):
+        """Grava a tabela em Parquet, JSONL ou shards jsonl.zst.
+
+        Parquet e JSONL saem direto dos buffers Arrow (o JSONL é montado por
+        ``json_values``). Os shards jsonl.zst passam por um dict por linha,
+        pois o manifest registra intervalos de id e timestamp de cada shard:
+        é o caminho lento.
+        """
+        if fmt == "parquet":
+            pq.write_table(table, path, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+        elif fmt == "jsonl.zst":
+            rows = (row for batch in table.to_batches(max_chunksize=batch_size) for row in batch.to_pylist())
+            path = write_jsonl_shards(rows, os.path.dirname(path), os.path.splitext(os.path.basename(path))[0],
+                                      **options)
+        else:
+            with open(path, "wb") as f:
+                for batch in table.to_batches(max_chunksize=batch_size):
+                    rows = pa.StructArray.from_arrays(batch.columns, fields=list(batch.schema))
+                    lines = pc.binary_join_element_wise(json_values(rows), "\n", "")
+                    _, offsets, data = lines.buffers()
+                    bounds = np.frombuffer(offsets, dtype=np.int32)[lines.offset:lines.offset + len(lines) + 1]
+                    f.write(data[int(bounds[0]):int(bounds[-1])])
+        logging.info(f"{table.num_rows} conversas salvas em {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Coleta mensagens e conversas do OpenAssistant (oasst1)")
+    parser.add_argument("--threads", action="store_true",
+                        help="Exporta conversas (raiz → folha) montadas em Arrow em vez de mensagens soltas")
+    # no modo --threads, "json" grava JSONL
+    add_format_argument(parser)
+    parser.add_argument("--min-messages", type=int, default=2, help="Tamanho mínimo das conversas")
+    parser.add_argument("--output", default=None, help="Arquivo de saída")
+    args = parser.parse_args()
+
+    scraper = OASSTScraper()
+    if args.threads:
+        output = args.output or ("oasst_threads.parquet" if args.format == "parquet" else "oasst_threads.jsonl")
+        scraper.save_table(scraper.fetch_threads(min_messages=args.min_messages), output, args.format,
+                           **format_options(args))
+    else:
+        if args.output:
+            scraper.output_file = args.output
+        data = scraper.fetch_data()
+        if args.format == "json":
+            scraper.save_to_json(data)
+        else:
+            save_records(data, scraper.output_file, args.format, source="oasst", **format_options(args))
\ No newline at end of file
@@ -0,0 +1,433 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import zstandard
+
+from profiling import phase
+from records import VALIDATE, encode_jsonl, encode_msgpack, validate_records
+
+# "json" é o save_to_json de cada scraper; os demais formatos são gravados aqui
+FORMATS = ("json", "parquet", "jsonl.zst", "msgpack")
+# Formatos gravados de forma incremental pelo pipeline dos spiders
+PIPELINE_FORMATS = ("json", "parquet", "jsonl.zst")
+
+# Colunas de baixa cardinalidade, guardadas como dicionário no Arrow e no Parquet
+DICTIONARY_COLUMNS = ["source", "type", "language"]
+
+ROW_GROUP_SIZE = 50000
+SHARD_MAX_BYTES = 128 * 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def record_schema():
+    """Schema Arrow dos registros (o pyarrow só é importado ao gravar ou ler Parquet)."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("content", pa.string()),
+        ("source", pa.dictionary(pa.int32(), pa.string())),
+        ("type", pa.dictionary(pa.int32(), pa.string())),
+        ("language", pa.dictionary(pa.int32(), pa.string())),
+        ("url", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("tags", pa.list_(pa.string())),
+        # demais chaves de metadata (e o timestamp original, se não reconhecido) em JSON
+        ("metadata", pa.string()),
+    ])
+
+
+def add_format_argument(parser, default: str = "json", formats: Sequence[str] = FORMATS):
+    parser.add_argument("--format", choices=formats, default=default,
+                        help="Formato de saída: json (padrão do scraper), parquet (colunar, zstd), "
+                             "jsonl.zst (shards comprimidos com manifest) ou msgpack")
+    parser.add_argument("--shard-max-mb", type=float, default=SHARD_MAX_BYTES / 1024 / 1024,
+                        help="Tamanho máximo (comprimido) de cada shard jsonl.zst, em MB")
+    parser.add_argument("--shard-max-records", type=int, default=None,
+                        help="Número máximo de registros por shard (jsonl.zst e shards JSONL dos spiders)")
+
+
+def format_options(args) -> Dict:
+    """Opções de ``save_records`` a partir dos argumentos de ``add_format_argument``."""
+    return {
+        "shard_max_bytes": int(args.shard_max_mb * 1024 * 1024),
+        "shard_max_records": args.shard_max_records,
+    }
+
+
+def with_suffix(path: str, suffix: str) -> str:
+    return os.path.splitext(path)[0] + suffix
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Converte os formatos de data usados pelos scrapers para datetime UTC.
+
+    Aceita epoch (número ou string, como o ``ts`` do Slack), ISO 8601
+    (inclusive com ``Z``), ``%Y-%m-%d %H:%M:%S`` e datas HTTP/RFC 2822.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    text = str(value).strip()
+    try:
+        return datetime.fromtimestamp(float(text), tz=timezone.utc)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _as_dict(record) -> Dict:
+    if isinstance(record, dict):
+        return record
+    return record.dict()
+
+
+class ParquetRecordWriter:
+    """Grava registros ``{id, content, metadata}`` em Parquet, um row group por lote.
+
+    ``metadata.url/timestamp/tags/language/type`` viram colunas próprias e a
+    origem vai na coluna ``source``; ``source``, ``type`` e ``language`` são
+    dicionários e cada row group tem estatísticas, o que permite filtrar por
+    essas colunas e por ``timestamp`` sem ler o arquivo inteiro (ver
+    ``read_parquet``).
+    """
+
+    def __init__(self, path: str, source: str, row_group_size: int = ROW_GROUP_SIZE):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.source = source
+        self.row_group_size = row_group_size
+        self.total = 0
+        self._columns: Dict[str, List] = {name: [] for name in record_schema().names}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = pq.ParquetWriter(
+            path,
+            record_schema(),
+            compression="zstd",
+            use_dictionary=DICTIONARY_COLUMNS + ["url", "tags"],
+            write_statistics=True,
+        )
+
+    def write(self, record):
+        record = _as_dict(record)
+        metadata = dict(record.get("metadata") or {})
+        raw_timestamp = metadata.pop("timestamp", None)
+        timestamp = parse_timestamp(raw_timestamp)
+        if timestamp is None and raw_timestamp not in (None, ""):
+            metadata["timestamp"] = raw_timestamp
+        columns = self._columns
+        columns["id"].append(str(record.get("id", "")))
+        columns["content"].append(record.get("content", ""))
+        columns["source"].append(self.source)
+        columns["type"].append(metadata.pop("type", None))
+        columns["language"].append(metadata.pop("language", None))
+        columns["url"].append(metadata.pop("url", None))
+        columns["timestamp"].append(timestamp)
+        columns["tags"].append([str(t) for t in metadata.pop("tags", None) or []])
+        columns["metadata"].append(json.dumps(metadata, ensure_ascii=False, default=str) if metadata else None)
+        if len(columns["id"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._columns["id"]:
+            return
+        import pyarrow as pa
+
+        with phase("serialize"):
+            table = pa.Table.from_pydict(self._columns, schema=record_schema())
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        self.total += table.num_rows
+        for values in self._columns.values():
+            values.clear()
+
+    def close(self) -> str:
+        self.flush()
+        self._writer.close()
+        return self.path
+
+
+def write_parquet(records: Iterable, path: str, source: str, row_group_size: int = ROW_GROUP_SIZE) -> str:
+    writer = ParquetRecordWriter(path, source, row_group_size)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    logging.info(f"{writer.total} registros salvos em {path}")
+    return path
+
+
+class _HashingFile:
+    """Arquivo de escrita que acumula o sha256 e o total de bytes gravados."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def next_shard_index(output_dir: str, prefix: str, suffix: str) -> int:
+    """Índice seguinte ao maior shard ``<prefix>-NNNNN<suffix>`` já presente em ``output_dir``."""
+    pattern = re.compile(re.escape(prefix) + r"-(\d{5})" + re.escape(suffix) + "$")
+    indexes = [int(m.group(1)) for m in map(pattern.match, os.listdir(output_dir)) if m]
+    return max(indexes) + 1 if indexes else 0
+
+
+def id_order(value: str):
+    """Chave de ordenação dos ids no manifest: numéricos pelo valor, depois os demais como texto."""
+    # isdigit() aceita dígitos não ASCII como "²", que int() rejeita
+    return (0, int(value), "") if value.isascii() and value.isdecimal() else (1, 0, value)
+
+
+class ZstdJsonlShardWriter:
+    """Grava registros em shards ``<prefix>-00000.jsonl.zst`` com um manifest.
+
+    Um novo shard é aberto quando o atual atinge ``shard_max_bytes``
+    comprimidos ou ``shard_max_records`` registros. Os registros são
+    serializados em lotes de ``batch_size``. A cada shard fechado o
+    ``<prefix>.manifest.json`` é regravado com registros, bytes, sha256 e
+    intervalos de id e de timestamp de cada shard, então shards já listados
+    podem ser processados antes do fim da coleta. Ids só com dígitos são
+    comparados como números (``"9"`` antes de ``"10"``) e ficam antes dos
+    demais, comparados como texto. Com ``resume`` (crawl retomado), os shards
+    do manifest existente são mantidos e a numeração continua após os shards
+    já presentes no diretório.
+    """
+
+    def __init__(self, output_dir: str, prefix: str, shard_max_bytes: int = SHARD_MAX_BYTES,
+                 shard_max_records: Optional[int] = None, batch_size: int = 1000, level: int = 3,
+                 resume: bool = False):
+        self.output_dir = output_dir or "."
+        self.prefix = prefix
+        self.shard_max_bytes = shard_max_bytes
+        self.shard_max_records = shard_max_records
+        self.batch_size = batch_size
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.manifest_path = os.path.join(self.output_dir, f"{prefix}.manifest.json")
+        self.shards: List[Dict] = []
+        self.total = 0
+        self._buffer: List[Dict] = []
+        self._file: Optional[_HashingFile] = None
+        self._stream = None
+        self._current: Optional[Dict] = None
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._next_index = 0
+        if resume:
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    self.shards = json.load(f)["shards"]
+            self._next_index = next_shard_index(self.output_dir, prefix, ".jsonl.zst")
+
+    def _open_shard(self):
+        name = f"{self.prefix}-{self._next_index:05d}.jsonl.zst"
+        self._next_index += 1
+        self._file = _HashingFile(os.path.join(self.output_dir, name))
+        self._stream = self.compressor.stream_writer(self._file, closefd=False)
+        self._current = {
+            "path": name, "records": 0, "bytes": 0, "uncompressed_bytes": 0,
+            "id_min": None, "id_max": None, "timestamp_min": None, "timestamp_max": None,
+        }
+
+    def _close_shard(self):
+        self._stream.flush(zstandard.FLUSH_FRAME)
+        self._stream.close()
+        self._file.close()
+        self._current["bytes"] = self._file.size
+        self._current["sha256"] = self._file.sha256.hexdigest()
+        self.shards.append(self._current)
+        self._file = self._stream = self._current = None
+        self._write_manifest(complete=False)
+
+    def _shard_full(self) -> bool:
+        if self._current is None:
+            return False
+        if self.shard_max_records and self._current["records"] >= self.shard_max_records:
+            return True
+        return self._file.size >= self.shard_max_bytes
+
+    def write(self, record):
+        self._buffer.append(_as_dict(record))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        while self._buffer:
+            if self._shard_full():
+                self._close_shard()
+            if self._current is None:
+                self._open_shard()
+            room = len(self._buffer)
+            if self.shard_max_records:
+                room = min(room, self.shard_max_records - self._current["records"])
+            batch, self._buffer = self._buffer[:room], self._buffer[room:]
+            if VALIDATE:
+                validate_records(batch)
+            self._track(batch)
+            data = encode_jsonl(batch)
+            self._stream.write(data)
+            # fecha o bloco para que o tamanho em disco reflita o lote
+            self._stream.flush(zstandard.FLUSH_BLOCK)
+            self._current["uncompressed_bytes"] += len(data)
+            self.total += len(batch)
+
+    def _track(self, batch: List[Dict]):
+        current = self._current
+        ids = [str(r.get("id", "")) for r in batch]
+        timestamps = [t for t in (parse_timestamp((r.get("metadata") or {}).get("timestamp")) for r in batch)
+                      if t is not None]
+        current["records"] += len(batch)
+        low, high = min(ids, key=id_order), max(ids, key=id_order)
+        current["id_min"] = low if current["id_min"] is None else min(current["id_min"], low, key=id_order)
+        current["id_max"] = high if current["id_max"] is None else max(current["id_max"], high, key=id_order)
+        if timestamps:
+            low, high = min(timestamps).isoformat(), max(timestamps).isoformat()
+            current["timestamp_min"] = low if current["timestamp_min"] is None else min(current["timestamp_min"], low)
+            current["timestamp_max"] = high if current["timestamp_max"] is None else max(current["timestamp_max"], high)
+
+    def _write_manifest(self, complete: bool):
+        manifest = {
+            "prefix": self.prefix,
+            "format": "jsonl.zst",
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "complete": complete,
+            "records": sum(s["records"] for s in self.shards),
+            "shards": self.shards,
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def close(self) -> str:
+        self.flush()
+        if self._current is not None:
+            self._close_shard()
+        self._write_manifest(complete=True)
+        return self.manifest_path
+
+
+def write_jsonl_shards(records: Iterable, output_dir: str, prefix: str, **options) -> str:
+    writer = ZstdJsonlShardWriter(output_dir, prefix, **options)
+    for record in records:
+        writer.write(record)
+    path = writer.close()
+    logging.info(f"{writer.total} registros salvos em {len(writer.shards)} shards (manifest {path})")
+    return path
+
+
+def iter_records(manifest_path: str, verify: bool = False) -> Iterator[Dict]:
+    """Lê os registros dos shards listados em um manifest, opcionalmente conferindo o sha256."""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(manifest_path)
+    decompressor = zstandard.ZstdDecompressor()
+    for shard in manifest["shards"]:
+        path = os.path.join(base_dir, shard["path"])
+        if verify and not verify_shard(path, shard):
+            raise ValueError(f"Checksum inválido em {path}")
+        with open(path, "rb") as f, decompressor.stream_reader(f) as reader:
+            buffer = b""
+            for chunk in iter(lambda: reader.read(1 << 20), b""):
+                buffer += chunk
+                lines = buffer.split(b"\n")
+                buffer = lines.pop()
+                for line in lines:
+                    if line:
+                        yield json.loads(line)
+            if buffer.strip():
+                yield json.loads(buffer)
+
+
+def verify_shard(path: str, shard: Dict) -> bool:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest() == shard["sha256"]
+
+
+def write_msgpack(records: Iterable, path: str, batch_size: int = 1000) -> str:
+    """Grava os registros em msgpack (um objeto por registro), serializando em lotes."""
+    batch = []
+    with open(path, "wb") as f:
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                if VALIDATE:
+                    validate_records(batch)
+                f.write(encode_msgpack(batch))
+                batch = []
+        if batch:
+            if VALIDATE:
+                validate_records(batch)
+            f.write(encode_msgpack(batch))
+    return path
+
+
+def save_records(records: Iterable, output_file: str, fmt: str, source: str,
+                 shard_max_bytes: int = SHARD_MAX_BYTES, shard_max_records: Optional[int] = None) -> str:
+    """Grava os registros no formato ``fmt`` ao lado de ``output_file`` e retorna o caminho.
+
+    Em ``jsonl.zst`` o retorno é o manifest dos shards.
+    """
+    if fmt == "parquet":
+        return write_parquet(records, with_suffix(output_file, ".parquet"), source)
+    if fmt == "jsonl.zst":
+        prefix = os.path.splitext(os.path.basename(output_file))[0]
+        return write_jsonl_shards(records, os.path.dirname(output_file), prefix,
+                                  shard_max_bytes=shard_max_bytes, shard_max_records=shard_max_records)
+    if fmt == "msgpack":
+        return write_msgpack(records, with_suffix(output_file, ".msgpack"))
+    raise ValueError(f"Formato de saída desconhecido: {fmt}")
+
+
+def read_parquet(path: str, sources: Optional[Sequence[str]] = None, types: Optional[Sequence[str]] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 columns: Optional[Sequence[str]] = None) -> "pyarrow.Table":
+    """Lê um ou mais arquivos Parquet filtrando por origem, tipo e intervalo de datas.
+
+    Os filtros são aplicados pelo leitor com as estatísticas de cada row
+    group, então grupos fora do filtro nem são lidos.
+    """
+    import pyarrow.parquet as pq
+
+    filters = []
+    if sources:
+        filters.append(("source", "in", list(sources)))
+    if types:
+        filters.append(("type", "in", list(types)))
+    if since is not None:
+        filters.append(("timestamp", ">=", parse_timestamp(since)))
+    if until is not None:
+        filters.append(("timestamp", "<", parse_timestamp(until)))
+    return pq.read_table(path, columns=list(columns) if columns else None, filters=filters or None)
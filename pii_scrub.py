@@ -0,0 +1,170 @@
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Padrões de dados pessoais e segredos, na ordem de prioridade da alternância.
+# A chave privada vem primeiro (não começa em fronteira de palavra); os demais
+# são tentados só no início de palavras.
+PRIVATE_KEY_PATTERN = (
+    r"-----BEGIN (?:[A-Z0-9]+ )*PRIVATE KEY-----[\s\S]*?-----END (?:[A-Z0-9]+ )*PRIVATE KEY-----"
+)
+PII_PATTERNS = (
+    ("aws_access_key", r"(?:AKIA|ASIA)[0-9A-Z]{16}\b"),
+    ("github_token", r"(?:gh[pousr]_[A-Za-z0-9]{36,255}|github_pat_[A-Za-z0-9_]{22,255})\b"),
+    ("slack_token", r"xox[abposr]-[A-Za-z0-9-]{10,}"),
+    ("google_api_key", r"AIza[0-9A-Za-z_\-]{35}"),
+    ("jwt", r"eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}"),
+    # o valor precisa parecer um literal (entre aspas ou uma sequência longa
+    # base64/hex com dígitos), para não pegar código como ``token = self.get_token()``
+    ("secret_assignment",
+     r"(?i:(?:api[_-]?key|secret|token|passw(?:or)?d)\b[\"']?\s*[:=]\s*"
+     r"(?:\"[^\s\"]{8,}\"|'[^\s']{8,}'"
+     r"|(?=[A-Za-z+/_=-]*\d)[A-Za-z0-9+/_=-]{20,}(?![A-Za-z0-9+/_=(.\[-])))"),
+    ("email", r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b"),
+    ("ipv4", r"(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)\b"),
+    # forma abreviada com ao menos três ":" (``2001:db8::1``) ou um primeiro grupo
+    # de 4 dígitos hex (``fe80::1``): ``arr[1::2]`` e ``a::b`` são código
+    ("ipv6", r"(?:[0-9A-Fa-f]{1,4}:){7}[0-9A-Fa-f]{1,4}\b"
+             r"|(?:[0-9A-Fa-f]{1,4}:){2,6}:(?:[0-9A-Fa-f]{1,4}:){0,4}[0-9A-Fa-f]{1,4}\b"
+             r"|[0-9A-Fa-f]{1,4}::(?:[0-9A-Fa-f]{1,4}:){1,5}[0-9A-Fa-f]{1,4}\b"
+             r"|(?=[A-Fa-f]{0,3}\d)[0-9A-Fa-f]{4}::[0-9A-Fa-f]{1,4}\b"),
+)
+KINDS = ("private_key",) + tuple(name for name, _ in PII_PATTERNS)
+ACTIONS = ("redact", "drop", "off")
+# Abaixo disso o lote é processado no próprio processo
+CHUNK_SIZE = 2000
+
+
+def compile_patterns() -> "re.Pattern":
+    """Todos os padrões em uma única expressão, com um grupo nomeado por tipo."""
+    alternatives = "|".join(f"(?P<{name}>{pattern})" for name, pattern in PII_PATTERNS)
+    return re.compile(f"(?P<private_key>{PRIVATE_KEY_PATTERN})|\\b(?:{alternatives})")
+
+
+class PiiScrubber:
+    """Remove dados pessoais e segredos do ``content`` dos registros em uma passada.
+
+    Com ``action="redact"`` cada ocorrência vira ``[TIPO]``; com ``"drop"`` o
+    registro com qualquer ocorrência é descartado. Tipos em ``drop_kinds``
+    descartam o registro mesmo no modo ``redact`` (ex.: chaves privadas).
+    As ocorrências e descartes são contados por origem em ``hits`` e ``dropped``.
+    """
+
+    def __init__(self, action: str = "redact", drop_kinds: Sequence[str] = (),
+                 workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE):
+        if action not in ACTIONS:
+            raise ValueError(f"Ação desconhecida: {action}")
+        unknown = set(drop_kinds) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Tipos desconhecidos: {', '.join(sorted(unknown))}")
+        self.action = action
+        self.drop_kinds = frozenset(drop_kinds)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.pattern = compile_patterns()
+        self.hits: Dict[str, Counter] = defaultdict(Counter)
+        self.dropped: Counter = Counter()
+
+    def scrub_text(self, text: str) -> Tuple[str, Counter]:
+        hits = Counter()
+
+        def replace(match):
+            kind = match.lastgroup
+            hits[kind] += 1
+            return f"[{kind.upper()}]"
+
+        return self.pattern.sub(replace, text), hits
+
+    def _scrub_chunk(self, records: List) -> Tuple[List, Counter, int]:
+        kept = []
+        hits = Counter()
+        dropped = 0
+        for record in records:
+            is_dict = isinstance(record, dict)
+            content = record.get("content") if is_dict else record.content
+            if content:
+                content, record_hits = self.scrub_text(content)
+                if record_hits:
+                    hits.update(record_hits)
+                    if self.action == "drop" or not self.drop_kinds.isdisjoint(record_hits):
+                        dropped += 1
+                        continue
+                    if is_dict:
+                        record["content"] = content
+                    else:
+                        record.content = content
+            kept.append(record)
+        return kept, hits, dropped
+
+    def _count(self, source: str, hits: Counter, dropped: int):
+        self.hits[source].update(hits)
+        self.dropped[source] += dropped
+
+    def scrub_record(self, record, source: str):
+        """Versão de um registro só (para gravação em streaming); retorna None se descartado."""
+        if self.action == "off":
+            return record
+        kept, hits, dropped = self._scrub_chunk([record])
+        self._count(source, hits, dropped)
+        return kept[0] if kept else None
+
+    def scrub(self, records: Sequence, source: str) -> List:
+        """Limpa um lote de registros; lotes grandes são divididos entre processos."""
+        if self.action == "off":
+            return list(records)
+        chunks = [records[i:i + self.chunk_size] for i in range(0, len(records), self.chunk_size)]
+        if len(chunks) <= 1 or self.workers <= 1:
+            results = [self._scrub_chunk(list(chunk)) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(chunks)),
+                initializer=_init_worker,
+                initargs=(self.action, tuple(self.drop_kinds)),
+            ) as executor:
+                results = list(executor.map(_scrub_chunk, chunks))
+        kept = []
+        for chunk_kept, hits, dropped in results:
+            kept.extend(chunk_kept)
+            self._count(source, hits, dropped)
+        self.report(source)
+        return kept
+
+    def report(self, source: Optional[str] = None):
+        for name in [source] if source else sorted(self.hits):
+            hits = self.hits.get(name) or Counter()
+            summary = ", ".join(f"{kind}={count}" for kind, count in hits.most_common()) or "nenhuma"
+            logging.info(f"PII em {name}: {summary}; {self.dropped[name]} registros descartados")
+
+
+# Scrubber de cada processo do pool (preenchido pelo initializer)
+_WORKER: Dict = {}
+
+
+def _init_worker(action: str, drop_kinds: Tuple[str, ...]):
+    _WORKER["scrubber"] = PiiScrubber(action, drop_kinds, workers=1)
+
+
+def _scrub_chunk(records: List) -> Tuple[List, Counter, int]:
+    return _WORKER["scrubber"]._scrub_chunk(records)
+
+
+def add_scrub_arguments(parser, default: str = "redact"):
+    parser.add_argument("--scrub", choices=ACTIONS, default=default,
+                        help="Dados pessoais e segredos no conteúdo: redact (substitui por [TIPO]), "
+                             "drop (descarta o registro) ou off")
+    parser.add_argument("--scrub-drop", default="private_key",
+                        help=f"Tipos que descartam o registro mesmo com --scrub redact ({', '.join(KINDS)})")
+    parser.add_argument("--scrub-workers", type=int, default=None, help="Processos da limpeza de PII")
+
+
+def scrubber_from_args(args) -> PiiScrubber:
+    drop_kinds = [kind.strip() for kind in (args.scrub_drop or "").split(",") if kind.strip()]
+    return PiiScrubber(args.scrub, drop_kinds, workers=args.scrub_workers)
+
+
+def scrub_records(records: Iterable, source: str, args) -> List:
+    """Atalho dos CLIs: limpa os registros conforme ``add_scrub_arguments``."""
+    return scrubber_from_args(args).scrub(list(records), source)
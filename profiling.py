@@ -0,0 +1,295 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
+
+CPU_PROFILERS = ("cprofile", "sample")
+SAMPLE_INTERVAL_MS = 5
+# Quadros guardados por alocação; cada quadro a mais encarece bastante código recursivo (ex.: bs4)
+TRACEMALLOC_FRAMES = 1
+TOP_LINES = 30
+
+# Temporizador de fases da execução atual (None quando --phase-times está desligado)
+_ACTIVE: Optional["PhaseTimer"] = None
+_NULL = nullcontext()
+
+
+class _Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: "PhaseTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer._stack().append(0.0)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer._finish(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class PhaseTimer:
+    """Tempo de parede por fase (fetch, parse, model, serialize...).
+
+    Fases aninhadas contam só o tempo exclusivo: o tempo de uma fase interna
+    é descontado da externa. Com várias threads os tempos são somados entre
+    elas e podem passar do tempo total da execução.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Counter = Counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started = time.perf_counter()
+        self._patches: List[Tuple[object, str, Callable]] = []
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _finish(self, name: str, elapsed: float):
+        stack = self.local.stack
+        child = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with self.lock:
+            self.seconds[name] += elapsed - child
+            self.calls[name] += 1
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def wrap(self, owner, attribute: str, name: str):
+        """Mede todas as chamadas de ``owner.attribute`` como a fase ``name`` até ``restore``."""
+        original = getattr(owner, attribute)
+        timer = self
+
+        def timed(*args, **kwargs):
+            stack = timer._stack()
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timer._finish(name, time.perf_counter() - start)
+
+        setattr(owner, attribute, timed)
+        self._patches.append((owner, attribute, original))
+
+    def instrument(self):
+        """Instrumenta rede, parsing e construção de registros sem mexer nos scrapers."""
+        import requests
+        from records import Record
+
+        self.wrap(requests.adapters.HTTPAdapter, "send", "fetch")
+        self.wrap(requests.models.Response, "json", "parse")
+        self.wrap(Record, "__init__", "model")
+        for module, owner in (("bs4", "BeautifulSoup"), ("parsel", "Selector")):
+            try:
+                cls = getattr(__import__(module), owner)
+            except ImportError:
+                continue
+            self.wrap(cls, "__init__", "parse")
+
+    def restore(self):
+        for owner, attribute, original in reversed(self._patches):
+            setattr(owner, attribute, original)
+        self._patches = []
+
+    def report(self) -> Dict:
+        wall = time.perf_counter() - self.started
+        measured = sum(self.seconds.values())
+        phases = {
+            name: {"seconds": round(seconds, 4), "calls": self.calls[name]}
+            for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])
+        }
+        return {"wall_seconds": round(wall, 4), "phases": phases, "other_seconds": round(max(wall - measured, 0), 4)}
+
+
+def phase(name: str):
+    """Marca um trecho como fase ``name``; sem custo quando o temporizador está desligado."""
+    timer = _ACTIVE
+    return timer.span(name) if timer is not None else _NULL
+
+
+class StackSampler(threading.Thread):
+    """Amostra as pilhas de todas as threads a cada ``interval`` segundos.
+
+    O resultado é gravado no formato "collapsed stacks" (uma pilha por linha,
+    seguida da contagem), aceito por flamegraph.pl e speedscope.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        leaves = Counter()
+        for stack, count in self.counts.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        for leaf, count in leaves.most_common(10):
+            logging.info(f"  {count / total:6.1%} {leaf}")
+
+
+class MemorySnapshots(threading.Thread):
+    """Tira snapshots do tracemalloc a cada ``interval`` segundos e anota as maiores alocações."""
+
+    def __init__(self, interval: float, path: str):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.path = path
+        self.stopped = threading.Event()
+        self.started = time.perf_counter()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.snapshot()
+
+    def snapshot(self):
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(f"# t={time.perf_counter() - self.started:.1f}s atual={current / 1e6:.1f} MB "
+                    f"pico={peak / 1e6:.1f} MB\n")
+            for stat in snapshot.statistics("lineno")[:TOP_LINES]:
+                f.write(f"{stat}\n")
+            f.write("\n")
+        return snapshot
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def profile_base(output: str) -> str:
+    """Prefixo dos arquivos de perfil, ao lado da saída (arquivo ou diretório)."""
+    if os.path.isdir(output) or not os.path.splitext(output)[1]:
+        return os.path.join(output, "profile")
+    return os.path.splitext(output)[0]
+
+
+@contextmanager
+def profiled(output: str, cpu: Optional[str] = None, sample_interval_ms: float = SAMPLE_INTERVAL_MS,
+             memory_interval: float = 0, memory_frames: int = TRACEMALLOC_FRAMES, phase_times: bool = False):
+    """Executa o bloco com os perfis pedidos e grava os resultados ao lado de ``output``.
+
+    - ``cpu="cprofile"``: ``<base>.prof`` (pstats) e ``<base>.prof.txt``; mede só a thread principal.
+    - ``cpu="sample"``: ``<base>.samples.txt`` com as pilhas de todas as threads.
+    - ``memory_interval``: snapshots do tracemalloc em ``<base>.memory.txt`` e o
+      último em ``<base>.tracemalloc`` (``tracemalloc.Snapshot.load``).
+    - ``phase_times``: ``<base>.phases.json`` com o tempo por fase.
+    """
+    global _ACTIVE
+    if not (cpu or memory_interval or phase_times):
+        yield
+        return
+    base = profile_base(output)
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    profiler = sampler = memory = timer = None
+    if phase_times:
+        timer = PhaseTimer()
+        timer.instrument()
+        _ACTIVE = timer
+    if memory_interval:
+        import tracemalloc
+
+        tracemalloc.start(memory_frames)
+        if os.path.exists(base + ".memory.txt"):
+            os.remove(base + ".memory.txt")
+        memory = MemorySnapshots(memory_interval, base + ".memory.txt")
+        memory.start()
+    if cpu == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif cpu == "sample":
+        sampler = StackSampler(sample_interval_ms / 1000)
+        sampler.start()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            import pstats
+
+            profiler.disable()
+            profiler.dump_stats(base + ".prof")
+            with open(base + ".prof.txt", "w", encoding="utf-8") as f:
+                pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(TOP_LINES * 2)
+            logging.info(f"Perfil de CPU salvo em {base}.prof")
+        if sampler is not None:
+            sampler.stop()
+            logging.info(f"Amostras de CPU ({sum(sampler.counts.values())}) salvas em {base}.samples.txt:")
+            sampler.save(base + ".samples.txt")
+        if memory is not None:
+            import tracemalloc
+
+            memory.stop()
+            memory.snapshot().dump(base + ".tracemalloc")
+            tracemalloc.stop()
+            logging.info(f"Snapshots de memória salvos em {base}.memory.txt")
+        if timer is not None:
+            _ACTIVE = None
+            timer.restore()
+            report = timer.report()
+            with open(base + ".phases.json", "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            summary = ", ".join(f"{name}={info['seconds']:.2f}s" for name, info in report["phases"].items())
+            logging.info(f"Tempo por fase ({report['wall_seconds']:.2f}s no total): {summary or 'nenhuma'}, "
+                         f"outros={report['other_seconds']:.2f}s")
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--cpu-profile", choices=CPU_PROFILERS, default=None,
+                        help="Perfil de CPU: cprofile (determinístico) ou sample (amostragem de todas as threads)")
+    parser.add_argument("--sample-interval", type=float, default=SAMPLE_INTERVAL_MS,
+                        help="Intervalo da amostragem de CPU (ms)")
+    parser.add_argument("--memory-profile", type=float, default=0, metavar="SECONDS",
+                        help="Snapshots do tracemalloc a cada N segundos")
+    parser.add_argument("--memory-frames", type=int, default=TRACEMALLOC_FRAMES,
+                        help="Quadros de pilha por alocação no tracemalloc (mais quadros, mais lento)")
+    parser.add_argument("--phase-times", action="store_true",
+                        help="Tempo por fase (fetch, parse, model, serialize)")
+
+
+def profiled_from_args(args, output: str):
+    """Atalho dos CLIs: ``with profiled_from_args(args, args.output): ...``."""
+    return profiled(output, cpu=args.cpu_profile, sample_interval_ms=args.sample_interval,
+                    memory_interval=args.memory_profile, memory_frames=args.memory_frames,
+                    phase_times=args.phase_times)
@@ -0,0 +1,269 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from records import dumps, encode_jsonl, loads
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quality_rules.json")
+FEATURES = ("length", "lines", "alnum_ratio", "dup_line_ratio", "ngram_repetition", "url_density")
+# (limite, atributo, comparação) na ordem em que os motivos são avaliados
+CHECKS = (
+    ("min_length", "length", "min"),
+    ("min_lines", "lines", "min"),
+    ("min_alnum_ratio", "alnum_ratio", "min"),
+    ("max_dup_line_ratio", "dup_line_ratio", "max"),
+    ("max_ngram_repetition", "ngram_repetition", "max"),
+    ("max_url_density", "url_density", "max"),
+)
+# Códigos de rejeição: 0 = aceito, i + 1 = REASONS[i]
+REASONS = tuple(limit for limit, _, _ in CHECKS) + ("boilerplate",)
+NGRAM = 3
+BATCH_SIZE = 10000
+# Padrões de boilerplate só são procurados em textos curtos
+BOILERPLATE_MAX_CHARS = 200
+
+# Tabela de letras e dígitos por code point. Fora do ASCII é uma aproximação por
+# faixas: letras latinas e de outros alfabetos e ideogramas entram; pontuação,
+# símbolos, setas e emoji não
+_ALNUM = np.zeros(0x110000, dtype=bool)
+for _c in "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ":
+    _ALNUM[ord(_c)] = True
+_ALNUM[0xC0:0x2000] = True
+_ALNUM[0x3040:0x1F000] = True
+_ALNUM[[0xD7, 0xF7]] = False
+# Bits do hash usados quando o registro é combinado ao valor em uma chave única de ordenação
+_HASH_BITS = 40
+
+
+def _repetition(groups: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Total e fração repetida de hashes por registro, em uma ordenação para o lote todo."""
+    counts = np.fromiter(map(len, groups), dtype=np.int64, count=len(groups))
+    ratio = np.zeros(len(groups))
+    if not counts.any():
+        return counts, ratio
+    values = np.fromiter(chain.from_iterable(groups), dtype=np.int64, count=int(counts.sum()))
+    owners = np.repeat(np.arange(len(groups)), counts)
+    return counts, _repeated_fraction(values, owners, counts)
+
+
+def _repeated_fraction(values: np.ndarray, owners: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # registro nos bits altos e hash truncado nos baixos: uma única ordenação agrupa por registro
+    keys = (owners.astype(np.uint64) << np.uint64(_HASH_BITS)) | (
+        values.view(np.uint64) & np.uint64((1 << _HASH_BITS) - 1))
+    keys.sort()
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    unique = np.bincount((keys[first] >> np.uint64(_HASH_BITS)).astype(np.int64), minlength=len(counts))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, 1.0 - unique / np.maximum(counts, 1), 0.0)
+
+
+def compute_features(texts: Sequence[str], ngram: int = NGRAM) -> Dict[str, np.ndarray]:
+    """Calcula as ``FEATURES`` de um lote de textos como arrays NumPy."""
+    count = len(texts)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=count)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    codepoints = np.frombuffer("".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    alnum = np.concatenate(([0], np.cumsum(_ALNUM[codepoints])))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alnum_ratio = np.where(lengths > 0, (alnum[ends] - alnum[starts]) / np.maximum(lengths, 1), 0.0)
+
+    lines = [[hash(line) for line in (l.strip() for l in text.splitlines()) if line] for text in texts]
+    line_counts, dup_line_ratio = _repetition(lines)
+
+    # n-gramas de palavras: hashes combinados no lote inteiro, sem cruzar registros
+    words = [list(map(hash, text.split())) for text in texts]
+    word_counts = np.fromiter(map(len, words), dtype=np.int64, count=count)
+    ngram_repetition = np.zeros(count)
+    if word_counts.sum() >= ngram:
+        hashes = np.fromiter(chain.from_iterable(words), dtype=np.int64, count=int(word_counts.sum()))
+        owners = np.repeat(np.arange(count), word_counts)
+        size = len(hashes) - ngram + 1
+        combined = hashes[:size].astype(np.uint64)
+        for i in range(1, ngram):
+            combined = combined * np.uint64(1000003) ^ hashes[i:i + size].astype(np.uint64)
+        valid = owners[:size] == owners[ngram - 1:]
+        ngram_counts = np.bincount(owners[:size][valid], minlength=count)
+        ngram_repetition = _repeated_fraction(combined[valid].view(np.int64), owners[:size][valid], ngram_counts)
+
+    urls = np.fromiter((t.count("http://") + t.count("https://") for t in texts), dtype=np.int64, count=count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        url_density = np.where(word_counts > 0, urls / np.maximum(word_counts, 1), 0.0)
+    return {
+        "length": lengths,
+        "lines": line_counts,
+        "alnum_ratio": alnum_ratio,
+        "dup_line_ratio": dup_line_ratio,
+        "ngram_repetition": ngram_repetition,
+        "url_density": url_density,
+    }
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _get(record, field: str):
+    return record.get(field) if isinstance(record, dict) else getattr(record, field)
+
+
+class QualityFilter:
+    """Descarta registros vazios, curtos, repetitivos, com muitos símbolos ou boilerplate.
+
+    As features são calculadas por lote (``compute_features``) e comparadas
+    com os limites do tipo do registro (``metadata.type``), que sobrescrevem
+    os de ``default`` no arquivo de regras. Os motivos de rejeição são
+    contados por origem em ``report``.
+    """
+
+    def __init__(self, rules: Dict[str, Dict], batch_size: int = BATCH_SIZE):
+        default = rules.get("default", {})
+        self.rules = {name: {**default, **values} for name, values in rules.items()}
+        self.batch_size = batch_size
+        self.report: Dict[str, Dict] = defaultdict(lambda: {"total": 0, "kept": 0, "rejected": Counter()})
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None, **kwargs) -> "QualityFilter":
+        path = path or os.getenv("QUALITY_RULES", DEFAULT_RULES_FILE)
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def evaluate(self, batch: Sequence) -> np.ndarray:
+        """Código de rejeição de cada registro (0 = aceito; ver ``REASONS``)."""
+        texts = [_get(r, "content") or "" for r in batch]
+        types = np.array([str((_get(r, "metadata") or {}).get("type", "")) for r in batch], dtype=object)
+        features = compute_features(texts)
+        codes = np.zeros(len(batch), dtype=np.int8)
+        for record_type in set(types):
+            rule = self.rules.get(record_type, self.rules.get("default", {}))
+            selected = types == record_type
+            for code, (limit, feature, kind) in enumerate(CHECKS, start=1):
+                if limit not in rule:
+                    continue
+                values = features[feature]
+                failed = (values < rule[limit]) if kind == "min" else (values > rule[limit])
+                codes[selected & failed & (codes == 0)] = code
+            patterns = [p.lower() for p in rule.get("boilerplate", [])]
+            if patterns:
+                for index in np.flatnonzero(selected & (codes == 0)):
+                    text = texts[index]
+                    if len(text) <= BOILERPLATE_MAX_CHARS and any(p in text.lower() for p in patterns):
+                        codes[index] = len(REASONS)
+        return codes
+
+    def filter(self, records: Iterable, source: str) -> Iterator:
+        """Gera os registros aceitos, processando em lotes de ``batch_size``."""
+        stats = self.report[source]
+        for batch in _batches(records, self.batch_size):
+            codes = self.evaluate(batch)
+            stats["total"] += len(batch)
+            stats["kept"] += int((codes == 0).sum())
+            for code, count in zip(*np.unique(codes[codes > 0], return_counts=True)):
+                stats["rejected"][REASONS[code - 1]] += int(count)
+            yield from (record for record, code in zip(batch, codes) if code == 0)
+
+    def report_dict(self) -> Dict[str, Dict]:
+        return {source: {**stats, "rejected": dict(stats["rejected"])} for source, stats in self.report.items()}
+
+
+def source_name(path: str) -> str:
+    """Origem a partir do nome do arquivo: ``slack_data.json`` -> ``slack``, ``docs-00003.jsonl`` -> ``docs``."""
+    name = os.path.basename(path)
+    for suffix in (".manifest.json", ".jsonl.gz", ".jsonl", ".json"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    name = re.sub(r"-\d{5}$", "", name)
+    return re.sub(r"_data$", "", name)
+
+
+def _iter_jsonl(path: str) -> Iterator[Dict]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def filter_file(path: str, output_dir: str, rules_file: Optional[str] = None,
+                batch_size: int = BATCH_SIZE) -> Dict[str, Dict]:
+    """Filtra um arquivo de saída para ``output_dir`` (mesmo nome e formato) e retorna o relatório."""
+    quality = QualityFilter.from_file(rules_file, batch_size=batch_size)
+    source = source_name(path)
+    os.makedirs(output_dir, exist_ok=True)
+    target = os.path.join(output_dir, os.path.basename(path))
+    if path.endswith(".manifest.json"):
+        from output_formats import iter_records, write_jsonl_shards
+
+        prefix = os.path.basename(path)[:-len(".manifest.json")]
+        write_jsonl_shards(quality.filter(iter_records(path), source), output_dir, prefix)
+    elif path.endswith(".json"):
+        with open(path, "rb") as f:
+            document = loads(f.read())
+        if isinstance(document, dict):
+            document["data"] = list(quality.filter(document.get("data", []), source))
+        else:
+            document = list(quality.filter(document, source))
+        with open(target, "wb") as f:
+            f.write(dumps(document, indent=True))
+    else:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(target, "wb") as out:
+            for batch in _batches(quality.filter(_iter_jsonl(path), source), batch_size):
+                out.write(encode_jsonl(batch))
+    return quality.report_dict()
+
+
+def merge_reports(reports: Iterable[Dict[str, Dict]]) -> Dict[str, Dict]:
+    merged: Dict[str, Dict] = {}
+    for report in reports:
+        for source, stats in report.items():
+            total = merged.setdefault(source, {"total": 0, "kept": 0, "rejected": Counter()})
+            total["total"] += stats["total"]
+            total["kept"] += stats["kept"]
+            total["rejected"].update(stats["rejected"])
+    return {source: {**stats, "rejected": dict(stats["rejected"])} for source, stats in merged.items()}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Filtra registros de baixa qualidade dos arquivos de saída")
+    parser.add_argument("paths", nargs="+", help="Arquivos .json/.jsonl/.jsonl.gz ou manifests jsonl.zst")
+    parser.add_argument("--output-dir", default="filtered", help="Diretório dos arquivos filtrados")
+    parser.add_argument("--rules", default=None, help="Arquivo de limites por tipo (ou QUALITY_RULES)")
+    parser.add_argument("--report", default="quality_report.json", help="Relatório de rejeições por origem")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Registros por lote")
+    parser.add_argument("--workers", type=int, default=None, help="Arquivos processados em paralelo")
+    args = parser.parse_args()
+
+    reports = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(filter_file, path, args.output_dir, args.rules, args.batch_size): path
+                   for path in args.paths}
+        for future in as_completed(futures):
+            try:
+                reports.append(future.result())
+            except Exception as e:
+                logging.error(f"Erro ao filtrar {futures[future]}: {e}")
+    report = merge_reports(reports)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    for source, stats in sorted(report.items()):
+        logging.info(f"{source}: {stats['kept']}/{stats['total']} registros mantidos; rejeições {stats['rejected']}")
@@ -0,0 +1,168 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from profiling import phase
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json da biblioteca padrão
+    orjson = None
+
+# Valores de metadata que se repetem entre registros e são compartilhados
+INTERNED_KEYS = ("language", "type")
+REQUIRED_METADATA = ("url", "timestamp", "tags", "language", "type")
+# Limite de cada pool; acima dele valores novos não são mais guardados
+INTERN_POOL_SIZE = 100000
+# RECORDS_VALIDATE=1 liga a validação por lote em write_json e nos writers de shards
+VALIDATE = os.getenv("RECORDS_VALIDATE", "") == "1"
+
+_POOL: Dict[str, str] = {}
+_TAGS: Dict[tuple, tuple] = {}
+_URLS: Dict[str, str] = {}
+
+
+def intern_value(value):
+    """Devolve a instância compartilhada de ``value`` (strings e listas de tags).
+
+    Só listas e tuplas formadas apenas por strings são tratadas: uma tupla é
+    trocada pela tupla compartilhada e uma lista vira uma lista nova com as
+    strings compartilhadas (o tipo é mantido). Outros valores, como as labels
+    do GitHub em dicts, voltam intactos.
+    """
+    if isinstance(value, str):
+        cached = _POOL.get(value)
+        if cached is not None:
+            return cached
+        if len(_POOL) < INTERN_POOL_SIZE:
+            _POOL[value] = value
+        return value
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        return value
+    if isinstance(value, list):
+        return [intern_value(v) for v in value]
+    key = tuple(intern_value(v) for v in value)
+    cached = _TAGS.get(key)
+    if cached is not None:
+        return cached
+    if len(_TAGS) < INTERN_POOL_SIZE:
+        _TAGS[key] = key
+    return key
+
+
+def intern_url(url: str) -> str:
+    """Compartilha URLs repetidas (página base de wikis, canais, datasets).
+
+    Fica em um pool separado para que URLs únicas não ocupem o espaço de
+    idiomas e tipos.
+    """
+    cached = _URLS.get(url)
+    if cached is not None:
+        return cached
+    if len(_URLS) < INTERN_POOL_SIZE:
+        _URLS[url] = url
+    return url
+
+
+@dataclass(slots=True)
+class Record:
+    """Registro ``{id, content, metadata}`` comum a todos os scrapers.
+
+    Substitui os modelos pydantic idênticos de cada módulo: não valida nada
+    na construção (ver ``validate_records``) e compartilha os valores
+    repetidos de metadata (tags, idioma, tipo, URL).
+    """
+
+    id: str
+    content: str
+    metadata: dict
+
+    def __post_init__(self):
+        # cópia rasa: o dict de quem chamou não é alterado
+        metadata = self.metadata = dict(self.metadata)
+        for key in INTERNED_KEYS:
+            value = metadata.get(key)
+            if isinstance(value, str):
+                metadata[key] = intern_value(value)
+        url = metadata.get("url")
+        if isinstance(url, str):
+            metadata["url"] = intern_url(url)
+        tags = metadata.get("tags")
+        if isinstance(tags, (list, tuple)):
+            metadata["tags"] = intern_value(tags)
+
+    def dict(self) -> dict:
+        return {"id": self.id, "content": self.content, "metadata": self.metadata}
+
+
+def validate_records(records: Sequence) -> None:
+    """Valida um lote de registros de uma vez; levanta ``ValueError`` com os inválidos."""
+    errors = []
+    for index, record in enumerate(records):
+        data = record.dict() if isinstance(record, Record) else record
+        if not isinstance(data, dict):
+            errors.append(f"{index}: não é um registro")
+            continue
+        if not isinstance(data.get("id"), str) or not isinstance(data.get("content"), str):
+            errors.append(f"{index}: id e content devem ser strings")
+        metadata = data.get("metadata")
+        if not isinstance(metadata, dict):
+            errors.append(f"{index}: metadata deve ser um dict")
+            continue
+        missing = [key for key in REQUIRED_METADATA if key not in metadata]
+        if missing:
+            errors.append(f"{index}: metadata sem {', '.join(missing)}")
+    if errors:
+        raise ValueError(f"Registros inválidos ({len(errors)} problemas): " + "; ".join(errors[:10]))
+
+
+def _default(value):
+    if isinstance(value, Record):
+        return value.dict()
+    if isinstance(value, tuple):
+        return list(value)
+    if hasattr(value, "dict"):
+        return value.dict()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def dumps(value, indent: bool = False) -> bytes:
+    """JSON em UTF-8; usa orjson quando instalado (Records são serializados nativamente)."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(value, default=_default, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def loads(data):
+    """Inverso de ``dumps`` (aceita bytes ou str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_jsonl(records: Iterable) -> bytes:
+    """Um lote de registros como JSONL (uma linha por registro)."""
+    with phase("serialize"):
+        return b"".join(dumps(record) + b"\n" for record in records)
+
+
+def encode_msgpack(records: Iterable) -> bytes:
+    """Um lote de registros em msgpack, um objeto por registro (legível com ``msgpack.Unpacker``)."""
+    import msgpack
+
+    packer = msgpack.Packer(default=_default, use_bin_type=True)
+    with phase("serialize"):
+        return b"".join(packer.pack(record) for record in records)
+
+
+def write_json(records: List, path: str, envelope: Optional[Dict] = None, validate: Optional[bool] = None):
+    """Grava os registros como o JSON indentado dos ``save_to_json``.
+
+    Com ``envelope`` o resultado é ``{**envelope, "data": registros}``.
+    """
+    if VALIDATE if validate is None else validate:
+        validate_records(records)
+    value = {**envelope, "data": records} if envelope is not None else records
+    with phase("serialize"), open(path, "wb") as f:
+        f.write(dumps(value, indent=True))
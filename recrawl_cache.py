@@ -0,0 +1,254 @@
+import hashlib
+import logging
+import sqlite3
+import time
+import zlib
+from typing import Dict, Optional
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+# Uma store por arquivo, compartilhada pelos middlewares de download e de spider
+# e por todos os crawlers do mesmo processo
+_STORES: Dict[str, "RecrawlStore"] = {}
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class RecrawlStore:
+    """Validadores, corpo comprimido e hashes de seções por URL em SQLite.
+
+    O total de bytes dos corpos é limitado por ``max_bytes``; ao ultrapassá-lo
+    as páginas acessadas há mais tempo (e suas seções) são removidas.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024, commit_every: int = 200):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self._pending = 0
+        self._crawlers = set()
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                body_hash TEXT,
+                body BLOB,
+                size INTEGER,
+                accessed REAL
+            );
+            CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed);
+            CREATE TABLE IF NOT EXISTS sections (
+                url TEXT,
+                section_id TEXT,
+                hash TEXT,
+                PRIMARY KEY (url, section_id)
+            );
+            """
+        )
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get_page(self, url: str) -> Optional[Dict]:
+        row = self.db.execute(
+            "SELECT etag, last_modified, content_type, body_hash, body FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("etag", "last_modified", "content_type", "body_hash", "body"), row))
+
+    def touch(self, url: str):
+        self.db.execute("UPDATE pages SET accessed = ? WHERE url = ?", (time.time(), url))
+        self._maybe_commit()
+
+    def put_page(self, url: str, etag: Optional[str], last_modified: Optional[str],
+                 content_type: Optional[str], body_hash: str, body: bytes):
+        compressed = zlib.compress(body)
+        old = self.db.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+        self.db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, content_type, body_hash, compressed, len(compressed), time.time()),
+        )
+        self.total_bytes += len(compressed) - (old[0] if old else 0)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+        self._maybe_commit()
+
+    def evict(self):
+        """Remove páginas LRU até ficar abaixo de 90% do limite."""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        cursor = self.db.execute("SELECT url, size FROM pages ORDER BY accessed")
+        victims = []
+        for url, size in cursor:
+            if self.total_bytes <= target:
+                break
+            victims.append((url,))
+            self.total_bytes -= size
+            evicted += 1
+        self.db.executemany("DELETE FROM pages WHERE url = ?", victims)
+        self.db.executemany("DELETE FROM sections WHERE url = ?", victims)
+        logging.info(f"Cache de recrawl: {evicted} páginas removidas por limite de tamanho")
+
+    def section_changed(self, url: str, section_id: str, section_hash: str) -> bool:
+        row = self.db.execute(
+            "SELECT hash FROM sections WHERE url = ? AND section_id = ?", (url, section_id)
+        ).fetchone()
+        if row is not None and row[0] == section_hash:
+            return False
+        self.db.execute("INSERT OR REPLACE INTO sections VALUES (?, ?, ?)", (url, section_id, section_hash))
+        self._maybe_commit()
+        return True
+
+    def _maybe_commit(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.db.commit()
+            self._pending = 0
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    @classmethod
+    def for_crawler(cls, crawler) -> "RecrawlStore":
+        settings = crawler.settings
+        path = settings.get("RECRAWL_DB")
+        if not path:
+            raise NotConfigured("RECRAWL_DB não definido")
+        store = _STORES.get(path)
+        if store is None:
+            store = cls(path, max_bytes=settings.getint("RECRAWL_MAX_BYTES", 512 * 1024 * 1024))
+            _STORES[path] = store
+        if crawler not in store._crawlers:
+            store._crawlers.add(crawler)
+
+            def release():
+                store._crawlers.discard(crawler)
+                if not store._crawlers:
+                    _STORES.pop(path, None)
+                    store.close()
+
+            crawler.signals.connect(release, signal=signals.engine_stopped, weak=False)
+        return store
+
+
+class ConditionalRecrawlMiddleware:
+    """Downloader middleware que envia requisições condicionais no recrawl.
+
+    Respostas 304 (ou 200 com corpo idêntico ao armazenado) são reconstruídas a
+    partir do cache e marcadas com ``meta["recrawl_unchanged"]``, para que o
+    spider siga os links sem reextrair as seções.
+    """
+
+    def __init__(self, store: RecrawlStore, stats):
+        self.store = store
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(RecrawlStore.for_crawler(crawler), crawler.stats)
+
+    def process_request(self, request, spider=None):
+        if request.method != "GET":
+            return None
+        cached = self.store.get_page(request.url)
+        if cached is None:
+            return None
+        if cached["etag"]:
+            request.headers.setdefault("If-None-Match", cached["etag"])
+        if cached["last_modified"]:
+            request.headers.setdefault("If-Modified-Since", cached["last_modified"])
+        return None
+
+    def _from_cache(self, request, cached: Dict):
+        self.store.touch(request.url)
+        request.meta["recrawl_unchanged"] = True
+        headers = Headers({"Content-Type": cached["content_type"]} if cached["content_type"] else {})
+        body = zlib.decompress(cached["body"])
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=body)
+        return respcls(url=request.url, status=200, headers=headers, body=body,
+                       request=request, flags=["recrawl_cached"])
+
+    def process_response(self, request, response, spider=None):
+        if response.status not in (200, 304) or request.method != "GET":
+            return response
+        cached = self.store.get_page(request.url)
+        if response.status == 304 and cached is not None:
+            self.stats.inc_value("recrawl/not_modified")
+            return self._from_cache(request, cached)
+        if response.status != 200:
+            return response
+        body_hash = content_hash(response.body)
+        if cached is not None and cached["body_hash"] == body_hash:
+            self.stats.inc_value("recrawl/unchanged")
+            request.meta["recrawl_unchanged"] = True
+            self.store.touch(request.url)
+            return response
+        self.stats.inc_value("recrawl/changed" if cached is not None else "recrawl/new")
+        content_type = response.headers.get("Content-Type")
+        self.store.put_page(
+            request.url,
+            _header(response, "ETag"),
+            _header(response, "Last-Modified"),
+            content_type.decode("latin-1") if content_type else None,
+            body_hash,
+            response.body,
+        )
+        return response
+
+
+class RecrawlSectionFilter:
+    """Spider middleware que só deixa passar seções novas ou alteradas."""
+
+    def __init__(self, store: RecrawlStore, stats):
+        self.store = store
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(RecrawlStore.for_crawler(crawler), crawler.stats)
+
+    def _filter(self, result):
+        for item in result:
+            if isinstance(item, dict) and "content" in item:
+                url = item.get("metadata", {}).get("url", "")
+                if not self.store.section_changed(url, item.get("id", ""), content_hash(item["content"])):
+                    self.stats.inc_value("recrawl/sections_unchanged")
+                    continue
+            yield item
+
+    def process_spider_output(self, response, result, spider=None):
+        return self._filter(result)
+
+    async def process_spider_output_async(self, response, result, spider=None):
+        async for item in result:
+            for kept in self._filter([item]):
+                yield kept
+
+
+def _header(response, name: str) -> Optional[str]:
+    value = response.headers.get(name)
+    return value.decode("latin-1") if value else None
+
+
+def recrawl_settings(db_path: Optional[str], max_bytes: int = 512 * 1024 * 1024) -> Dict:
+    """Settings do Scrapy que ativam o recrawl condicional (vazio se desativado)."""
+    if not db_path:
+        return {}
+    return {
+        "RECRAWL_DB": db_path,
+        "RECRAWL_MAX_BYTES": max_bytes,
+        # abaixo do HttpCompressionMiddleware (590) para ver o corpo descomprimido
+        "DOWNLOADER_MIDDLEWARES": {"recrawl_cache.ConditionalRecrawlMiddleware": 580},
+        "SPIDER_MIDDLEWARES": {"recrawl_cache.RecrawlSectionFilter": 950},
+    }
@@ -1,25 +1,28 @@
 import argparse
-import json
 import logging
 import os
 import time
 from typing import List
 
-import praw
-from pydantic import BaseModel
-from prawcore.exceptions import RateLimitExceeded
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record, write_json
+from work_queue import add_queue_arguments, run_queued
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+RedditData = Record
 
-
-class RedditData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+# Envelope do JSON de saída (save_to_json e merge da fila)
+ENVELOPE = {
+    "source": "reddit",
+    "category": "forum",
+    "document_type": "post_comment",
+}
 
 
 class RedditScraper:
     def __init__(self, client_id: str, client_secret: str, user_agent: str, wait_time: float = 1.0):
+        import praw
+
         self.reddit = praw.Reddit(
             client_id=client_id,
             client_secret=client_secret,
@@ -27,7 +30,10 @@ class RedditScraper:
         )
         self.wait_time = wait_time
 
-    def fetch_posts(self, subreddits: List[str], post_limit: int = 10, comment_limit: int = 10) -> List[RedditData]:
+    def fetch_posts(self, subreddits: List[str], post_limit: int = 10, comment_limit: int = 10,
+                    raise_errors: bool = False) -> List[RedditData]:
+        from prawcore.exceptions import RateLimitExceeded
+
         data: List[RedditData] = []
         for subreddit_name in subreddits:
             try:
@@ -67,19 +73,16 @@ class RedditScraper:
                 wait_for = int(e.sleep_time) + 1
                 logging.warning(f"Rate limit atingido, aguardando {wait_for}s...")
                 time.sleep(wait_for)
+                if raise_errors:
+                    raise
             except Exception as e:
+                if raise_errors:
+                    raise
                 logging.error(f"Erro ao coletar dados de r/{subreddit_name}: {e}")
         return data
 
     def save_to_json(self, data: List[RedditData], filename: str):
-        output = {
-            "source": "reddit",
-            "category": "forum",
-            "document_type": "post_comment",
-            "data": [d.dict() for d in data],
-        }
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+        write_json(data, filename, envelope=ENVELOPE)
         logging.info(f"Dados salvos em {filename}")
 
 
@@ -93,17 +96,40 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--comments", type=int, default=10, help="Quantidade de comentários por post")
     parser.add_argument("--wait", type=float, default=1.0, help="Tempo de espera entre chamadas")
     parser.add_argument("--output", default="reddit_data.json", help="Arquivo de saída")
+    add_format_argument(parser)
+    add_profile_arguments(parser)
+    add_queue_arguments(parser, "reddit")
     return parser.parse_args()
 
 
-if __name__ == "__main__":
+def main() -> None:
     args = parse_args()
-    scraper = RedditScraper(
-        client_id=args.client_id,
-        client_secret=args.client_secret,
-        user_agent=args.user_agent,
-        wait_time=args.wait,
-    )
-    subreddit_list = [s.strip() for s in args.subreddits.split(",") if s.strip()]
-    posts = scraper.fetch_posts(subreddit_list, post_limit=args.posts, comment_limit=args.comments)
-    scraper.save_to_json(posts, args.output)
+    with profiled_from_args(args, args.output):
+        scraper = RedditScraper(
+            client_id=args.client_id,
+            client_secret=args.client_secret,
+            user_agent=args.user_agent,
+            wait_time=args.wait,
+        )
+        subreddit_list = [s.strip() for s in args.subreddits.split(",") if s.strip()]
+        if args.queue:
+            # uma unidade por subreddit
+            run_queued(
+                args,
+                [(f"r-{name}", {"subreddit": name}) for name in subreddit_list],
+                lambda unit: scraper.fetch_posts([unit["subreddit"]], post_limit=args.posts,
+                                                 comment_limit=args.comments, raise_errors=True),
+                source="reddit",
+                envelope=ENVELOPE,
+            )
+            return
+        posts = scraper.fetch_posts(subreddit_list, post_limit=args.posts, comment_limit=args.comments)
+        if args.format == "json":
+            scraper.save_to_json(posts, args.output)
+        else:
+            save_records(posts, args.output, args.format, source="reddit", **format_options(args))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
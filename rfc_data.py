@@ -1,19 +1,18 @@
 import argparse
-import json
 import logging
 import time
 from typing import List
 
 import requests
 from bs4 import BeautifulSoup
-from pydantic import BaseModel
-
-logging.basicConfig(level=logging.INFO)
+
+from chunking import add_chunk_arguments, chunk_records_from_args
+from output_formats import add_format_argument, format_options, save_records
+from profiling import add_profile_arguments, profiled_from_args
+from records import Record, write_json
+from work_queue import add_queue_arguments, run_queued
 
-class RFCData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
+RFCData = Record
 
 class RFCScraper:
     def __init__(self, output_file: str = "rfc_data.json"):
@@ -26,6 +25,7 @@ class RFCScraper:
         end: int = 100,
         retries: int = 3,
         delay: float = 1.0,
+        raise_errors: bool = False,
     ) -> List[RFCData]:
         data = []
         for rfc_id in range(start, end + 1):
@@ -48,6 +48,11 @@ class RFCScraper:
                     )
                     break
                 except Exception as e:
+                    if isinstance(e, requests.HTTPError) and e.response is not None \
+                            and e.response.status_code == 404:
+                        # número de RFC não publicado: não há o que repetir
+                        logging.info(f"RFC {rfc_id} não encontrada")
+                        break
                     logging.warning(
                         f"Erro ao coletar RFC {rfc_id}, tentativa {attempt}: {e}"
                     )
@@ -55,13 +60,14 @@ class RFCScraper:
                         logging.error(
                             f"Falha ao coletar RFC {rfc_id} apos {retries} tentativas."
                         )
+                        if raise_errors:
+                            raise
                     time.sleep(delay)
             time.sleep(delay)
         return data
 
     def save_to_json(self, data: List[RFCData]):
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump([d.dict() for d in data], f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file)
         logging.info(f"Dados salvos em {self.output_file}")
 
 
@@ -70,12 +76,31 @@ def main() -> None:
     parser.add_argument("--start", type=int, default=1, help="Número inicial do RFC")
     parser.add_argument("--end", type=int, default=100, help="Número final do RFC")
     parser.add_argument("--output", type=str, default="rfc_data.json", help="Arquivo de saída")
+    add_format_argument(parser)
+    parser.add_argument("--unit-size", type=int, default=100, help="RFCs por unidade de trabalho (com --queue)")
+    add_chunk_arguments(parser)
+    add_queue_arguments(parser, "rfc")
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
-    scraper = RFCScraper(output_file=args.output)
-    data = scraper.fetch_rfcs(start=args.start, end=args.end)
-    scraper.save_to_json(data)
+    with profiled_from_args(args, args.output):
+        scraper = RFCScraper(output_file=args.output)
+        if args.queue:
+            units = [
+                (f"rfc-{start:05d}-{min(start + args.unit_size - 1, args.end):05d}",
+                 {"start": start, "end": min(start + args.unit_size - 1, args.end)})
+                for start in range(args.start, args.end + 1, args.unit_size)
+            ]
+            run_queued(args, units, lambda unit: chunk_records_from_args(
+                scraper.fetch_rfcs(start=unit["start"], end=unit["end"], raise_errors=True), args), source="rfc")
+            return
+        data = chunk_records_from_args(scraper.fetch_rfcs(start=args.start, end=args.end), args)
+        if args.format == "json":
+            scraper.save_to_json(data)
+        else:
+            save_records(data, scraper.output_file, args.format, source="rfc", **format_options(args))
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
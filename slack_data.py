@@ -1,24 +1,70 @@
-from slack_sdk import WebClient
 import json
 import logging
-from pydantic import BaseModel
-from typing import List
+import os
+import re
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
-logging.basicConfig(level=logging.INFO)
+from output_formats import add_format_argument, format_options, save_records
+from pii_scrub import add_scrub_arguments, scrub_records
+from records import Record, write_json
+
+DEFAULT_WORKSPACE_URL = "https://slack.com"
+
+USER_MENTION_RE = re.compile(r"<@([UW][A-Z0-9]+)(?:\|[^>]*)?>")
+CHANNEL_MENTION_RE = re.compile(r"<#([CGD][A-Z0-9]+)(?:\|([^>]*))?>")
+
+SlackData = Record
+
+def message_permalink(workspace_url: str, channel_id: str, ts: str, thread_ts: Optional[str] = None) -> str:
+    """Monta o permalink de uma mensagem no mesmo formato do chat.getPermalink."""
+    url = f"{workspace_url}/archives/{channel_id}/p{ts.replace('.', '')}"
+    if thread_ts and thread_ts != ts:
+        url += f"?thread_ts={thread_ts}&cid={channel_id}"
+    return url
+
+
+def build_message(message: dict, channel_id: str, content: str, workspace_url: str) -> SlackData:
+    ts = message.get("ts", "")
+    return SlackData(
+        id=ts,
+        content=content,
+        metadata={
+            "url": message_permalink(workspace_url, channel_id, ts, message.get("thread_ts")),
+            "timestamp": ts,
+            "tags": [channel_id],
+            "language": "english",
+            "type": "message",
+        },
+    )
 
-class SlackData(BaseModel):
-    id: str
-    content: str
-    metadata: dict
 
 class SlackScraper:
     def __init__(self, token: str):
+        # importado aqui: a leitura do export (e seus workers) não precisa do slack_sdk
+        from slack_sdk import WebClient
+
         self.client = WebClient(token=token)
         self.output_file = "slack_data.json"
+        self._workspace_url: Optional[str] = None
+
+    def workspace_url(self) -> str:
+        """Obtém (uma única vez) a URL do workspace usada nos permalinks."""
+        if self._workspace_url is None:
+            try:
+                url = self.client.auth_test().get("url") or DEFAULT_WORKSPACE_URL
+            except Exception as e:
+                logging.warning(f"Não foi possível obter a URL do workspace: {e}")
+                url = DEFAULT_WORKSPACE_URL
+            self._workspace_url = url.rstrip("/")
+        return self._workspace_url
 
     def fetch_messages(self, channel_id: str, limit: int = 100) -> List[SlackData]:
         data = []
         cursor = None
+        workspace_url = self.workspace_url()
         try:
             while True:
                 response = self.client.conversations_history(
@@ -28,17 +74,7 @@ class SlackScraper:
                 )
                 for message in response.get("messages", []):
                     data.append(
-                        SlackData(
-                            id=message.get("ts", ""),
-                            content=message.get("text", ""),
-                            metadata={
-                                "url": f"https://slack.com/archives/{channel_id}",
-                                "timestamp": message.get("ts", ""),
-                                "tags": [channel_id],
-                                "language": "english",
-                                "type": "message",
-                            },
-                        )
+                        build_message(message, channel_id, message.get("text", ""), workspace_url)
                     )
                 cursor = response.get("response_metadata", {}).get("next_cursor")
                 if not cursor:
@@ -48,16 +84,133 @@ class SlackScraper:
         return data
 
     def save_to_json(self, data: List[SlackData]):
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump([d.dict() for d in data], f, indent=2, ensure_ascii=False)
+        write_json(data, self.output_file)
+        logging.info(f"Dados salvos em {self.output_file}")
+
+
+# Contexto de cada processo de leitura do export (preenchido pelo initializer)
+_EXPORT_CONTEXT: Dict = {}
+
+
+def _init_export_worker(zip_path: str, users: Dict[str, str], channels: Dict[str, str], workspace_url: str):
+    _EXPORT_CONTEXT["zip"] = zipfile.ZipFile(zip_path)
+    _EXPORT_CONTEXT["users"] = users
+    _EXPORT_CONTEXT["channels"] = channels
+    _EXPORT_CONTEXT["workspace_url"] = workspace_url
+
+
+def resolve_mentions(text: str, users: Dict[str, str], channels: Dict[str, str]) -> str:
+    """Substitui <@U...> e <#C...> pelos nomes das tabelas de lookup."""
+    if "<" not in text:
+        return text
+    text = USER_MENTION_RE.sub(lambda m: "@" + users.get(m.group(1), m.group(1)), text)
+    return CHANNEL_MENTION_RE.sub(
+        lambda m: "#" + (m.group(2) or channels.get(m.group(1), m.group(1))), text
+    )
+
+
+def _read_export_channel(task: Tuple[str, List[str]]) -> List[SlackData]:
+    channel_id, members = task
+    archive = _EXPORT_CONTEXT["zip"]
+    users = _EXPORT_CONTEXT["users"]
+    channels = _EXPORT_CONTEXT["channels"]
+    workspace_url = _EXPORT_CONTEXT["workspace_url"]
+    data = []
+    for member in members:
+        try:
+            with archive.open(member) as f:
+                messages = json.load(f)
+        except Exception as e:
+            logging.error(f"Erro ao ler {member}: {e}")
+            continue
+        for message in messages:
+            if message.get("type") != "message" or "ts" not in message:
+                continue
+            content = resolve_mentions(message.get("text", ""), users, channels)
+            data.append(build_message(message, channel_id, content, workspace_url))
+    return data
+
+
+class SlackExportReader:
+    """Lê um export administrativo do Slack (ZIP) sem extrair os arquivos."""
+
+    CHANNEL_INDEXES = ("channels.json", "groups.json", "mpims.json", "dms.json")
+
+    def __init__(self, zip_path: str, workspace_url: str = DEFAULT_WORKSPACE_URL, workers: Optional[int] = None):
+        self.zip_path = zip_path
+        self.workspace_url = workspace_url.rstrip("/")
+        self.workers = workers or os.cpu_count() or 1
+        self.output_file = "slack_data.json"
+
+    def _load_index(self, archive: zipfile.ZipFile, name: str) -> list:
+        if name not in archive.NameToInfo:
+            return []
+        with archive.open(name) as f:
+            return json.load(f)
+
+    def build_lookups(self, archive: zipfile.ZipFile) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+        """Retorna (usuários, canais por id, id por diretório do export)."""
+        users = {}
+        for user in self._load_index(archive, "users.json"):
+            profile = user.get("profile", {})
+            users[user["id"]] = profile.get("display_name") or user.get("name") or user["id"]
+        channels = {}
+        folders = {}
+        for index in self.CHANNEL_INDEXES:
+            for channel in self._load_index(archive, index):
+                # DMs e MPIMs não têm nome; o diretório no export usa o próprio id
+                name = channel.get("name") or channel["id"]
+                channels[channel["id"]] = name
+                folders[name] = channel["id"]
+        return users, channels, folders
+
+    def plan_channels(self, archive: zipfile.ZipFile, folders: Dict[str, str]) -> List[Tuple[str, List[str]]]:
+        """Agrupa os membros diários (<canal>/<AAAA-MM-DD>.json) por canal."""
+        members = defaultdict(list)
+        for member in archive.namelist():
+            folder, _, filename = member.rpartition("/")
+            if not folder or not filename.endswith(".json"):
+                continue
+            channel_id = folders.get(folder)
+            if channel_id is None:
+                logging.warning(f"Diretório sem canal correspondente no export: {folder}")
+                continue
+            members[channel_id].append(member)
+        # canais maiores primeiro para equilibrar a carga entre os processos
+        return sorted(
+            ((cid, sorted(files)) for cid, files in members.items()),
+            key=lambda task: len(task[1]),
+            reverse=True,
+        )
+
+    def fetch_messages(self) -> List[SlackData]:
+        with zipfile.ZipFile(self.zip_path) as archive:
+            users, channels, folders = self.build_lookups(archive)
+            tasks = self.plan_channels(archive, folders)
+        logging.info(f"{len(tasks)} canais encontrados em {self.zip_path}")
+        data = []
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_export_worker,
+            initargs=(self.zip_path, users, channels, self.workspace_url),
+        ) as executor:
+            for (channel_id, _), messages in zip(tasks, executor.map(_read_export_channel, tasks)):
+                logging.info(f"{len(messages)} mensagens lidas de {channels.get(channel_id, channel_id)}")
+                data.extend(messages)
+        return data
+
+    def save_to_json(self, data: List[SlackData]):
+        write_json(data, self.output_file)
         logging.info(f"Dados salvos em {self.output_file}")
 
+
 if __name__ == "__main__":
     import argparse
-    import os
+
+    logging.basicConfig(level=logging.INFO)
 
     parser = argparse.ArgumentParser(description="Slack message scraper")
-    parser.add_argument("channel_id", help="Slack channel ID")
+    parser.add_argument("channel_id", nargs="?", help="Slack channel ID")
     parser.add_argument(
         "--token",
         help="Slack token (or set SLACK_TOKEN env var)",
@@ -69,11 +222,33 @@ if __name__ == "__main__":
         default=100,
         help="Messages per request (max 100)",
     )
+    parser.add_argument("--export-zip", help="Slack admin export ZIP to read offline")
+    parser.add_argument(
+        "--workspace-url",
+        default=os.getenv("SLACK_WORKSPACE_URL", DEFAULT_WORKSPACE_URL),
+        help="Workspace URL used for export permalinks (e.g. https://acme.slack.com)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --export-zip")
+    add_format_argument(parser)
+    add_scrub_arguments(parser)
     args = parser.parse_args()
 
-    if not args.token:
-        parser.error("Slack token must be provided via --token or SLACK_TOKEN env var")
+    if args.export_zip:
+        reader = SlackExportReader(args.export_zip, workspace_url=args.workspace_url, workers=args.workers)
+        messages = scrub_records(reader.fetch_messages(), "slack", args)
+        if args.format == "json":
+            reader.save_to_json(messages)
+        else:
+            save_records(messages, reader.output_file, args.format, source="slack", **format_options(args))
+    else:
+        if not args.channel_id:
+            parser.error("channel_id is required unless --export-zip is given")
+        if not args.token:
+            parser.error("Slack token must be provided via --token or SLACK_TOKEN env var")
 
-    scraper = SlackScraper(token=args.token)
-    messages = scraper.fetch_messages(channel_id=args.channel_id, limit=args.limit)
-    scraper.save_to_json(messages)
+        scraper = SlackScraper(token=args.token)
+        messages = scrub_records(scraper.fetch_messages(channel_id=args.channel_id, limit=args.limit), "slack", args)
+        if args.format == "json":
+            scraper.save_to_json(messages)
+        else:
+            save_records(messages, scraper.output_file, args.format, source="slack", **format_options(args))
@@ -0,0 +1,365 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from records import encode_jsonl, loads
+
+DEFAULT_LEASE = 300
+DEFAULT_MAX_ATTEMPTS = 3
+# Espera antes de uma nova tentativa: RETRY_DELAY * tentativas já feitas
+RETRY_DELAY = 30
+# Intervalo máximo entre consultas enquanto outras unidades aguardam retentativa ou lease
+WAIT_POLL = 10
+
+
+@dataclass
+class WorkUnit:
+    harvest: str
+    key: str
+    payload: Dict
+    attempts: int
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Fila durável de unidades de trabalho em SQLite, com lease, heartbeat e retentativas.
+
+    Cada coleta (``harvest``) é dividida em unidades com chave estável;
+    ``enqueue`` é idempotente, então qualquer worker pode planejar a coleta e
+    uma coleta interrompida continua de onde parou. Um worker pega uma unidade
+    com ``lease``, renova o prazo com ``heartbeat`` enquanto trabalha e a
+    encerra com ``complete`` ou ``fail``; unidades com lease vencido (worker
+    morto) voltam para a fila. Falhas são retentadas individualmente até
+    ``max_attempts`` vezes.
+
+    O arquivo pode estar em um sistema de arquivos compartilhado entre
+    máquinas: o journal fica no modo padrão (o WAL exige memória
+    compartilhada no mesmo host) e cada lease é uma transação ``IMMEDIATE``.
+    """
+
+    def __init__(self, path: str, lease_seconds: int = DEFAULT_LEASE,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, retry_delay: float = RETRY_DELAY):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS units (
+                harvest TEXT,
+                unit_key TEXT,
+                payload TEXT,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                available_at REAL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                last_error TEXT,
+                updated REAL,
+                PRIMARY KEY (harvest, unit_key)
+            );
+            CREATE INDEX IF NOT EXISTS units_status ON units (harvest, status, available_at);
+            CREATE TABLE IF NOT EXISTS harvests (
+                harvest TEXT PRIMARY KEY,
+                output TEXT
+            );
+            """
+        )
+
+    def set_output(self, harvest: str, output: Dict):
+        """Registra como o ``merge`` deve gravar a coleta (formato, origem, envelope)."""
+        self.db.execute("INSERT OR REPLACE INTO harvests (harvest, output) VALUES (?, ?)",
+                        (harvest, json.dumps(output)))
+
+    def output(self, harvest: str) -> Dict:
+        row = self.db.execute("SELECT output FROM harvests WHERE harvest = ?", (harvest,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def enqueue(self, harvest: str, units: Iterable[Tuple[str, Dict]]) -> int:
+        """Adiciona unidades ``(chave, payload)``; as que já existem são mantidas como estão."""
+        now = time.time()
+        rows = [(harvest, key, json.dumps(payload), now) for key, payload in units]
+        self.db.execute("BEGIN IMMEDIATE")
+        before = self.db.total_changes
+        self.db.executemany(
+            "INSERT OR IGNORE INTO units (harvest, unit_key, payload, updated) VALUES (?, ?, ?, ?)", rows
+        )
+        added = self.db.total_changes - before
+        self.db.execute("COMMIT")
+        return added
+
+    def lease(self, harvest: str, worker_id: str) -> Optional[WorkUnit]:
+        """Reserva a próxima unidade disponível (pendente ou com lease vencido)."""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = self.db.execute(
+                    """
+                    SELECT unit_key, payload, attempts FROM units
+                    WHERE harvest = ? AND (
+                        (status = 'pending' AND available_at <= ?)
+                        OR (status = 'leased' AND lease_expires < ?)
+                    )
+                    ORDER BY attempts, unit_key LIMIT 1
+                    """,
+                    (harvest, now, now),
+                ).fetchone()
+                if row is None:
+                    self.db.execute("COMMIT")
+                    return None
+                key, payload, attempts = row
+                if attempts < self.max_attempts:
+                    break
+                # lease vencido na última tentativa: o worker morreu sem registrar a falha
+                self.db.execute(
+                    "UPDATE units SET status = 'failed', last_error = ?, updated = ? WHERE harvest = ? AND unit_key = ?",
+                    ("lease expirado", now, harvest, key),
+                )
+            self.db.execute(
+                """
+                UPDATE units SET status = 'leased', attempts = attempts + 1, lease_owner = ?,
+                    lease_expires = ?, updated = ?
+                WHERE harvest = ? AND unit_key = ?
+                """,
+                (worker_id, now + self.lease_seconds, now, harvest, key),
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return WorkUnit(harvest, key, json.loads(payload), attempts + 1)
+
+    def _update_owned(self, unit: WorkUnit, worker_id: str, sql: str, params: tuple) -> bool:
+        cursor = self.db.execute(
+            f"UPDATE units SET {sql} WHERE harvest = ? AND unit_key = ? AND status = 'leased' AND lease_owner = ?",
+            params + (unit.harvest, unit.key, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, unit: WorkUnit, worker_id: str) -> bool:
+        """Renova o lease; False se a unidade foi retomada por outro worker."""
+        now = time.time()
+        return self._update_owned(unit, worker_id, "lease_expires = ?, updated = ?",
+                                  (now + self.lease_seconds, now))
+
+    def complete(self, unit: WorkUnit, worker_id: str) -> bool:
+        return self._update_owned(unit, worker_id, "status = 'done', lease_owner = NULL, updated = ?",
+                                  (time.time(),))
+
+    def fail(self, unit: WorkUnit, worker_id: str, error: str) -> bool:
+        """Devolve a unidade para nova tentativa (com espera) ou a marca como ``failed``."""
+        now = time.time()
+        if unit.attempts >= self.max_attempts:
+            return self._update_owned(unit, worker_id, "status = 'failed', lease_owner = NULL, last_error = ?, "
+                                      "updated = ?", (error, now))
+        return self._update_owned(unit, worker_id, "status = 'pending', lease_owner = NULL, last_error = ?, "
+                                  "available_at = ?, updated = ?", (error, now + self.retry_delay * unit.attempts, now))
+
+    def retry_failed(self, harvest: str) -> int:
+        """Volta as unidades ``failed`` para a fila com as tentativas zeradas."""
+        cursor = self.db.execute(
+            "UPDATE units SET status = 'pending', attempts = 0, available_at = 0, updated = ? "
+            "WHERE harvest = ? AND status = 'failed'",
+            (time.time(), harvest),
+        )
+        return cursor.rowcount
+
+    def next_available(self, harvest: str) -> Optional[float]:
+        """Quando a próxima unidade pendente ou com lease ativo pode ser pega (None se não houver)."""
+        row = self.db.execute(
+            """
+            SELECT MIN(CASE status WHEN 'pending' THEN available_at ELSE lease_expires END) FROM units
+            WHERE harvest = ? AND status IN ('pending', 'leased')
+            """,
+            (harvest,),
+        ).fetchone()
+        return row[0]
+
+    def stats(self, harvest: str) -> Dict[str, int]:
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for status, count in self.db.execute(
+            "SELECT status, COUNT(*) FROM units WHERE harvest = ? GROUP BY status", (harvest,)
+        ):
+            counts[status] = count
+        return counts
+
+    def failures(self, harvest: str) -> List[Tuple[str, str]]:
+        return self.db.execute(
+            "SELECT unit_key, last_error FROM units WHERE harvest = ? AND status = 'failed' ORDER BY unit_key",
+            (harvest,),
+        ).fetchall()
+
+    def close(self):
+        self.db.close()
+
+
+class _Heartbeat(threading.Thread):
+    """Renova o lease de uma unidade em segundo plano, com conexão própria."""
+
+    def __init__(self, queue: WorkQueue, unit: WorkUnit, worker_id: str):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.unit = unit
+        self.worker_id = worker_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        queue = WorkQueue(self.queue.path, self.queue.lease_seconds, self.queue.max_attempts)
+        try:
+            while not self.stopped.wait(self.queue.lease_seconds / 3):
+                if not queue.heartbeat(self.unit, self.worker_id):
+                    logging.warning(f"Lease de {self.unit.key} perdido")
+                    return
+        finally:
+            queue.close()
+
+
+def unit_filename(key: str) -> str:
+    # o hash curto separa chaves que viram o mesmo nome (ex.: "a/b" e "a_b")
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4).hexdigest()
+    return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', key)}-{digest}.jsonl"
+
+
+def drain(queue: WorkQueue, harvest: str, handler: Callable[[Dict], List], unit_dir: str,
+          worker_id: Optional[str] = None, wait: bool = True) -> int:
+    """Processa unidades até a fila esvaziar, gravando ``<unit_dir>/<chave>.jsonl`` por unidade.
+
+    O arquivo de cada unidade é gravado antes de ela ser marcada como
+    concluída, então um worker interrompido no meio só repete a unidade atual.
+    Com ``wait`` o worker só termina quando não resta unidade pendente nem
+    com lease: ele dorme até a próxima retentativa ou o fim do lease de
+    outro worker (que pode ter morrido) e tenta de novo.
+    """
+    worker_id = worker_id or default_worker_id()
+    os.makedirs(unit_dir, exist_ok=True)
+    processed = 0
+    while True:
+        unit = queue.lease(harvest, worker_id)
+        if unit is None:
+            next_at = queue.next_available(harvest) if wait else None
+            if next_at is None:
+                break
+            time.sleep(min(max(next_at - time.time(), 0) + 0.1, WAIT_POLL))
+            continue
+        heartbeat = _Heartbeat(queue, unit, worker_id)
+        heartbeat.start()
+        try:
+            records = handler(unit.payload)
+            path = os.path.join(unit_dir, unit_filename(unit.key))
+            with open(path + ".tmp", "wb") as f:
+                f.write(encode_jsonl(records))
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logging.error(f"Unidade {unit.key} falhou (tentativa {unit.attempts}): {e}")
+            queue.fail(unit, worker_id, str(e))
+            continue
+        finally:
+            heartbeat.stopped.set()
+            heartbeat.join()
+        if queue.complete(unit, worker_id):
+            processed += 1
+            logging.info(f"Unidade {unit.key}: {len(records)} registros")
+    logging.info(f"{worker_id}: {processed} unidades concluídas; fila {queue.stats(harvest)}")
+    return processed
+
+
+def iter_unit_records(unit_dir: str) -> Iterator[Dict]:
+    for name in sorted(os.listdir(unit_dir)):
+        if name.endswith(".jsonl"):
+            with open(os.path.join(unit_dir, name), "rb") as f:
+                for line in f:
+                    if line.strip():
+                        yield loads(line)
+
+
+def add_queue_arguments(parser, harvest: str):
+    parser.add_argument("--queue", default=None,
+                        help="Fila SQLite compartilhada: divide a coleta em unidades entre vários workers")
+    parser.add_argument("--harvest", default=harvest, help="Nome da coleta na fila")
+    parser.add_argument("--unit-dir", default=None, help="Diretório das saídas por unidade (padrão: <harvest>_units)")
+    parser.add_argument("--worker-id", default=None, help="Identificação do worker (padrão: host:pid)")
+    parser.add_argument("--lease", type=int, default=DEFAULT_LEASE, help="Prazo do lease de cada unidade (s)")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="Tentativas por unidade")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Encerra quando não houver unidade disponível, sem esperar retentativas "
+                             "nem leases de outros workers")
+
+
+def run_queued(args, units: Iterable[Tuple[str, Dict]], handler: Callable[[Dict], List],
+               source: Optional[str] = None, envelope: Optional[Dict] = None) -> int:
+    """Atalho dos CLIs: planeja as unidades (idempotente) e processa a fila.
+
+    O ``--output``/``--format`` do CLI, a origem e o envelope do
+    ``save_to_json`` ficam registrados na fila para o ``merge``.
+    """
+    from output_formats import format_options
+
+    queue = WorkQueue(args.queue, lease_seconds=args.lease, max_attempts=args.max_attempts)
+    try:
+        queue.set_output(args.harvest, {
+            "output": args.output, "format": args.format, "options": format_options(args),
+            "source": source or args.harvest, "envelope": envelope,
+        })
+        added = queue.enqueue(args.harvest, units)
+        if added:
+            logging.info(f"{added} unidades adicionadas à coleta {args.harvest}")
+        return drain(queue, args.harvest, handler, args.unit_dir or f"{args.harvest}_units", args.worker_id,
+                     wait=not args.no_wait)
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Acompanha e administra coletas na fila de trabalho")
+    parser.add_argument("command", choices=["status", "retry-failed", "merge"])
+    parser.add_argument("--queue", required=True, help="Arquivo SQLite da fila")
+    parser.add_argument("--harvest", required=True, help="Nome da coleta")
+    parser.add_argument("--unit-dir", default=None, help="Diretório das saídas por unidade (merge)")
+    parser.add_argument("--output", default=None,
+                        help="Arquivo do merge (padrão: o --output dos workers ou <harvest>.json)")
+    parser.add_argument("--format", default=None, help="Formato do merge (padrão: o --format dos workers)")
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.queue)
+    if args.command == "status":
+        logging.info(f"{args.harvest}: {queue.stats(args.harvest)}")
+        for key, error in queue.failures(args.harvest):
+            logging.info(f"  falhou {key}: {error}")
+    elif args.command == "retry-failed":
+        logging.info(f"{queue.retry_failed(args.harvest)} unidades de volta à fila")
+    else:
+        from output_formats import FORMATS, save_records
+        from records import write_json
+
+        stats = queue.stats(args.harvest)
+        if stats["pending"] or stats["leased"]:
+            logging.warning(f"Coleta incompleta: {stats}")
+        # como os workers gravariam sem a fila: o JSON do save_to_json (com envelope) ou save_records
+        settings = queue.output(args.harvest)
+        output = args.output or settings.get("output") or f"{args.harvest}.json"
+        fmt = args.format or settings.get("format") or "json"
+        if fmt not in FORMATS:
+            parser.error(f"Formato desconhecido: {fmt}")
+        records = iter_unit_records(args.unit_dir or f"{args.harvest}_units")
+        if fmt == "json":
+            write_json(list(records), output, envelope=settings.get("envelope"))
+        else:
+            output = save_records(records, output, fmt, source=settings.get("source") or args.harvest,
+                                  **settings.get("options", {}))
+        logging.info(f"Dados salvos em {output}")
+    queue.close()